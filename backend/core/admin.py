@@ -4,7 +4,10 @@ from django.http import JsonResponse              # ← for the tiny JSON endpoi
 from django.db.models import Q, F, Value
 from django.db.models.functions import Lower
 from django.contrib.postgres.search import TrigramSimilarity
-from .models import Species, Reserve, Association, Occurrence, ReserveAssociationYear, Habitat, Site, SiteHabitat
+from .models import (
+    Species, Reserve, Association, Occurrence, ReserveAssociationYear, Habitat, Site, SiteHabitat, CoordinateIssue,
+    DuplicateCluster, DuplicateMember,
+)
 
 
 @admin.register(Species)
@@ -31,8 +34,8 @@ class AssociationAdmin(admin.ModelAdmin):
 @admin.register(Occurrence)
 class OccurrenceAdmin(admin.ModelAdmin):
     autocomplete_fields = ["species", "reserve"]
-    list_display = ["species", "reserve", "year", "is_rare"]
-    list_filter = ["year", "is_rare"]
+    list_display = ["species", "reserve", "year", "is_rare", "effective_rare"]
+    list_filter = ["year", "is_rare", "effective_rare"]
 
     def save_model(self, request, obj, form, change):
         # Dacă userul NU a atins câmpul is_rare, îl preluăm din specie
@@ -169,4 +172,86 @@ class SiteHabitatAdmin(admin.ModelAdmin):
     list_display = ("site", "habitat", "year", "surface")
     list_filter = ("year",)
     list_select_related = ('site', 'habitat')
-    search_fields = ("site__name", "habitat__name_romanian", "habitat__name_english")
\ No newline at end of file
+    search_fields = ("site__name", "habitat__name_romanian", "habitat__name_english")
+
+
+@admin.register(CoordinateIssue)
+class CoordinateIssueAdmin(admin.ModelAdmin):
+    """Coordonate suspecte găsite de `manage.py scan_coordinates`, de revizuit manual."""
+    list_display = ["occurrence", "kind", "distance_km", "threshold_km",
+                    "suggested_latitude", "suggested_longitude", "reviewed", "updated_at"]
+    list_filter = ["kind", "reviewed"]
+    list_select_related = ["occurrence__species", "occurrence__reserve"]
+    raw_id_fields = ["occurrence"]
+    readonly_fields = ["kind", "distance_km", "threshold_km", "suggested_latitude", "suggested_longitude",
+                       "created_at", "updated_at"]
+    search_fields = ["occurrence__species__denumire_stiintifica", "occurrence__reserve__name"]
+    actions = ["mark_reviewed", "apply_swap"]
+
+    @admin.action(description="Marchează ca revizuite")
+    def mark_reviewed(self, request, queryset):
+        n = queryset.update(reviewed=True)
+        self.message_user(request, f"{n} probleme marcate ca revizuite.")
+
+    @admin.action(description="Aplică inversarea lat/lon propusă")
+    def apply_swap(self, request, queryset):
+        n = 0
+        for issue in queryset.filter(kind=CoordinateIssue.KIND_SWAPPED).select_related("occurrence"):
+            occ = issue.occurrence
+            occ.latitude, occ.longitude = issue.suggested_latitude, issue.suggested_longitude
+            occ.save(update_fields=["latitude", "longitude"])
+            issue.delete()
+            n += 1
+        self.message_user(request, f"{n} ocurențe corectate.")
+
+
+class DuplicateMemberInline(admin.TabularInline):
+    model = DuplicateMember
+    extra = 0
+    can_delete = False
+    fields = ["occurrence", "reserve", "year", "latitude", "longitude", "source", "observer", "best_score"]
+    readonly_fields = fields
+
+    @admin.display(description="Rezervație")
+    def reserve(self, obj):
+        return obj.occurrence.reserve
+
+    def year(self, obj):
+        return obj.occurrence.year
+
+    def latitude(self, obj):
+        return obj.occurrence.latitude
+
+    def longitude(self, obj):
+        return obj.occurrence.longitude
+
+    def source(self, obj):
+        return obj.occurrence.source
+
+    def observer(self, obj):
+        return obj.occurrence.observer
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("occurrence__reserve")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    """Grupuri de ocurențe probabil duplicate găsite de `manage.py find_duplicates`, de revizuit manual."""
+    list_display = ["id", "species", "size", "score", "max_distance_km", "max_year_gap", "reviewed", "updated_at"]
+    list_filter = ["reviewed"]
+    list_select_related = ["species"]
+    ordering = ["reviewed", "-score"]
+    readonly_fields = ["species", "fingerprint", "size", "score", "max_distance_km", "max_year_gap",
+                       "created_at", "updated_at"]
+    search_fields = ["species__denumire_stiintifica"]
+    inlines = [DuplicateMemberInline]
+    actions = ["mark_reviewed"]
+
+    @admin.action(description="Marchează ca revizuite")
+    def mark_reviewed(self, request, queryset):
+        n = queryset.update(reviewed=True)
+        self.message_user(request, f"{n} grupuri marcate ca revizuite.")
@@ -11,4 +11,30 @@ class CoreConfig(AppConfig):
             from . import signals  # noqa: F401
         except Exception:
             # Avoid crashing at import time; failures will surface in logs
-            pass
\ No newline at end of file
+            pass
+
+        # warm the dropdown/reference-data cache once per process, on its first request
+        # (no DB access in ready() itself: migrate & co. may run before the schema exists)
+        from django.core.signals import request_started
+        request_started.connect(_warm_refdata, dispatch_uid="core_warm_refdata")
+        # the refdata generations are read from the DB at most once per request
+        request_started.connect(_reset_refdata_generations, dispatch_uid="core_reset_refdata_generations")
+
+
+def _reset_refdata_generations(sender, **kwargs):
+    from .refdata import reset_generations
+
+    reset_generations()
+
+
+def _warm_refdata(sender, **kwargs):
+    from django.core.signals import request_started
+    from django.db import DatabaseError
+
+    from .refdata import warm
+
+    request_started.disconnect(dispatch_uid="core_warm_refdata")
+    try:
+        warm()
+    except DatabaseError:
+        pass
@@ -0,0 +1,125 @@
+# core/coord_quality.py
+"""Scanner de calitate a coordonatelor ocurențelor (tabelul CoordinateIssue, vizibil în admin).
+
+Fiecare ocurență cu coordonate e comparată cu centrul rezervației ei (coordonatele rezervației
+sau, dacă lipsesc, media ocurențelor ei din interiorul țării), pe loturi de CHUNK_SIZE rânduri
+(keyset pe id), cu aritmetică NumPy pe tot lotul:
+  swapped           punctul e departe / în afara țării, dar cu lat și lon inversate ar fi în regulă
+  out_of_bounds     în afara dreptunghiului Republicii Moldova
+  far_from_reserve  mai departe de centru decât pragul rezervației
+Pragul = FAR_MIN_KM + FAR_RADIUS_FACTOR * raza cercului cu aria rezervației (suprafata_ha).
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg
+
+from .geo import MOLDOVA_BBOX, haversine_km_np
+from .models import CoordinateIssue, Occurrence, Reserve
+
+CHUNK_SIZE = 100_000
+FAR_MIN_KM = 10.0
+FAR_RADIUS_FACTOR = 3.0
+
+
+def _inside(lat, lon, bbox=MOLDOVA_BBOX):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+
+
+def reserve_centroids():
+    """(ids sortate, lat, lon, prag_km) ca array-uri NumPy; NaN unde rezervația nu are centru."""
+    min_lon, min_lat, max_lon, max_lat = MOLDOVA_BBOX
+    # media doar pe punctele din țară: un punct greșit nu trebuie să mute centrul
+    fallback = dict(((rid, (lat, lon)) for rid, lat, lon in
+                     Occurrence.objects
+                     .filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+                     .values("reserve_id")
+                     .annotate(lat=Avg("latitude"), lon=Avg("longitude"))
+                     .values_list("reserve_id", "lat", "lon")))
+    rows = list(Reserve.objects.order_by("pk").values_list("pk", "latitude", "longitude", "suprafata_ha"))
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lat = np.full(len(rows), np.nan)
+    lon = np.full(len(rows), np.nan)
+    threshold = np.full(len(rows), FAR_MIN_KM)
+    for i, (pk, rlat, rlon, area_ha) in enumerate(rows):
+        if rlat is not None and rlon is not None:
+            lat[i], lon[i] = float(rlat), float(rlon)
+        elif pk in fallback:
+            lat[i], lon[i] = (float(v) for v in fallback[pk])
+        if area_ha:
+            threshold[i] += FAR_RADIUS_FACTOR * np.sqrt(float(area_ha) / 100.0 / np.pi)
+    return ids, lat, lon, threshold
+
+
+def classify(lat, lon, clat, clon, threshold):
+    """(kind, distanță_km) pentru fiecare punct; kind e "" pentru punctele fără probleme."""
+    distance = haversine_km_np(lat, lon, clat, clon)
+    swapped_distance = haversine_km_np(lon, lat, clat, clon)
+    has_centre = ~np.isnan(clat)
+    inside = _inside(lat, lon)
+    swapped_inside = _inside(lon, lat)
+
+    far = has_centre & (distance > threshold)
+    swapped = np.where(has_centre,
+                       (far | ~inside) & (swapped_distance <= threshold) & swapped_inside,
+                       ~inside & swapped_inside)
+    kind = np.full(len(lat), "", dtype=object)
+    kind[far & ~swapped] = CoordinateIssue.KIND_FAR
+    kind[~inside & ~swapped] = CoordinateIssue.KIND_OUT_OF_BOUNDS
+    kind[swapped] = CoordinateIssue.KIND_SWAPPED
+    return kind, np.where(has_centre, distance, np.nan)
+
+
+def _chunks(chunk_size):
+    """Loturi (ids, reserve_ids, lat, lon) de ocurențe cu coordonate, în ordinea id-ului."""
+    last = 0
+    base = (Occurrence.objects
+            .filter(latitude__isnull=False, longitude__isnull=False)
+            .order_by("id")
+            .values_list("id", "reserve_id", "latitude", "longitude"))
+    while True:
+        rows = list(base.filter(id__gt=last)[:chunk_size])
+        if not rows:
+            return
+        data = np.array(rows, dtype=float)
+        yield last, data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2], data[:, 3]
+        last = int(rows[-1][0])
+
+
+@transaction.atomic
+def scan(chunk_size=CHUNK_SIZE) -> dict:
+    """Rescanează toate ocurențele; întoarce {kind: nr. probleme} și numărul de rânduri eliminate."""
+    ids_sorted, c_lat, c_lon, c_thr = reserve_centroids()
+    counts = {kind: 0 for kind, _ in CoordinateIssue.KIND_CHOICES}
+    removed = 0
+    last_id = 0
+    for low, ids, reserve_ids, lat, lon in _chunks(chunk_size):
+        pos = np.searchsorted(ids_sorted, reserve_ids)
+        kind, distance = classify(lat, lon, c_lat[pos], c_lon[pos], c_thr[pos])
+
+        flagged = np.nonzero(kind != "")[0]
+        issues = []
+        for i in flagged:
+            swapped = kind[i] == CoordinateIssue.KIND_SWAPPED
+            issues.append(CoordinateIssue(
+                occurrence_id=int(ids[i]), kind=kind[i],
+                distance_km=None if np.isnan(distance[i]) else round(float(distance[i]), 3),
+                threshold_km=round(float(c_thr[pos[i]]), 3),
+                suggested_latitude=round(float(lon[i]), 6) if swapped else None,
+                suggested_longitude=round(float(lat[i]), 6) if swapped else None,
+            ))
+            counts[kind[i]] += 1
+        if issues:
+            CoordinateIssue.objects.bulk_create(
+                issues, batch_size=2000, update_conflicts=True, unique_fields=["occurrence"],
+                update_fields=["kind", "distance_km", "threshold_km", "suggested_latitude",
+                               "suggested_longitude", "updated_at"],
+            )
+        last_id = int(ids[-1])
+        # problemele corectate din intervalul lotului (inclusiv ocurențe rămase fără coordonate)
+        removed += (CoordinateIssue.objects
+                    .filter(occurrence_id__gt=low, occurrence_id__lte=last_id)
+                    .exclude(occurrence_id__in=[int(ids[i]) for i in flagged])
+                    .delete()[0])
+    removed += CoordinateIssue.objects.filter(occurrence_id__gt=last_id).delete()[0]
+    return {"issues": counts, "removed": removed}
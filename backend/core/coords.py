@@ -0,0 +1,181 @@
+# core/coords.py
+"""Parsarea coordonatelor din fișierele de import (rezervații, situri, ocurențe).
+
+Formate acceptate pentru o pereche (lat, lon) într-un singur câmp:
+  - '46.678361, 28.228158' / '46.678361 28.228158'   (decimal; calea rapidă)
+  - '47°04′N 28°30′E' / '46.678361°N 28.228158°E'    (DMS sau zecimal cu emisferă)
+  - orice alt text din care se pot extrage primele două numere (lat, lon)
+și pentru o singură valoare (coloane separate latitudine/longitudine): '47.1', '47,1', '47°04′N'.
+
+CoordinateParser ține un cache pe textul brut (fișierele repetă des aceleași coordonate) și
+statistici pe formatul potrivit; parse_many parsează o coloană întreagă, fiecare valoare
+distinctă o singură dată:
+
+  parser = CoordinateParser()
+  pairs = parser.parse_many(row["Coordonate"] for row in rows)
+  parser.stats   # Counter({"decimal": 120, "dms": 30, "empty": 15, "cached": 4, ...})
+"""
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+Pair = Tuple[Optional[float], Optional[float]]
+
+# formate raportate în CoordinateParser.stats
+FORMAT_EMPTY = "empty"
+FORMAT_DECIMAL = "decimal"
+FORMAT_DMS = "dms"
+FORMAT_LOOSE = "loose"
+FORMAT_INVALID = "invalid"
+CACHED = "cached"
+
+CACHE_SIZE = 50_000
+
+
+def _to_float(deg: str, minute: Optional[str], sec: Optional[str], hemi: str) -> float:
+    """deg/min/sec + emisfera (N/S/E/W) -> grade zecimale cu semn corect"""
+    def _f(x):
+        return float(str(x).replace(",", ".")) if x is not None and str(x).strip() != "" else 0.0
+
+    val = abs(_f(deg)) + _f(minute) / 60.0 + _f(sec) / 3600.0
+    if hemi.upper() in ("S", "W"):
+        val = -val
+    return val
+
+
+# Regex pentru lat/lon cu DMS sau zecimal + literă emisferă.
+# Exemple potrivite: 47°04′N, 46.678361°N, 28°30′E, 28.228158°E
+_DMS = r"""
+    (?P<deg>[+-]?\d+(?:[.,]\d+)?)
+    \s*(?:°|º)?\s*
+    (?:
+       (?P<min>[0-5]?\d(?:[.,]\d+)?)\s*(?:′|’|\'|m)?
+       \s*
+       (?:
+          (?P<sec>[0-5]?\d(?:[.,]\d+)?)\s*(?:″|\"|s)?
+       )?
+    )?
+    \s*(?P<hemi>[{hemi}])
+"""
+DMS_LAT = re.compile(_DMS.format(hemi="NSns"), re.VERBOSE)
+DMS_LON = re.compile(_DMS.format(hemi="EWew"), re.VERBOSE)
+
+_SEPARATORS = re.compile(r"[\s,;]+")
+_DEGREE_SIGNS = re.compile(r"[°º]")
+
+
+def _valid(lat, lon) -> bool:
+    return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
+
+
+def _dms(match) -> float:
+    return _to_float(match.group("deg"), match.group("min"), match.group("sec"), match.group("hemi"))
+
+
+def _parse_pair(txt: str) -> Tuple[Pair, str]:
+    """((lat, lon), format) pentru un text nevid, deja curățat de spații la capete."""
+    # 1) calea rapidă: exact două numere zecimale (nu pot conține litere de emisferă,
+    #    deci rezultatul e identic cu al regex-urilor DMS de mai jos, doar mai ieftin)
+    parts = _SEPARATORS.split(txt)
+    if len(parts) == 2:
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+        else:
+            if _valid(lat, lon):
+                return (lat, lon), FORMAT_DECIMAL
+
+    # 2) modele cu emisferă (N/S/E/W)
+    lat_m = DMS_LAT.search(txt)
+    lon_m = DMS_LON.search(txt) if lat_m else None
+    if lat_m and lon_m:
+        lat, lon = _dms(lat_m), _dms(lon_m)
+        if _valid(lat, lon):
+            return (lat, lon), FORMAT_DMS
+
+    # 3) fără emisferă: primele două numere (lat, lon), separate de virgulă / spațiu / ';'
+    #    (presupunem N/E => semne pozitive; ° apare uneori doar decorativ)
+    floats = []
+    for p in _SEPARATORS.split(_DEGREE_SIGNS.sub("", txt)):
+        try:
+            floats.append(float(p.replace(",", ".")))
+        except ValueError:
+            continue
+        if len(floats) == 2:
+            break
+    if len(floats) == 2 and _valid(*floats):
+        return (floats[0], floats[1]), FORMAT_LOOSE
+
+    return (None, None), FORMAT_INVALID
+
+
+def _parse_value(txt: str, axis: str) -> Tuple[Optional[float], str]:
+    """(valoare, format) pentru o singură coordonată; axis = "lat" | "lon"."""
+    limit = 90.0 if axis == "lat" else 180.0
+    try:
+        val = float(txt.replace(",", "."))
+    except ValueError:
+        m = (DMS_LAT if axis == "lat" else DMS_LON).fullmatch(txt)
+        if m:
+            val = _dms(m)
+            if -limit <= val <= limit:
+                return val, FORMAT_DMS
+        return None, FORMAT_INVALID
+    if -limit <= val <= limit:
+        return val, FORMAT_DECIMAL
+    return None, FORMAT_INVALID
+
+
+class CoordinateParser:
+    """Parser cu cache pe textul brut și statistici pe format (o instanță per import)."""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self.stats = Counter()
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        hit = self._cache.get(key)
+        if hit is not None:
+            self.stats[CACHED] += 1
+        else:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            hit = self._cache[key] = compute()
+        self.stats[hit[1]] += 1
+        return hit[0]
+
+    def parse(self, raw) -> Pair:
+        """(lat, lon) dintr-un singur câmp, sau (None, None)."""
+        txt = str(raw).strip() if raw is not None else ""
+        if not txt:
+            self.stats[FORMAT_EMPTY] += 1
+            return None, None
+        return self._cached(txt, lambda: _parse_pair(txt))
+
+    def parse_value(self, raw, axis: str) -> Optional[float]:
+        """O singură coordonată (axis = "lat" | "lon") dintr-o coloană separată, sau None."""
+        txt = str(raw).strip() if raw is not None else ""
+        if not txt:
+            self.stats[FORMAT_EMPTY] += 1
+            return None
+        return self._cached((axis, txt), lambda: _parse_value(txt, axis))
+
+    def parse_many(self, values: Iterable) -> List[Pair]:
+        """Parsează o coloană întreagă de perechi; fiecare text distinct e parsat o singură dată."""
+        return [self.parse(v) for v in values]
+
+    def parse_many_values(self, values: Iterable, axis: str) -> List[Optional[float]]:
+        """Ca parse_many, pentru o coloană de valori simple (latitudine sau longitudine)."""
+        return [self.parse_value(v, axis) for v in values]
+
+    def summary(self) -> str:
+        """Statisticile într-un rând, pentru mesajele comenzilor de import."""
+        return ", ".join(f"{k}={v}" for k, v in sorted(self.stats.items()))
+
+
+def parse_coords(raw) -> Pair:
+    """(lat, lon) dintr-un singur câmp, fără cache; pentru apeluri izolate."""
+    txt = str(raw).strip() if raw is not None else ""
+    return _parse_pair(txt)[0] if txt else (None, None)
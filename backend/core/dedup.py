@@ -0,0 +1,248 @@
+# core/dedup.py
+"""Detectarea ocurențelor aproape duplicate (DuplicateCluster / DuplicateMember, vizibile în admin).
+
+Aceeași plantă introdusă de doi observatori / din două surse apare cu coordonate sau ani ușor
+diferiți; constrângerea unică (specie, rezervație, an) nu le prinde. Comparația nu e pe toate
+perechile (O(n²)), ci pe blocuri:
+  - ocurențele cu coordonate sunt citite în flux, ordonate după specie -> un bloc per specie;
+  - în bloc, fiecare punct primește o celulă (lat, lon, an) cu latura >= pragurile
+    (MAX_DISTANCE_KM, MAX_YEAR_GAP), deci o pereche validă e mereu în aceeași celulă sau
+    într-una vecină; se compară doar celulele vecine (jumătate din vecini, fără dubluri);
+  - perechile candidate și distanțele lor se generează vectorizat (NumPy), pe loturi.
+Scorul unei perechi (0..1) combină distanța și diferența de ani; perechile cu scor >= MIN_SCORE
+sunt unite în grupuri (union-find). Ocurențele fără coordonate nu sunt comparate.
+"""
+import hashlib
+from itertools import product
+
+import numpy as np
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .geo import EARTH_RADIUS_KM, haversine_km_np
+from .models import DuplicateCluster, DuplicateMember, Occurrence
+
+MAX_DISTANCE_KM = 1.0
+MAX_YEAR_GAP = 2
+MIN_SCORE = 0.5
+DISTANCE_WEIGHT = 0.7  # restul (0.3) revine diferenței de ani
+CELL_MARGIN = 1 + 1e-9  # rotunjirea float la marginea celulei nu trebuie să piardă perechi aflate exact la prag
+CHUNK_SIZE = 20_000
+MAX_BATCH_PAIRS = 2_000_000  # perechi de puncte comparate odată (memorie mărginită la celule foarte dense)
+
+# celula însăși + jumătate din cei 26 de vecini 3D: fiecare pereche de celule e vizitată o singură dată
+HALF_OFFSETS = [off for off in product((-1, 0, 1), repeat=3) if off > (0, 0, 0)]
+
+
+def _species_blocks(chunk_size=CHUNK_SIZE):
+    """Generator (species_id, ids, lat, lon, year) cu array-uri NumPy, o specie odată."""
+    qs = (Occurrence.objects
+          .filter(latitude__isnull=False, longitude__isnull=False)
+          .order_by("species_id", "id")
+          .values_list("species_id", "id", Cast("latitude", FloatField()), Cast("longitude", FloatField()), "year"))
+    current, rows = None, []
+    for species_id, *row in qs.iterator(chunk_size=chunk_size):
+        if species_id != current and rows:
+            yield current, *_columns(rows)
+            rows = []
+        current = species_id
+        rows.append(row)
+    if rows:
+        yield current, *_columns(rows)
+
+
+def _columns(rows):
+    data = np.array(rows, dtype=float)
+    return data[:, 0].astype(np.int64), data[:, 1], data[:, 2], data[:, 3].astype(np.int64)
+
+
+def _cells(lat, lon, year, max_km, max_gap):
+    """(ordinea punctelor sortate pe celulă, codurile celulelor distincte, începutul și mărimea fiecăreia,
+    funcția offset -> cod). Celula (lat, lon, an) are latura >= pragurile; codul e un singur int64."""
+    # pe sferă (aceeași rază ca haversine_km_np): d >= R·Δφ, deci latura în latitudine e exact unghiul max_km / R
+    half = max_km / (2 * EARTH_RADIUS_KM)
+    dlat = np.degrees(2 * half) * CELL_MARGIN
+    # d >= 2R·asin(cos φ_max · sin(Δλ/2)), cu φ_max latitudinea cea mai mare (în modul) din bloc:
+    # acolo gradul de longitudine e cel mai scurt, iar arcul mare e puțin sub lungimea pe paralelă
+    cos_max = max(np.cos(np.radians(np.abs(lat).max())), 0.01)
+    dlon = np.degrees(2 * np.arcsin(min(1.0, np.sin(half) / cos_max))) * CELL_MARGIN
+    keys = [np.floor(lat / dlat).astype(np.int64), np.floor(lon / dlon).astype(np.int64), year // (max_gap + 1)]
+    # deplasare cu 1 și câte o celulă liberă la capete: codul vecinului = cod + offset, fără suprapuneri
+    keys = [k - k.min() + 1 for k in keys]
+    spans = [int(k.max()) + 2 for k in keys]
+    code = (keys[0] * spans[1] + keys[1]) * spans[2] + keys[2]
+    order = np.argsort(code, kind="stable")
+    codes, starts, counts = np.unique(code[order], return_index=True, return_counts=True)
+
+    def offset(off):
+        return (off[0] * spans[1] + off[1]) * spans[2] + off[2]
+
+    return order, codes, starts, counts, offset
+
+
+def _cell_pairs(a_start, a_count, b_start, b_count):
+    """Toate perechile (poziție în a, poziție în b) pentru perechile de celule date, vectorizat."""
+    sizes = a_count * b_count
+    total = int(sizes.sum())
+    first = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    r = np.arange(total) - first
+    b_width = np.repeat(b_count, sizes)
+    return np.repeat(a_start, sizes) + r // b_width, np.repeat(b_start, sizes) + r % b_width
+
+
+def _batches(sizes, limit=MAX_BATCH_PAIRS):
+    """Felii [start, stop) peste perechile de celule, cu cel mult ~limit perechi de puncte fiecare."""
+    bounds = np.searchsorted(np.cumsum(sizes), np.arange(limit, int(sizes.sum()), limit), side="right")
+    edges = [0, *sorted(set(bounds.tolist())), len(sizes)]
+    return [(lo, hi) for lo, hi in zip(edges, edges[1:]) if hi > lo]
+
+
+def candidate_pairs(lat, lon, year, max_km=MAX_DISTANCE_KM, max_gap=MAX_YEAR_GAP):
+    """(i, j, distanță_km, diferență_ani, nr. perechi comparate) pentru perechile dintr-un bloc
+    aflate la cel mult max_km și max_gap ani (i < j, indici în bloc)."""
+    order, codes, starts, counts, offset = _cells(lat, lon, year, max_km, max_gap)
+    found, compared = [], 0
+
+    for off in [(0, 0, 0), *HALF_OFFSETS]:
+        if off == (0, 0, 0):
+            a = b = np.flatnonzero(counts > 1)
+        else:
+            target = codes + offset(off)
+            pos = np.minimum(np.searchsorted(codes, target), len(codes) - 1)
+            a = np.flatnonzero(codes[pos] == target)
+            b = pos[a]
+        if not len(a):
+            continue
+        for lo, hi in _batches(counts[a] * counts[b]):
+            pa, pb = _cell_pairs(starts[a[lo:hi]], counts[a[lo:hi]], starts[b[lo:hi]], counts[b[lo:hi]])
+            if off == (0, 0, 0):
+                pa, pb = pa[pa < pb], pb[pa < pb]
+            i, j = order[pa], order[pb]
+            compared += len(i)
+            distance = haversine_km_np(lat[i], lon[i], lat[j], lon[j])
+            gap = np.abs(year[i] - year[j])
+            keep = (distance <= max_km) & (gap <= max_gap)
+            found.append((np.minimum(i, j)[keep], np.maximum(i, j)[keep], distance[keep], gap[keep]))
+
+    if not found:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64), 0
+    i, j, distance, gap = (np.concatenate(col) for col in zip(*found))
+    return i, j, distance, gap, compared
+
+
+def score(distance, gap, max_km=MAX_DISTANCE_KM, max_gap=MAX_YEAR_GAP):
+    """1 = același punct în același an; scade liniar cu distanța și cu diferența de ani."""
+    return (DISTANCE_WEIGHT * (1.0 - distance / max_km)
+            + (1.0 - DISTANCE_WEIGHT) * (1.0 - gap / (max_gap + 1)))
+
+
+def _components(pairs_i, pairs_j):
+    """Union-find peste perechi -> {rădăcină: [indici]}."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(pairs_i.tolist(), pairs_j.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    groups = {}
+    for x in parent:
+        groups.setdefault(find(x), []).append(x)
+    return groups
+
+
+def find_clusters(max_km=MAX_DISTANCE_KM, max_gap=MAX_YEAR_GAP, min_score=MIN_SCORE, chunk_size=CHUNK_SIZE):
+    """(grupuri, nr. perechi comparate); grup = {species_id, members: {occurrence_id: best_score},
+    score, max_distance_km, max_year_gap}."""
+    clusters, compared = [], 0
+    for species_id, ids, lat, lon, year in _species_blocks(chunk_size):
+        if len(ids) < 2:
+            continue
+        i, j, distance, gap, n = candidate_pairs(lat, lon, year, max_km, max_gap)
+        compared += n
+        s = score(distance, gap, max_km, max_gap)
+        keep = s >= min_score
+        i, j, distance, gap, s = i[keep], j[keep], distance[keep], gap[keep], s[keep]
+        if not len(i):
+            continue
+
+        best = {}
+        for a, b, v in zip(i.tolist(), j.tolist(), s.tolist()):
+            best[a] = max(best.get(a, 0.0), v)
+            best[b] = max(best.get(b, 0.0), v)
+        groups = _components(i, j)
+        root_of = {m: root for root, members in groups.items() for m in members}
+        edges = {}
+        for a, d, g, v in zip(i.tolist(), distance.tolist(), gap.tolist(), s.tolist()):
+            e = edges.setdefault(root_of[a], [0.0, 0.0, 0])
+            e[0], e[1], e[2] = max(e[0], v), max(e[1], d), max(e[2], g)
+        for root, members in groups.items():
+            top, far, gap_max = edges[root]
+            clusters.append({
+                "species_id": species_id,
+                "members": {int(ids[m]): round(best[m], 4) for m in members},
+                "score": round(top, 4),
+                "max_distance_km": round(far, 3),
+                "max_year_gap": int(gap_max),
+            })
+    return clusters, compared
+
+
+def _fingerprint(member_ids):
+    return hashlib.md5(",".join(str(m) for m in sorted(member_ids)).encode()).hexdigest()
+
+
+@transaction.atomic
+def detect(max_km=MAX_DISTANCE_KM, max_gap=MAX_YEAR_GAP, min_score=MIN_SCORE, chunk_size=CHUNK_SIZE) -> dict:
+    """Rescanează toate ocurențele și sincronizează grupurile stocate (păstrează `reviewed`
+    pentru grupurile regăsite identic). Întoarce statisticile rulării."""
+    clusters, compared = find_clusters(max_km, max_gap, min_score, chunk_size)
+    fresh = {_fingerprint(c["members"]): c for c in clusters}
+    stored = dict(DuplicateCluster.objects.values_list("fingerprint", "pk"))
+
+    removed = DuplicateCluster.objects.filter(fingerprint__in=stored.keys() - fresh.keys()).delete()[1].get(
+        DuplicateCluster._meta.label, 0)
+
+    now = timezone.now()
+    kept = list(DuplicateCluster.objects
+                .filter(fingerprint__in=fresh.keys() & stored.keys())
+                .prefetch_related("members"))
+    kept_members = []
+    for cluster in kept:
+        c = fresh[cluster.fingerprint]
+        cluster.score, cluster.max_distance_km, cluster.max_year_gap = c["score"], c["max_distance_km"], c["max_year_gap"]
+        cluster.updated_at = now
+        for member in cluster.members.all():
+            member.best_score = c["members"][member.occurrence_id]
+            kept_members.append(member)
+    DuplicateCluster.objects.bulk_update(kept, ["score", "max_distance_km", "max_year_gap", "updated_at"],
+                                         batch_size=1000)
+    DuplicateMember.objects.bulk_update(kept_members, ["best_score"], batch_size=2000)
+
+    new = [
+        DuplicateCluster(species_id=c["species_id"], fingerprint=fp, size=len(c["members"]), score=c["score"],
+                         max_distance_km=c["max_distance_km"], max_year_gap=c["max_year_gap"])
+        for fp, c in fresh.items() if fp not in stored
+    ]
+    DuplicateCluster.objects.bulk_create(new, batch_size=1000)
+    DuplicateMember.objects.bulk_create([
+        DuplicateMember(cluster=cluster, occurrence_id=occ_id, best_score=best)
+        for cluster in new
+        for occ_id, best in fresh[cluster.fingerprint]["members"].items()
+    ], batch_size=2000)
+
+    return {
+        "clusters": len(fresh),
+        "occurrences": sum(len(c["members"]) for c in clusters),
+        "created": len(new),
+        "removed": removed,
+        "pairs_compared": compared,
+    }
@@ -0,0 +1,115 @@
+# core/dossier.py
+"""Dosarul unei rezervații: tot ce știm despre ea, într-un singur răspuns.
+
+  species_by_year       [{year, count, rare_count, species: [{id, name, rare}]}]
+  associations_by_year  [{year, associations: [{id, name}]}]
+  red_book              {categorie: nr. specii distincte}
+  nearest_sites         [{id, code, name, distance_km}]  (primele NEAREST_SITES)
+
+Dosarele sunt precalculate în ReserveDossier, marcate cu versiunea de date a rezervației
+(ReserveDataVersion): o modificare într-o rezervație (ocurențe, asociații, redenumiri de
+specii) reconstruiește doar dosarul ei, la prima cerere sau prin `manage.py build_dossiers`.
+Tabelul (nu cache-ul local al procesului) e sursa, ca invalidarea la editarea siturilor
+să fie vizibilă în toate procesele.
+"""
+from django.contrib.postgres.aggregates import BoolOr
+
+from .models import Occurrence, Reserve, ReserveAssociationYear, ReserveDataVersion, ReserveDossier, Site
+
+NEAREST_SITES = 5
+
+
+def _species_by_year(reserve_id):
+    rows = (Occurrence.objects
+            .filter(reserve_id=reserve_id)
+            .values("year", "species_id", "species__denumire_stiintifica", "species__cartea_rosie_cat")
+            .annotate(rare=BoolOr("effective_rare"))
+            .order_by("year", "species_sort"))
+    years = {}
+    red_book = {}
+    for row in rows:
+        bucket = years.setdefault(row["year"], {"year": row["year"], "count": 0, "rare_count": 0, "species": []})
+        bucket["species"].append({
+            "id": row["species_id"],
+            "name": row["species__denumire_stiintifica"],
+            "rare": row["rare"],
+        })
+        bucket["count"] += 1
+        bucket["rare_count"] += row["rare"]
+        if row["species__cartea_rosie_cat"]:
+            red_book.setdefault(row["species__cartea_rosie_cat"], set()).add(row["species_id"])
+    return list(years.values()), {cat: len(ids) for cat, ids in sorted(red_book.items())}
+
+
+def _associations_by_year(reserve_id):
+    years = {}
+    links = (ReserveAssociationYear.objects
+             .filter(reserve_id=reserve_id)
+             .values_list("year", "association_id", "association__name")
+             .order_by("year", "association__name"))
+    for year, aid, name in links:
+        years.setdefault(year, {"year": year, "associations": []})["associations"].append({"id": aid, "name": name})
+    return list(years.values())
+
+
+def _nearest_sites(reserve, limit=NEAREST_SITES):
+    if reserve.latitude is None or reserve.longitude is None:
+        return []
+    sites = Site.objects.nearest(reserve.latitude, reserve.longitude, k=limit)
+    return [
+        {"id": s.pk, "code": s.code, "name": s.name, "distance_km": round(s.distance_km, 2)}
+        for s in sites.only("id", "code", "name", "latitude", "longitude")
+    ]
+
+
+def build_dossier(reserve: Reserve) -> dict:
+    species_by_year, red_book = _species_by_year(reserve.pk)
+    return {
+        "reserve": {
+            "id": reserve.pk,
+            "name": reserve.name,
+            "raion": reserve.raion,
+            "category": reserve.category,
+            "suprafata_ha": float(reserve.suprafata_ha) if reserve.suprafata_ha is not None else None,
+            "latitude": float(reserve.latitude) if reserve.latitude is not None else None,
+            "longitude": float(reserve.longitude) if reserve.longitude is not None else None,
+        },
+        "species_total": len({s["id"] for y in species_by_year for s in y["species"]}),
+        "species_by_year": species_by_year,
+        "associations_by_year": _associations_by_year(reserve.pk),
+        "red_book": red_book,
+        "nearest_sites": _nearest_sites(reserve),
+    }
+
+
+def rebuild(reserve: Reserve, version: int = None) -> dict:
+    """Reconstruiește și salvează dosarul. Versiunea e citită ÎNAINTE de interogări: o
+    modificare concurentă lasă rândul învechit, nu ascunde schimbarea."""
+    if version is None:
+        version = ReserveDataVersion.current([reserve.pk])[reserve.pk]
+    data = build_dossier(reserve)
+    ReserveDossier.objects.update_or_create(reserve=reserve, defaults={"version": version, "data": data})
+    return data
+
+
+def get_dossier(reserve: Reserve) -> dict:
+    """Dosarul curent: rândul precalculat dacă e la zi, altfel reconstruit (doar pentru această rezervație)."""
+    version = ReserveDataVersion.current([reserve.pk])[reserve.pk]
+    data = (ReserveDossier.objects
+            .filter(reserve_id=reserve.pk, version=version)
+            .values_list("data", flat=True)
+            .first())
+    if data is not None:
+        return data
+    return rebuild(reserve, version)
+
+
+def outdated_reserves():
+    """Rezervațiile fără dosar sau cu dosar mai vechi decât versiunea lor de date."""
+    versions = dict(ReserveDataVersion.objects.values_list("reserve_id", "version"))
+    stored = dict(ReserveDossier.objects.values_list("reserve_id", "version"))
+    return [r for r in Reserve.objects.all() if stored.get(r.pk) != versions.get(r.pk, 0)]
+
+
+def invalidate_all():
+    ReserveDossier.objects.update(version=-1)
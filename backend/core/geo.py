@@ -0,0 +1,157 @@
+# core/geo.py
+"""Utilitare geografice comune: distanțe pe sferă, geohash, KD-tree pentru vecini apropiați."""
+import heapq
+from math import asin, cos, radians, sin, sqrt
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+MOLDOVA_BBOX = (26.6, 45.4, 30.3, 48.5)  # min_lon, min_lat, max_lon, max_lat
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Distanța ortodromică (km) între două puncte date în grade zecimale."""
+    lat1, lon1, lat2, lon2 = (radians(float(v)) for v in (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def haversine_km_np(lat1, lon1, lat2, lon2):
+    """Ca haversine_km, vectorizată pe array-uri NumPy de grade zecimale."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# ------------------------ geohash ------------------------ #
+
+GEOHASH_PRECISION = 9  # ~5 m; prefixele mai scurte acoperă celule tot mai mari
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lon, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash-ul punctului (biții de longitudine și latitudine intercalați, base32)."""
+    lat, lon = float(lat), float(lon)
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch, lon_lo = ch << 1 | 1, mid
+            else:
+                ch, lon_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch << 1 | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits = ch = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int):
+    """(înălțime în grade lat, lățime în grade lon) a unei celule geohash de lungime dată."""
+    total = 5 * precision
+    lon_bits = (total + 1) // 2
+    return 180.0 / (1 << (total - lon_bits)), 360.0 / (1 << lon_bits)
+
+
+def geohash_cover(min_lon, min_lat, max_lon, max_lat, max_cells: int = 32):
+    """Prefixele geohash (cât mai lungi, cel mult `max_cells`) care acoperă bbox-ul.
+
+    Orice punct din bbox are geohash-ul începând cu unul dintre prefixe, deci
+    `geohash LIKE 'p%'` pe indexul B-tree preselectează candidații; filtrul exact
+    pe coordonate rămâne necesar (celulele depășesc bbox-ul).
+    """
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in (min_lon, min_lat, max_lon, max_lat))
+    best = [""]
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        h, w = geohash_cell_size(precision)
+        rows = int((min(max_lat, 90.0) + 90.0) // h) - int((max(min_lat, -90.0) + 90.0) // h) + 1
+        cols = int((min(max_lon, 180.0) + 180.0) // w) - int((max(min_lon, -180.0) + 180.0) // w) + 1
+        if rows * cols > max_cells:
+            break
+        lat0 = (int((max(min_lat, -90.0) + 90.0) // h) + 0.5) * h - 90.0
+        lon0 = (int((max(min_lon, -180.0) + 180.0) // w) + 0.5) * w - 180.0
+        best = sorted({
+            geohash_encode(min(lat0 + r * h, 90.0), min(lon0 + c * w, 180.0), precision)
+            for r in range(rows) for c in range(cols)
+        })
+    return best
+
+
+# ------------------------ KD-tree (haversine) ------------------------ #
+
+def _unit_vector(lat, lon):
+    lat, lon = radians(float(lat)), radians(float(lon))
+    return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2))
+
+
+class PointIndex:
+    """KD-tree în memorie peste puncte (lat, lon), pentru k-cei-mai-apropiați după distanța haversine.
+
+    Punctele sunt proiectate pe sfera unitate (x, y, z): distanța euclidiană (coarda) e
+    monotonă în distanța pe sferă, deci arborele 3D obișnuit dă vecinii corecți.
+    """
+
+    def __init__(self, points):
+        """points: iterabil de (cheie, lat, lon)."""
+        self._keys, self._xyz = [], []
+        for key, lat, lon in points:
+            self._keys.append(key)
+            self._xyz.append(_unit_vector(lat, lon))
+        # noduri: (index punct, axă, stânga, dreapta)
+        self._nodes = []
+        self._root = self._build(list(range(len(self._keys))), 0)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _build(self, idx, depth):
+        if not idx:
+            return -1
+        axis = depth % 3
+        idx.sort(key=lambda i: self._xyz[i][axis])
+        mid = len(idx) // 2
+        node = len(self._nodes)
+        self._nodes.append(None)
+        left = self._build(idx[:mid], depth + 1)
+        right = self._build(idx[mid + 1:], depth + 1)
+        self._nodes[node] = (idx[mid], axis, left, right)
+        return node
+
+    def query(self, lat, lon, k, exclude=None):
+        """[(cheie, distanță_km)] pentru cele mai apropiate k puncte (fără cheia `exclude`)."""
+        target = _unit_vector(lat, lon)
+        best = []  # max-heap pe -d²: (-d², cheie)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            i, axis, left, right = self._nodes[node]
+            p = self._xyz[i]
+            if self._keys[i] != exclude:
+                d2 = (p[0] - target[0]) ** 2 + (p[1] - target[1]) ** 2 + (p[2] - target[2]) ** 2
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, i))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, i))
+            diff = target[axis] - p[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # ramura îndepărtată doar dacă planul de separare e mai aproape decât al k-lea vecin
+            if len(best) < k or diff * diff < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+        ordered = sorted((-neg, i) for neg, i in best)
+        return [(self._keys[i], _chord_to_km(sqrt(d2))) for d2, i in ordered]
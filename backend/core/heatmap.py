@@ -0,0 +1,123 @@
+# core/heatmap.py
+"""Hărți de densitate a ocurențelor pe o grilă fixă (NumPy histogram2d), fără puncte brute.
+
+Filtrele sunt cele din occurrence_query (species, family, class, red_book, reserve, raion,
+year_from, year_to, rare, bbox), plus:
+  decade   ex. 1990 -> year_from=1990, year_to=1999
+  cell     latura celulei în grade (implicit DEFAULT_CELL)
+Extinderea grilei e bbox-ul cerut sau, implicit, dreptunghiul Republicii Moldova; rândul 0
+e cel mai sudic, coloana 0 cea mai vestică.
+
+Grila (uint32) se pune în cache pe semnătura filtrelor + ștampila globală de date
+(ReserveDataVersion), deci se invalidează la orice modificare de ocurențe. Ieșiri:
+  rle     [valoare, lungime, valoare, lungime, ...] peste grila parcursă pe rânduri
+  binary  octeții grilei (little-endian, uint8/uint16/uint32 după maxim)
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from math import ceil
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .geo import MOLDOVA_BBOX
+from .models import ReserveDataVersion
+from .occurrence_query import QueryError, filtered_queryset, parse_filters
+
+DEFAULT_CELL = 0.05
+MIN_CELL = 0.005
+MAX_CELL = 1.0
+MAX_CELLS = 250_000
+HEATMAP_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cell(value):
+    if not value:
+        return Decimal(str(DEFAULT_CELL))
+    try:
+        cell = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise QueryError("Invalid cell")
+    if not cell.is_finite():  # NaN nu se poate compara cu limitele
+        raise QueryError("Invalid cell")
+    if not MIN_CELL <= cell <= MAX_CELL:
+        raise QueryError(f"Invalid cell (expected {MIN_CELL}..{MAX_CELL} degrees)")
+    return cell
+
+
+def parse_params(params):
+    """(filtre canonice, latura celulei) din parametrii GET; ridică QueryError."""
+    params = params.copy() if hasattr(params, "copy") else dict(params)
+    decade = (params.get("decade") or "").strip()
+    if decade:
+        if not decade.isdigit() or int(decade) % 10:
+            raise QueryError("Invalid decade")
+        params["year_from"], params["year_to"] = decade, str(int(decade) + 9)
+    return parse_filters(params), _cell(params.get("cell"))
+
+
+def _grid_shape(bbox, cell):
+    min_lon, min_lat, max_lon, max_lat = (Decimal(v) for v in bbox)
+    width = max(1, ceil((max_lon - min_lon) / cell))
+    height = max(1, ceil((max_lat - min_lat) / cell))
+    if width * height > MAX_CELLS:
+        raise QueryError("Grid too large (increase cell or reduce bbox)")
+    return width, height
+
+
+def compute(filters, cell):
+    """(grila uint32 [height, width], bbox-ul grilei) pentru filtrele date."""
+    bbox = filters["bbox"] or [str(v) for v in MOLDOVA_BBOX]
+    width, height = _grid_shape(bbox, cell)
+    min_lon, min_lat = float(bbox[0]), float(bbox[1])
+    max_lon, max_lat = min_lon + width * float(cell), min_lat + height * float(cell)
+
+    qs = (filtered_queryset({**filters, "bbox": None})
+          .filter(latitude__range=(bbox[1], bbox[3]), longitude__range=(bbox[0], bbox[2]))
+          .order_by()
+          .values_list(Cast("latitude", FloatField()), Cast("longitude", FloatField())))
+    points = np.array(list(qs), dtype=float).reshape(-1, 2)
+    grid, _, _ = np.histogram2d(points[:, 0], points[:, 1], bins=[height, width],
+                                range=[[min_lat, max_lat], [min_lon, max_lon]])
+    return grid.astype(np.uint32), [min_lon, min_lat, round(max_lon, 6), round(max_lat, 6)]
+
+
+def cached_grid(filters, cell):
+    """{"grid", "bbox", "cell"} din cache sau calculat; cheia = semnătura filtrelor + ștampila datelor."""
+    signature = hashlib.md5(json.dumps([filters, str(cell)], sort_keys=True).encode()).hexdigest()
+    key = f"heatmap:{signature}:s{ReserveDataVersion.stamp()}"
+    found = cache.get(key)
+    if found is None:
+        grid, bbox = compute(filters, cell)
+        found = {"grid": grid, "bbox": bbox, "cell": float(cell)}
+        cache.set(key, found, HEATMAP_CACHE_TIMEOUT)
+    return found
+
+
+def rle(grid) -> list:
+    """Run-length pe grila aplatizată (pe rânduri): [valoare, lungime, ...]."""
+    flat = grid.ravel()
+    if not flat.size:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(flat)) + 1))
+    lengths = np.diff(np.append(starts, flat.size))
+    return np.column_stack((flat[starts], lengths)).ravel().tolist()
+
+
+def unrle(values, size) -> np.ndarray:
+    """Inversa lui rle(): grila aplatizată, de lungime `size`."""
+    pairs = np.asarray(values, dtype=np.int64).reshape(-1, 2)
+    flat = np.repeat(pairs[:, 0], pairs[:, 1])
+    if flat.size != size:
+        raise ValueError("RLE size mismatch")
+    return flat
+
+
+def to_bytes(grid):
+    """(octeți, dtype) cu cel mai mic tip întreg fără semn care încape maximul."""
+    peak = int(grid.max()) if grid.size else 0
+    dtype = "uint8" if peak <= 0xFF else "uint16" if peak <= 0xFFFF else "uint32"
+    return grid.astype(np.dtype(dtype).newbyteorder("<")).tobytes(), dtype
@@ -0,0 +1,100 @@
+# core/management/commands/bench_coord_parser.py
+"""Micro-benchmark: core.coords.CoordinateParser vs. vechiul import_reserves.parse_coords.
+
+Coloana de coordonate din CSV e extinsă la --rows rânduri (valorile reale, ciclic, plus perechi
+zecimale sintetice distincte, ca în fișierele mari de ocurențe); ambele implementări parsează
+aceeași listă, iar rezultatele trebuie să coincidă.
+"""
+import csv
+import random
+import re
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.coords import DMS_LAT, DMS_LON, CoordinateParser, _to_float
+
+
+def legacy_parse_coords(raw: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """Implementarea veche din import_reserves (păstrată doar ca referință pentru benchmark)."""
+    if not raw:
+        return None, None
+
+    txt = str(raw).strip()
+
+    lat_m = DMS_LAT.search(txt)
+    lon_m = DMS_LON.search(txt)
+    if lat_m and lon_m:
+        lat = _to_float(lat_m.group("deg"), lat_m.group("min"), lat_m.group("sec"), lat_m.group("hemi"))
+        lon = _to_float(lon_m.group("deg"), lon_m.group("min"), lon_m.group("sec"), lon_m.group("hemi"))
+        if -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0:
+            return lat, lon
+
+    clean = re.sub(r"[°º]", "", txt)
+    parts = re.split(r"[\s,;]+", clean.strip())
+    floats = []
+    for p in parts:
+        try:
+            fv = float(p.replace(",", "."))
+            floats.append(fv)
+        except Exception:
+            continue
+        if len(floats) == 2:
+            break
+    if len(floats) == 2:
+        lat, lon = floats[0], floats[1]
+        if -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0:
+            return lat, lon
+
+    return None, None
+
+
+def sample_values(path: Path, rows: int, unique_share: float, seed: int = 1):
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        real = [row.get("Coordonate") or "" for row in csv.DictReader(f)]
+    if not real:
+        raise CommandError(f"Fără coloana Coordonate în {path}")
+    rnd = random.Random(seed)
+    out = []
+    for i in range(rows):
+        if rnd.random() < unique_share:
+            out.append(f"{rnd.uniform(45.4, 48.5):.6f} {rnd.uniform(26.6, 30.3):.6f}")
+        else:
+            out.append(real[i % len(real)])
+    return out
+
+
+class Command(BaseCommand):
+    help = "Compară viteza parserului de coordonate (core.coords) cu implementarea veche din import_reserves."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default="data/rezervatii_combinate.csv")
+        parser.add_argument("--rows", type=int, default=50_000)
+        parser.add_argument("--unique-share", type=float, default=0.5,
+                            help="Proporția de perechi zecimale sintetice, toate distincte (0..1).")
+
+    def handle(self, *args, **opts):
+        path = Path(opts["file"])
+        if not path.exists():
+            raise CommandError(f"Fișierul nu a fost găsit: {path}")
+        values = sample_values(path, opts["rows"], opts["unique_share"])
+
+        start = time.perf_counter()
+        old = [legacy_parse_coords(v) for v in values]
+        t_old = time.perf_counter() - start
+
+        parser = CoordinateParser()
+        start = time.perf_counter()
+        new = parser.parse_many(values)
+        t_new = time.perf_counter() - start
+
+        mismatches = sum(a != b for a, b in zip(old, new))
+        self.stdout.write(f"rânduri: {len(values)}")
+        self.stdout.write(f"vechi:  {t_old:.3f}s ({len(values) / t_old:,.0f} rânduri/s)")
+        self.stdout.write(f"nou:    {t_new:.3f}s ({len(values) / t_new:,.0f} rânduri/s), x{t_old / t_new:.1f}")
+        self.stdout.write(f"formate: {parser.summary()}")
+        if mismatches:
+            raise CommandError(f"{mismatches} rezultate diferite față de implementarea veche")
+        self.stdout.write(self.style.SUCCESS("Rezultate identice."))
@@ -0,0 +1,19 @@
+# core/management/commands/build_dossiers.py
+from django.core.management.base import BaseCommand
+
+from core.dossier import outdated_reserves, rebuild
+from core.models import Reserve
+
+
+class Command(BaseCommand):
+    help = ("Precalculează dosarele rezervațiilor (ReserveDossier). Implicit reconstruiește doar "
+            "rezervațiile ale căror date s-au schimbat de la ultima rulare.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reconstruiește toate dosarele.")
+
+    def handle(self, *args, **opts):
+        reserves = list(Reserve.objects.all()) if opts["all"] else outdated_reserves()
+        for reserve in reserves:
+            rebuild(reserve)
+        self.stdout.write(self.style.SUCCESS(f"{len(reserves)} dosare reconstruite."))
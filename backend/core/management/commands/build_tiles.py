@@ -0,0 +1,26 @@
+# core/management/commands/build_tiles.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tiles import LAYERS, MAX_ZOOM, MIN_ZOOM, build, tiles_dir
+
+
+class Command(BaseCommand):
+    help = ("Generează tile-urile PNG de densitate pentru harta națională (reserves, sites, rare) în MAP_TILES_DIR. "
+            "Implicit redesenează doar tile-urile ale căror puncte s-au schimbat de la ultima generare.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layer", action="append", choices=LAYERS,
+                            help="Stratul de generat (se poate repeta; implicit toate).")
+        parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+        parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+        parser.add_argument("--all", action="store_true", help="Redesenează toate tile-urile.")
+
+    def handle(self, *args, **opts):
+        min_zoom, max_zoom = opts["min_zoom"], opts["max_zoom"]
+        if not 0 <= min_zoom <= max_zoom <= 18:
+            raise CommandError("Interval de zoom invalid (0 <= min-zoom <= max-zoom <= 18).")
+        for layer in opts["layer"] or LAYERS:
+            r = build(layer, min_zoom, max_zoom, full=opts["all"])
+            self.stdout.write(f"{layer}: {r['written']} scrise, {r['deleted']} șterse, "
+                              f"{r['unchanged']} neschimbate (build {r['build']})")
+        self.stdout.write(self.style.SUCCESS(f"Tile-uri generate în {tiles_dir()}."))
@@ -0,0 +1,22 @@
+# core/management/commands/compute_nearest.py
+from django.core.management.base import BaseCommand
+
+from core.nearby import SOURCES, NearestIndex, refresh, refresh_changed
+
+
+class Command(BaseCommand):
+    help = ("Calculează cele mai apropiate rezervații/situri (NearestLink) pentru ocurențe, rezervații și situri. "
+            "Implicit doar sursele cu coordonate schimbate (sau toate, dacă s-au mutat ținte).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recalculează toate sursele.")
+
+    def handle(self, *args, **opts):
+        index = NearestIndex()
+        if opts["all"]:
+            touched = {source_type: refresh(source_type, index=index) for source_type in SOURCES}
+        else:
+            touched = refresh_changed(index)
+        for source_type, n in touched.items():
+            self.stdout.write(f"{source_type}: {n} rânduri actualizate")
+        self.stdout.write(self.style.SUCCESS("Vecinătăți actualizate."))
@@ -0,0 +1,19 @@
+# core/management/commands/compute_range_metrics.py
+from django.core.management.base import BaseCommand
+
+from core.range_metrics import refresh
+
+
+class Command(BaseCommand):
+    help = ("Calculează EOO (învelitoare convexă) și AOO (celule 2x2 km) per specie, din coordonatele "
+            "ocurențelor. Incremental: doar speciile cu ocurențe modificate în fereastra de ani.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year-from", type=int, help="Primul an inclus (implicit: toți).")
+        parser.add_argument("--year-to", type=int, help="Ultimul an inclus (implicit: toți).")
+        parser.add_argument("--full", action="store_true", help="Recalculează toate speciile.")
+
+    def handle(self, *args, **opts):
+        result = refresh(opts["year_from"], opts["year_to"], full=opts["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['updated']} specii recalculate, {result['deleted']} eliminate."))
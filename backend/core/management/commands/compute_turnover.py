@@ -0,0 +1,166 @@
+# core/management/commands/compute_turnover.py
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import CharField, Count
+from django.db.models.functions import Cast, MD5
+
+from core.models import Occurrence, ReserveYearTurnover
+
+
+# ------------------------ helpers ------------------------ #
+
+def partition_fingerprints():
+    """{(reserve_id, year): (species_count, md5)} pentru fiecare partiție din Occurrence.
+
+    Un singur GROUP BY; md5-ul listei sortate de species_id detectează orice
+    adăugare/ștergere/mutare de rânduri, inclusiv importuri în masă.
+    """
+    qs = (Occurrence.objects
+          .values("reserve_id", "year")
+          .annotate(
+              n=Count("species_id"),
+              fp=MD5(StringAgg(Cast("species_id", CharField()), ",", order_by="species_id")),
+          )
+          .values_list("reserve_id", "year", "n", "fp"))
+    return {(rid, y): (n, fp) for rid, y, n, fp in qs}
+
+
+def diff_sorted(prev, cur):
+    """Diferența a două liste sortate de id-uri, într-o singură trecere.
+    Întoarce (gained, lost, retained_count)."""
+    gained, lost = [], []
+    retained = 0
+    i = j = 0
+    while i < len(prev) and j < len(cur):
+        a, b = prev[i], cur[j]
+        if a == b:
+            retained += 1
+            i += 1
+            j += 1
+        elif a < b:
+            lost.append(a)
+            i += 1
+        else:
+            gained.append(b)
+            j += 1
+    lost.extend(prev[i:])
+    gained.extend(cur[j:])
+    return gained, lost, retained
+
+
+def affected_partitions(current, stored, full=False):
+    """Partițiile (rezervație, an) al căror rând de turnover trebuie recalculat.
+
+    O partiție modificată își afectează propriul rând și rândul anului
+    inventariat imediat următor (pentru care devine „anul anterior”).
+    Cu full=True toate partițiile curente sunt considerate modificate.
+    """
+    years_by_reserve = {}
+    for rid, y in sorted(current):
+        years_by_reserve.setdefault(rid, []).append(y)
+
+    dirty = set(current) if full else {k for k, v in current.items() if stored.get(k) != v}
+    dirty |= {k for k in stored if k not in current}
+
+    affected = set()
+    for rid, y in dirty:
+        years = years_by_reserve.get(rid, [])
+        if (rid, y) in current:
+            affected.add((rid, y))
+        nxt = bisect_right(years, y)
+        if nxt < len(years):
+            affected.add((rid, years[nxt]))
+    return affected, years_by_reserve
+
+
+def prev_year(years, y):
+    idx = bisect_left(years, y)
+    return years[idx - 1] if idx > 0 else None
+
+
+def load_species_sets(keys):
+    """{(reserve_id, year): [species_id sortate]} pentru partițiile cerute, dintr-o singură trecere."""
+    if not keys:
+        return {}
+    rids = {rid for rid, _ in keys}
+    years = {y for _, y in keys}
+    qs = (Occurrence.objects
+          .filter(reserve_id__in=rids, year__in=years)
+          .order_by("reserve_id", "year", "species_id")
+          .values_list("reserve_id", "year", "species_id"))
+    out = {}
+    for key, grp in groupby(qs.iterator(chunk_size=5000), key=lambda t: (t[0], t[1])):
+        if key in keys:
+            out[key] = [sid for _, _, sid in grp]
+    return out
+
+
+# ------------------------ comanda ------------------------ #
+
+class Command(BaseCommand):
+    help = ("Calculează turnover-ul speciilor (apărute/dispărute/păstrate) între anii consecutivi "
+            "de inventariere ai fiecărei rezervații. Incremental: doar partițiile modificate.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recalculează toate partițiile.")
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        current = partition_fingerprints()
+        # rândurile stocate se citesc și cu --full: altfel partițiile dispărute nu s-ar mai șterge
+        stored = {
+            (rid, y): (n, fp)
+            for rid, y, n, fp in ReserveYearTurnover.objects.values_list(
+                "reserve_id", "year", "species_count", "fingerprint")
+        }
+
+        affected, years_by_reserve = affected_partitions(current, stored, full=opts["full"])
+
+        # partiții dispărute (nu mai există nicio ocurență pe (rezervație, an))
+        removed = [k for k in stored if k not in current]
+        deleted = 0
+        for rid, y in removed:
+            deleted += ReserveYearTurnover.objects.filter(reserve_id=rid, year=y).delete()[0]
+
+        needed = set(affected)
+        prev_of = {}
+        for rid, y in affected:
+            py = prev_year(years_by_reserve[rid], y)
+            prev_of[(rid, y)] = py
+            if py is not None:
+                needed.add((rid, py))
+        sets = load_species_sets(needed)
+
+        objs = []
+        for rid, y in sorted(affected):
+            cur = sets.get((rid, y), [])
+            py = prev_of[(rid, y)]
+            if py is None:
+                gained, lost, retained = [], [], 0
+            else:
+                gained, lost, retained = diff_sorted(sets.get((rid, py), []), cur)
+            objs.append(ReserveYearTurnover(
+                reserve_id=rid, year=y, prev_year=py,
+                species_count=len(cur),
+                gained=gained, lost=lost,
+                gained_count=len(gained), lost_count=len(lost), retained_count=retained,
+                fingerprint=current[(rid, y)][1],
+            ))
+
+        if objs:
+            ReserveYearTurnover.objects.bulk_create(
+                objs, batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["reserve", "year"],
+                update_fields=["prev_year", "species_count", "gained", "lost",
+                               "gained_count", "lost_count", "retained_count",
+                               "fingerprint", "computed_at"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Turnover: partiții={len(current)}, recalculate={len(objs)}, șterse={deleted}"
+        ))
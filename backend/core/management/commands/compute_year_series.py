@@ -0,0 +1,28 @@
+# core/management/commands/compute_year_series.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import RaionSummary, YearlyCount
+
+
+class Command(BaseCommand):
+    help = ("Reconciliază rollup-ul anual YearlyCount (specie/rezervație/raion/asociație/habitat) "
+            "și rollup-ul pe raioane RaionSummary (harta choropleth). "
+            "Scrie doar rândurile schimbate; util după importuri în masă care ocolesc semnalele.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dimension", action="append",
+            choices=[d for d, _ in YearlyCount.DIMENSION_CHOICES],
+            help="Doar dimensiunea dată (se poate repeta). Implicit: toate.",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        dimensions = opts["dimension"] or [d for d, _ in YearlyCount.DIMENSION_CHOICES]
+        for dim in dimensions:
+            touched = YearlyCount.refresh(dim)
+            self.stdout.write(f"{dim}: {touched} rânduri actualizate")
+        if not opts["dimension"] or "raion" in dimensions:
+            self.stdout.write(f"choropleth raioane: {RaionSummary.refresh()} rânduri actualizate")
+        self.stdout.write(self.style.SUCCESS("Rollup anual reconciliat."))
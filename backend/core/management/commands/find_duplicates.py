@@ -0,0 +1,21 @@
+# core/management/commands/find_duplicates.py
+from django.core.management.base import BaseCommand
+
+from core.dedup import MAX_DISTANCE_KM, MAX_YEAR_GAP, MIN_SCORE, detect
+
+
+class Command(BaseCommand):
+    help = ("Caută ocurențe aproape duplicate (aceeași specie, puncte apropiate, ani apropiați) prin blocare "
+            "pe specie și celulă spațială; scrie grupurile candidate în DuplicateCluster (vizibil în admin).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-km", type=float, default=MAX_DISTANCE_KM, help="Distanța maximă (km).")
+        parser.add_argument("--max-years", type=int, default=MAX_YEAR_GAP, help="Diferența maximă de ani.")
+        parser.add_argument("--min-score", type=float, default=MIN_SCORE, help="Scorul minim al unei perechi (0..1).")
+
+    def handle(self, *args, **opts):
+        r = detect(max_km=opts["max_km"], max_gap=opts["max_years"], min_score=opts["min_score"])
+        self.stdout.write(f"perechi comparate: {r['pairs_compared']}")
+        self.stdout.write(f"grupuri: {r['clusters']} ({r['occurrences']} ocurențe), "
+                          f"noi: {r['created']}, eliminate: {r['removed']}")
+        self.stdout.write(self.style.SUCCESS("Detectare duplicate terminată."))
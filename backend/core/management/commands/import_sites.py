@@ -1,6 +1,7 @@
 import csv
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
+from core.coords import CoordinateParser
 from core.models import Site
 
 def clean(s):
@@ -65,6 +66,7 @@ class Command(BaseCommand):
         }
 
         created = updated = skipped = 0
+        parser = CoordinateParser()  # acceptă și virgulă zecimală / DMS cu emisferă
 
         with path.open("r", encoding="utf-8", newline="") as f:
             reader = csv.DictReader(f)
@@ -86,10 +88,8 @@ class Command(BaseCommand):
                     other_species_count = to_int(row.get("alte_specii"), default=0)
                     habitats_count      = to_int(row.get("habitate"), default=0)
 
-                    latitude  = clean(row.get("latitudine"))
-                    longitude = clean(row.get("longitudine"))
-                    lat = None if latitude == "" else to_float(latitude, default=None)
-                    lon = None if longitude == "" else to_float(longitude, default=None)
+                    lat = parser.parse_value(row.get("latitudine"), "lat")
+                    lon = parser.parse_value(row.get("longitudine"), "lon")
 
                     ste  = to_bool(row.get("STE"), default=False)
                     conj = to_bool(row.get("CONJ"), default=False)
@@ -128,3 +128,4 @@ class Command(BaseCommand):
                 f"Site-uri: create={created}, actualizate={updated}, sărite={skipped}"
             )
         )
+        self.stdout.write(f"Coordonate: {parser.summary()}")
@@ -0,0 +1,22 @@
+# core/management/commands/refresh_saved_filters.py
+from django.core.management.base import BaseCommand
+
+from core.models import ReserveDataVersion, SavedFilter
+from core.saved_filters import refresh_snapshot, stale_filters
+
+
+class Command(BaseCommand):
+    help = ("Reîmprospătează snapshot-urile filtrelor salvate ale căror date s-au schimbat "
+            "(ștampila ReserveDataVersion diferă). Gândită pentru cron, ex. la fiecare 10 minute.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Toate filtrele cu snapshot, nu doar cele învechite.")
+
+    def handle(self, *args, **opts):
+        stamp = ReserveDataVersion.stamp()
+        qs = SavedFilter.objects.filter(snapshot_enabled=True) if opts["all"] else stale_filters(stamp)
+        n = 0
+        for sf in qs.iterator():
+            refresh_snapshot(sf, stamp)
+            n += 1
+        self.stdout.write(self.style.SUCCESS(f"Filtre salvate reîmprospătate: {n}"))
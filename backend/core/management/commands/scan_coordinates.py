@@ -0,0 +1,18 @@
+# core/management/commands/scan_coordinates.py
+from django.core.management.base import BaseCommand
+
+from core.coord_quality import CHUNK_SIZE, scan
+
+
+class Command(BaseCommand):
+    help = ("Verifică coordonatele ocurențelor față de centrul rezervației (lat/lon inversate, puncte în afara "
+            "țării sau prea departe) și scrie rezultatele în CoordinateIssue (vizibil în admin).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rânduri per lot.")
+
+    def handle(self, *args, **opts):
+        result = scan(chunk_size=opts["chunk_size"])
+        for kind, n in result["issues"].items():
+            self.stdout.write(f"{kind}: {n}")
+        self.stdout.write(self.style.SUCCESS(f"Scanare terminată; {result['removed']} probleme rezolvate eliminate."))
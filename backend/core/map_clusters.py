@@ -0,0 +1,152 @@
+# core/map_clusters.py
+"""Date pentru hărți: clustere pe grilă, calculate pe server, per tile (Web Mercator z/x/y).
+
+Fiecare tile e împărțit în GRID x GRID celule; punctele dintr-o celulă devin un singur
+feature (număr + centroid). Un viewport acoperă cel mult MAX_TILES tile-uri, deci răspunsul
+are cel mult MAX_TILES * GRID² feature-uri, indiferent de volumul datelor.
+
+Clusterele sunt puse în cache per (strat, filtre, ștampilă de date, z/x/y); tile-urile lipsă
+din cache se calculează împreună, într-o singură interogare GROUP BY pe celulă.
+Straturi: occurrences (filtrabil ca în occurrence_query), reserves, sites.
+"""
+import hashlib
+import json
+from math import atan, cos, degrees, floor, log, pi, radians, sinh, tan
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import CharField, Count, F, Max, Value
+from django.db.models.functions import Concat
+
+from .models import Reserve, ReserveDataVersion, Site
+from .occurrence_query import QueryError, _bbox, filtered_queryset, parse_filters
+
+GRID = 8
+MAX_ZOOM = 18
+MAX_TILES = 36
+MAX_LAT = 85.05112878
+CLUSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+LAYERS = ("occurrences", "reserves", "sites")
+
+
+# ------------------------ tile math ------------------------ #
+
+def _tile_x(lon, zoom):
+    return (lon + 180.0) / 360.0 * (1 << zoom)
+
+
+def _tile_y(lat, zoom):
+    lat = radians(max(-MAX_LAT, min(MAX_LAT, lat)))
+    return (1.0 - log(tan(lat) + 1.0 / cos(lat)) / pi) / 2.0 * (1 << zoom)
+
+
+def tile_bounds(zoom, x, y):
+    """(min_lon, min_lat, max_lon, max_lat) pentru tile-ul z/x/y."""
+    n = 1 << zoom
+
+    def lat(ty):
+        return degrees(atan(sinh(pi * (1 - 2 * ty / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tiles_for_bbox(bbox, zoom):
+    """Tile-urile (x, y) care acoperă bbox-ul [min_lon, min_lat, max_lon, max_lat]."""
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox)
+    last = (1 << zoom) - 1
+    x0, x1 = (max(0, min(last, floor(_tile_x(v, zoom)))) for v in (min_lon, max_lon))
+    y0, y1 = (max(0, min(last, floor(_tile_y(v, zoom)))) for v in (max_lat, min_lat))
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+# ------------------------ straturi ------------------------ #
+
+def _layer_source(layer, params):
+    """(qs cu coloanele id/latitude/longitude/label, semnătura filtrelor, ștampila datelor)."""
+    if layer == "occurrences":
+        params = {k: v for k, v in params.items() if k != "bbox"}
+        filters = parse_filters(params)
+        qs = filtered_queryset(filters).annotate(
+            label=Concat("species__denumire_stiintifica", Value(" — "), "reserve__name",
+                         output_field=CharField()),
+        )
+        return qs, json.dumps(filters, sort_keys=True), f"s{ReserveDataVersion.stamp()}"
+
+    model = Reserve if layer == "reserves" else Site
+    agg = model.objects.aggregate(n=Count("id"), m=Max("updated_at"))
+    stamp = f"{agg['n']}-{agg['m'].timestamp() if agg['m'] else 0}"
+    return model.objects.annotate(label=F("name")), "", stamp
+
+
+def _compute_tiles(qs, zoom, tiles):
+    """{(x, y): [feature]} pentru tile-urile date, într-o singură interogare."""
+    out = {t: [] for t in tiles}
+    bounds = [tile_bounds(zoom, x, y) for x, y in tiles]
+    min_lon = min(b[0] for b in bounds)
+    min_lat = min(b[1] for b in bounds)
+    max_lon = max(b[2] for b in bounds)
+    max_lat = max(b[3] for b in bounds)
+    qs = (qs.filter(latitude__isnull=False, longitude__isnull=False,
+                    latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+          .order_by()
+          .values("id", "latitude", "longitude", "label"))
+    try:
+        inner_sql, inner_params = qs.query.sql_with_params()
+    except EmptyResultSet:
+        return out
+
+    cells = (1 << zoom) * GRID
+    sql = f"""
+        WITH p AS ({inner_sql}),
+        c AS (
+            SELECT p.id, p.latitude, p.longitude, p.label,
+                   FLOOR((p.longitude::float8 + 180.0) / 360.0 * %s)::int AS cx,
+                   FLOOR((1.0 - LN(TAN(RADIANS(p.latitude::float8)) + 1.0 / COS(RADIANS(p.latitude::float8))) / PI())
+                         / 2.0 * %s)::int AS cy
+            FROM p
+        )
+        SELECT cx, cy, COUNT(*), AVG(latitude), AVG(longitude), MIN(id), MIN(label)
+        FROM c
+        GROUP BY cx, cy
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*inner_params, cells, cells])
+        rows = cursor.fetchall()
+
+    for cx, cy, n, lat, lon, first_id, label in rows:
+        tile = (cx // GRID, cy // GRID)
+        if tile not in out:
+            continue  # punct pe marginea comună cu un tile vecin, necerut
+        feature = {"lat": round(float(lat), 6), "lon": round(float(lon), 6), "count": n}
+        if n == 1:
+            feature["id"] = first_id
+            feature["label"] = label
+        out[tile].append(feature)
+    return out
+
+
+def clusters(layer, bbox, zoom, params=None):
+    """Feature-urile clusterizate pentru viewport-ul `bbox` ("min_lon,min_lat,max_lon,max_lat").
+    Ridică QueryError pentru parametri invalizi."""
+    bbox = _bbox(bbox)
+    if layer not in LAYERS:
+        raise QueryError("Invalid layer")
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise QueryError("Invalid zoom")
+    tiles = tiles_for_bbox(bbox, zoom)
+    if len(tiles) > MAX_TILES:
+        raise QueryError("Bbox too large for zoom")
+
+    qs, signature, stamp = _layer_source(layer, params or {})
+    prefix = f"map:{layer}:{hashlib.md5(signature.encode()).hexdigest()}:{stamp}:{zoom}"
+    keys = {t: f"{prefix}/{t[0]}/{t[1]}" for t in tiles}
+    cached = cache.get_many(list(keys.values()))
+    found = {t: cached[k] for t, k in keys.items() if k in cached}
+    missing = [t for t in tiles if t not in found]
+    if missing:
+        fresh = _compute_tiles(qs, zoom, missing)
+        cache.set_many({keys[t]: v for t, v in fresh.items()}, CLUSTER_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [f for t in tiles for f in found[t]]
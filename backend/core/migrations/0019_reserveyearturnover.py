@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:30
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_merge_20250908_2327'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReserveYearTurnover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('prev_year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('species_count', models.PositiveIntegerField(default=0)),
+                ('gained', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('lost', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('gained_count', models.PositiveIntegerField(default=0)),
+                ('lost_count', models.PositiveIntegerField(default=0)),
+                ('retained_count', models.PositiveIntegerField(default=0)),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('reserve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnover_rows', to='core.reserve')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year'], name='core_reserv_year_c5804a_idx')],
+                'unique_together': {('reserve', 'year')},
+            },
+        ),
+    ]
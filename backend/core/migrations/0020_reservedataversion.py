@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_reserveyearturnover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReserveDataVersion',
+            fields=[
+                ('reserve', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='data_version', serialize=False, to='core.reserve')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
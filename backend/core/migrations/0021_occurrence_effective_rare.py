@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_reservedataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='occurrence',
+            name='effective_rare',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        # backfill: is_rare OR species.is_rare, într-un singur UPDATE
+        migrations.RunSQL(
+            """
+            UPDATE core_occurrence o
+            SET effective_rare = (o.is_rare OR s.is_rare)
+            FROM core_species s
+            WHERE s.id = o.species_id
+              AND o.effective_rare IS DISTINCT FROM (o.is_rare OR s.is_rare);
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(condition=models.Q(('effective_rare', True)), fields=['reserve', 'year'], include=('species',), name='core_occ_rare_reserve_year_idx'),
+        ),
+    ]
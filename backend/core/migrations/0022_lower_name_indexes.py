@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_occurrence_effective_rare'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habitat',
+            index=models.Index(django.db.models.functions.text.Lower('name_romanian'), name='core_hab_name_ro_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitat',
+            index=models.Index(django.db.models.functions.text.Lower('name_english'), name='core_hab_name_en_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitat',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='core_hab_code_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='core_reserve_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(django.db.models.functions.text.Lower('raion'), name='core_reserve_raion_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='site',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='core_site_name_lower_idx'),
+        ),
+    ]
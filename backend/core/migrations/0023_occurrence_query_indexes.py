@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_lower_name_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='occurrence',
+            name='core_occurr_species_08f08a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(fields=['species', 'year'], name='core_occurr_species_124f35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(condition=models.Q(('effective_rare', True)), fields=['year'], name='core_occ_rare_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(condition=models.Q(('latitude__isnull', False), ('longitude__isnull', False)), fields=['latitude', 'longitude'], name='core_occ_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_occurrence_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearlyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('species', 'Specie'), ('reserve', 'Rezervație'), ('raion', 'Raion'), ('association', 'Asociație'), ('habitat', 'Habitat')], max_length=16)),
+                ('key', models.CharField(max_length=255)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rare_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('dimension', 'key', 'year')},
+            },
+        ),
+    ]
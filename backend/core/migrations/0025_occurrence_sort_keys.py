@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:49
+
+from django.conf import settings
+import unicodedata
+
+from django.db import migrations, models
+
+
+def sort_key(value):
+    # copie a core.models.sort_key (migrațiile nu importă din models)
+    decomposed = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def backfill_sort_keys(apps, schema_editor):
+    # cheile se calculează în Python (aceeași normalizare ca Occurrence.save()) pentru tabelele
+    # mici rezervații / specii, apoi un singur UPDATE scrie ambele coloane: fiecare rând e atins
+    # o dată — un al doilea UPDATE pe rândurile deja modificate în tranzacție ar lăsa verificări
+    # FK amânate în așteptare, iar CREATE INDEX de mai jos ar eșua ("pending trigger events")
+    Reserve = apps.get_model("core", "Reserve")
+    Species = apps.get_model("core", "Species")
+    reserves = list(Reserve.objects.values_list("id", "name"))
+    species = list(Species.objects.values_list("id", "denumire_stiintifica"))
+    if not reserves or not species:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE core_occurrence o
+               SET reserve_sort = r.sort, species_sort = s.sort
+              FROM unnest(%s::bigint[], %s::text[]) AS r(id, sort),
+                   unnest(%s::bigint[], %s::text[]) AS s(id, sort)
+             WHERE o.reserve_id = r.id AND o.species_id = s.id
+            """,
+            [[pk for pk, _ in reserves], [sort_key(name) for _, name in reserves],
+             [pk for pk, _ in species], [sort_key(name) for _, name in species]],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_yearlycount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='occurrence',
+            name='reserve_sort',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='occurrence',
+            name='species_sort',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(fields=['reserve_sort', 'species_sort', '-year'], name='core_occ_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:50
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_occurrence_sort_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedFilter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('kind', models.CharField(choices=[('plante', 'Plante în rezervații'), ('asociatii', 'Asociații în rezervații'), ('ocurente', 'Interogare ocurențe')], max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('snapshot_enabled', models.BooleanField(default=True)),
+                ('result_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, editable=False, null=True, size=None)),
+                ('result_count', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('snapshot_stamp', models.BigIntegerField(blank=True, editable=False, null=True)),
+                ('snapshot_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_filters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_savedfilter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReserveDossier',
+            fields=[
+                ('reserve', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dossier', serialize=False, to='core.reserve')),
+                ('version', models.BigIntegerField(default=-1)),
+                ('data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
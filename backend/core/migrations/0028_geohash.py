@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.geo import geohash_encode  # funcție pură, fără dependențe de modele
+
+
+def backfill_geohash(apps, schema_editor):
+    # în loturi, doar rândurile cu coordonate (restul rămân cu geohash "")
+    for name in ("Occurrence", "Reserve", "Site"):
+        Model = apps.get_model("core", name)
+        rows = (Model.objects
+                .filter(latitude__isnull=False, longitude__isnull=False)
+                .only("id", "latitude", "longitude"))
+        batch = []
+        for obj in rows.iterator(chunk_size=2000):
+            obj.geohash = geohash_encode(obj.latitude, obj.longitude)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                Model.objects.bulk_update(batch, ["geohash"])
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_reservedossier'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='occurrence',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='reserve',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='occurrence',
+            index=models.Index(fields=['geohash'], name='core_occ_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(fields=['geohash'], name='core_reserve_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='site',
+            index=models.Index(fields=['geohash'], name='core_site_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
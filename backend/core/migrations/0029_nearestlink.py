@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NearestLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('occurrence', 'Ocurență'), ('reserve', 'Rezervație'), ('site', 'Sit')], max_length=16)),
+                ('source_id', models.BigIntegerField()),
+                ('target_type', models.CharField(choices=[('reserve', 'Rezervație'), ('site', 'Sit')], max_length=16)),
+                ('target_id', models.BigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('distance_km', models.FloatField()),
+                ('source_geohash', models.CharField(max_length=12)),
+                ('targets_stamp', models.CharField(max_length=32)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['target_type', 'target_id'], name='core_neares_target__3fdcd4_idx')],
+                'unique_together': {('source_type', 'source_id', 'target_type', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_nearestlink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpeciesRangeMetrics',
+            fields=[
+                ('species', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='range_metrics', serialize=False, to='core.species')),
+                ('year_from', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('year_to', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('eoo_km2', models.FloatField(default=0)),
+                ('aoo_cells', models.PositiveIntegerField(default=0)),
+                ('aoo_km2', models.FloatField(default=0)),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_speciesrangemetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoordinateIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('swapped', 'Lat/lon inversate'), ('out_of_bounds', 'În afara Republicii Moldova'), ('far_from_reserve', 'Departe de rezervație')], max_length=20)),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('threshold_km', models.FloatField(blank=True, null=True)),
+                ('suggested_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('suggested_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('reviewed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('occurrence', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='coordinate_issue', to='core.occurrence')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'reviewed'], name='core_coordi_kind_0816d5_idx')],
+            },
+        ),
+    ]
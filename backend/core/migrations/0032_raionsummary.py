@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_coordinateissue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RaionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raion', models.CharField(max_length=255)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('species_count', models.PositiveIntegerField(default=0)),
+                ('rare_species_count', models.PositiveIntegerField(default=0)),
+                ('reserve_count', models.PositiveIntegerField(default=0)),
+                ('surface_ha', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('occurrence_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year'], name='core_raions_year_8854cc_idx')],
+                'unique_together': {('raion', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_duplicatecluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefDataVersion',
+            fields=[
+                ('table', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
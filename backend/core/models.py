@@ -1,5 +1,25 @@
-from django.db import models
+import unicodedata
+from decimal import Decimal
+
+from django.db import connection, models
 from django.core.validators import MinValueValidator
+from django.contrib.postgres.fields import ArrayField
+from django.db.models.functions import Lower
+
+from .spatial import SpatialQuerySet, geohash_for
+
+
+def sort_key(value) -> str:
+    """Cheie de sortare: fără diacritice, lowercase (ex. „Pădurea Hîncești” -> „padurea hincesti”)."""
+    decomposed = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def _extend_update_fields(kwargs, sources, derived):
+    """save(update_fields=...) care atinge `sources` trebuie să scrie și câmpul derivat."""
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and set(sources) & set(update_fields):
+        kwargs["update_fields"] = {*update_fields, derived}
 
 
 class Reserve(models.Model):
@@ -19,18 +39,32 @@ class Reserve(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     coords_raw = models.TextField(blank=True, null=True)
+    # geohash al coordonatelor (core.spatial), întreținut în save()
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
 
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SpatialQuerySet.as_manager()
 
     class Meta:
-        indexes = [models.Index(fields=["raion"])]
+        indexes = [
+            models.Index(fields=["raion"]),
+            # căutări case-insensitive după nume (core/refdata.py)
+            models.Index(Lower("name"), name="core_reserve_name_lower_idx"),
+            models.Index(Lower("raion"), name="core_reserve_raion_lower_idx"),
+            models.Index(fields=["geohash"], name="core_reserve_geohash_idx", opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        _extend_update_fields(kwargs, {"latitude", "longitude"}, "geohash")
+        super().save(*args, **kwargs)
+
 
 class Species(models.Model):
     denumire_stiintifica = models.CharField(max_length=255, unique=True)
@@ -102,10 +136,19 @@ class Occurrence(models.Model):
 
     # raritatea la momentul observației, booleană
     is_rare = models.BooleanField(default=False)
+    # raritatea efectivă = is_rare OR species.is_rare (denormalizată, fără JOIN în filtre);
+    # întreținută în save() și, la schimbarea Species.is_rare, printr-un UPDATE în masă
+    effective_rare = models.BooleanField(default=False, editable=False)
+
+    # chei de sortare denormalizate (sort_key(reserve.name), sort_key(species.denumire_stiintifica)):
+    # tabelele de filtrare se ordonează după ele direct din index, fără JOIN + sort
+    reserve_sort = models.CharField(max_length=255, default="", editable=False)
+    species_sort = models.CharField(max_length=255, default="", editable=False)
 
     # coordonate (de obicei doar la specii rare; rămân opționale)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)  # core.spatial
 
     # metadate utile
     source = models.CharField(max_length=50, blank=True, null=True)  # ex.: 'teren' | 'literatura' | 'raport'
@@ -115,18 +158,355 @@ class Occurrence(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SpatialQuerySet.as_manager()
+
     class Meta:
         unique_together = (("species", "reserve", "year"),)
         indexes = [
             models.Index(fields=["reserve", "year"]),
-            models.Index(fields=["species"]),
+            models.Index(fields=["species", "year"]),
             models.Index(fields=["year"]),
             models.Index(fields=["is_rare"]),  # filtre rapide „doar rare”
+            # filtrele „doar rare” pe rezervație/an -> index-only scan pe indexul parțial
+            models.Index(
+                fields=["reserve", "year"], include=["species"],
+                condition=models.Q(effective_rare=True),
+                name="core_occ_rare_reserve_year_idx",
+            ),
+            # API-ul de interogare (core/occurrence_query.py): rare pe interval de ani, bbox
+            models.Index(
+                fields=["year"], condition=models.Q(effective_rare=True),
+                name="core_occ_rare_year_idx",
+            ),
+            models.Index(
+                fields=["latitude", "longitude"],
+                condition=models.Q(latitude__isnull=False, longitude__isnull=False),
+                name="core_occ_lat_lon_idx",
+            ),
+            # ordinea tabelelor de filtrare: rezervație, specie, an desc
+            models.Index(fields=["reserve_sort", "species_sort", "-year"], name="core_occ_sort_idx"),
+            # interogări spațiale pe prefix de geohash (core/spatial.py)
+            models.Index(fields=["geohash"], name="core_occ_geohash_idx", opclasses=["varchar_pattern_ops"]),
         ]
 
     def __str__(self):
         return f"{self.species} @ {self.reserve} ({self.year})"
 
+    # câmpurile din care save() derivă effective_rare și cheile de sortare
+    DERIVED_INPUTS = ("reserve_id", "species_id", "is_rare")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        row = dict(zip(field_names, values))
+        instance._saved_inputs = {f: row[f] for f in cls.DERIVED_INPUTS if f in row}
+        return instance
+
+    @staticmethod
+    def _writes(update_fields, field) -> bool:
+        return update_fields is None or field in update_fields or field.removesuffix("_id") in update_fields
+
+    def _inputs_changed(self, update_fields, *fields) -> bool:
+        """Câmpul derivat din `fields` trebuie recalculat? La save(update_fields=...) dacă unul e
+        scris, la un save complet dacă unul diferă de valoarea citită (rândurile noi: mereu)."""
+        if update_fields is not None:
+            return any(self._writes(update_fields, f) for f in fields)
+        saved = getattr(self, "_saved_inputs", {})
+        return any(f not in saved or saved[f] != getattr(self, f) for f in fields)
+
+    def save(self, *args, **kwargs):
+        # species / reserve se citesc doar când sursa unui câmp derivat se schimbă
+        # (altfel fiecare save al unei ocurențe încărcate ar costa încă două interogări)
+        update_fields = kwargs.get("update_fields")
+        if self._inputs_changed(update_fields, "is_rare", "species_id"):
+            self.effective_rare = bool(self.is_rare) or bool(self.species.is_rare)
+            _extend_update_fields(kwargs, {"is_rare", "species", "species_id"}, "effective_rare")
+        if self._inputs_changed(update_fields, "species_id"):
+            self.species_sort = sort_key(self.species.denumire_stiintifica)
+            _extend_update_fields(kwargs, {"species", "species_id"}, "species_sort")
+        if self._inputs_changed(update_fields, "reserve_id"):
+            self.reserve_sort = sort_key(self.reserve.name)
+            _extend_update_fields(kwargs, {"reserve", "reserve_id"}, "reserve_sort")
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        _extend_update_fields(kwargs, {"latitude", "longitude"}, "geohash")
+        super().save(*args, **kwargs)
+        self._saved_inputs = {
+            **getattr(self, "_saved_inputs", {}),
+            **{f: getattr(self, f) for f in self.DERIVED_INPUTS if self._writes(update_fields, f)},
+        }
+
+    @classmethod
+    def sync_effective_rare(cls, species: "Species"):
+        """Propagă Species.is_rare în ocurențele speciei printr-un singur UPDATE
+        (doar rândurile care chiar se schimbă)."""
+        qs = cls.objects.filter(species_id=species.pk)
+        if species.is_rare:
+            return qs.filter(effective_rare=False).update(effective_rare=True)
+        return qs.filter(effective_rare=True, is_rare=False).update(effective_rare=False)
+
+    @classmethod
+    def sync_sort_keys(cls, reserve: "Reserve" = None, species: "Species" = None):
+        """Propagă un nume schimbat (rezervație sau specie) în cheile de sortare, într-un UPDATE."""
+        n = 0
+        if reserve is not None:
+            key = sort_key(reserve.name)
+            n += cls.objects.filter(reserve_id=reserve.pk).exclude(reserve_sort=key).update(reserve_sort=key)
+        if species is not None:
+            key = sort_key(species.denumire_stiintifica)
+            n += cls.objects.filter(species_id=species.pk).exclude(species_sort=key).update(species_sort=key)
+        return n
+
+
+class ReserveDataVersion(models.Model):
+    """Ștampilă de versiune per rezervație, incrementată când se schimbă ocurențele ei.
+
+    Folosită în cheile de cache (comparații etc.): o modificare într-o rezervație
+    invalidează doar intrările care o conțin. Tabel separat (fără FK constrâns),
+    ca salvarea unui obiect Reserve să nu poată suprascrie versiunea.
+    """
+    reserve = models.OneToOneField(
+        Reserve, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name="data_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def bump(cls, reserve_ids):
+        ids = sorted({int(r) for r in reserve_ids if r is not None})
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (reserve_id, version, updated_at)
+                SELECT rid, 1, NOW() FROM unnest(%s::bigint[]) AS rid
+                ON CONFLICT (reserve_id) DO UPDATE
+                SET version = {cls._meta.db_table}.version + 1, updated_at = NOW()
+                """,
+                [ids],
+            )
+
+    @classmethod
+    def current(cls, reserve_ids):
+        """{reserve_id: versiune}; rezervațiile fără rând au versiunea 0."""
+        ids = {int(r) for r in reserve_ids}
+        found = dict(cls.objects.filter(reserve_id__in=ids).values_list("reserve_id", "version"))
+        return {rid: found.get(rid, 0) for rid in ids}
+
+    @classmethod
+    def stamp(cls) -> int:
+        """Ștampilă globală: crește la orice bump, în orice rezervație (suma versiunilor)."""
+        return cls.objects.aggregate(s=models.Sum("version"))["s"] or 0
+
+
+class RefDataVersion(models.Model):
+    """Generația datelor de referință (core.refdata) per tabel sursă: rezervații, situri, habitate.
+
+    Incrementată din semnale la orice save/delete; toate rândurile se citesc dintr-o singură
+    interogare, o dată per cerere. Ștampila de timp face generația unică și după un rollback
+    (contorul revine, ora nu).
+    """
+    table = models.CharField(max_length=32, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def bump(cls, table: str):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} ("table", version, updated_at)
+                VALUES (%s, 1, clock_timestamp())
+                ON CONFLICT ("table") DO UPDATE
+                SET version = {cls._meta.db_table}.version + 1, updated_at = clock_timestamp()
+                """,
+                [table],
+            )
+
+    @classmethod
+    def current(cls) -> dict:
+        """{tabel: generație}; tabelele fără rând lipsesc (generația "0")."""
+        return {
+            table: f"{version}:{updated_at.timestamp()}"
+            for table, version, updated_at in cls.objects.values_list("table", "version", "updated_at")
+        }
+
+
+class ReserveDossier(models.Model):
+    """Dosarul precalculat al unei rezervații (specii pe ani, asociații pe ani, Cartea Roșie,
+    situri apropiate), construit de core.dossier.
+
+    Rândul e valid cât timp `version` == versiunea de date a rezervației (ReserveDataVersion);
+    altfel se reconstruiește doar dosarul acelei rezervații. Modificarea siturilor marchează
+    toate dosarele ca învechite (version = -1), fiindcă distanțele le afectează pe toate.
+    """
+    reserve = models.OneToOneField(
+        Reserve, on_delete=models.CASCADE, primary_key=True, related_name="dossier",
+    )
+    version = models.BigIntegerField(default=-1)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dosar {self.reserve_id} v{self.version}"
+
+
+class NearestLink(models.Model):
+    """Cele mai apropiate rezervații / situri pentru fiecare ocurență, rezervație și sit cu coordonate.
+
+    Calculat de core.nearby (KD-tree haversine în memorie). `source_geohash` și `targets_stamp`
+    (amprenta coordonatelor tuturor țintelor) arată când rândurile sunt învechite: se recalculează
+    doar sursele mutate, iar la mutarea unei ținte, toate.
+    """
+    SOURCE_CHOICES = [("occurrence", "Ocurență"), ("reserve", "Rezervație"), ("site", "Sit")]
+    TARGET_CHOICES = [("reserve", "Rezervație"), ("site", "Sit")]
+
+    source_type = models.CharField(max_length=16, choices=SOURCE_CHOICES)
+    source_id = models.BigIntegerField()
+    target_type = models.CharField(max_length=16, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    rank = models.PositiveSmallIntegerField()  # 1 = cel mai apropiat
+    distance_km = models.FloatField()
+
+    source_geohash = models.CharField(max_length=12)
+    targets_stamp = models.CharField(max_length=32)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("source_type", "source_id", "target_type", "rank"),)
+        indexes = [
+            models.Index(fields=["target_type", "target_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source_type}:{self.source_id} → {self.target_type}:{self.target_id} ({self.distance_km:.1f} km)"
+
+
+class SpeciesRangeMetrics(models.Model):
+    """EOO / AOO (criteriile IUCN B1/B2) per specie, calculate din coordonatele ocurențelor.
+
+    Populat de `manage.py compute_range_metrics` (core/range_metrics.py). Fereastra de ani
+    folosită e păstrată pe rând (None = fără limită); `fingerprint` (md5 al coordonatelor din
+    fereastră) permite recalcularea doar a speciilor cu ocurențe modificate.
+    """
+    species = models.OneToOneField(Species, on_delete=models.CASCADE, primary_key=True, related_name="range_metrics")
+    year_from = models.PositiveSmallIntegerField(blank=True, null=True)
+    year_to = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    points = models.PositiveIntegerField(default=0)        # ocurențe cu coordonate în fereastră
+    eoo_km2 = models.FloatField(default=0)                 # aria învelitorii convexe (>= AOO)
+    aoo_cells = models.PositiveIntegerField(default=0)     # celule 2x2 km ocupate
+    aoo_km2 = models.FloatField(default=0)
+
+    fingerprint = models.CharField(max_length=32)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.species}: EOO {self.eoo_km2:.0f} km², AOO {self.aoo_km2:.0f} km²"
+
+
+class CoordinateIssue(models.Model):
+    """Coordonată suspectă a unei ocurențe, găsită de `manage.py scan_coordinates` (core/coord_quality.py).
+
+    Un rând per ocurență (problema cea mai specifică); rândurile dispar la rescanare dacă
+    problema a fost corectată. `reviewed` e setat din admin și păstrat între rescanări.
+    """
+    KIND_SWAPPED = "swapped"
+    KIND_OUT_OF_BOUNDS = "out_of_bounds"
+    KIND_FAR = "far_from_reserve"
+    KIND_CHOICES = [
+        (KIND_SWAPPED, "Lat/lon inversate"),
+        (KIND_OUT_OF_BOUNDS, "În afara Republicii Moldova"),
+        (KIND_FAR, "Departe de rezervație"),
+    ]
+
+    occurrence = models.OneToOneField(Occurrence, on_delete=models.CASCADE, related_name="coordinate_issue")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    distance_km = models.FloatField(blank=True, null=True)   # distanța până la centrul rezervației
+    threshold_km = models.FloatField(blank=True, null=True)  # pragul folosit pentru rezervație
+    suggested_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    suggested_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "reviewed"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: ocurența {self.occurrence_id}"
+
+
+class DuplicateCluster(models.Model):
+    """Grup de ocurențe probabil duplicate (aceeași specie, aproape în spațiu și în timp),
+    găsit de `manage.py find_duplicates` (core/dedup.py), de revizuit manual.
+
+    `fingerprint` (md5 al id-urilor membre, sortate) identifică grupul între rulări: un grup
+    regăsit identic își păstrează rândul și `reviewed`; grupurile dispărute se șterg.
+    """
+    species = models.ForeignKey(Species, on_delete=models.CASCADE, related_name="duplicate_clusters")
+    fingerprint = models.CharField(max_length=32, unique=True)
+    size = models.PositiveIntegerField()
+    score = models.FloatField()           # cel mai mare scor al unei perechi din grup (0..1)
+    max_distance_km = models.FloatField()
+    max_year_gap = models.PositiveSmallIntegerField()
+
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["reviewed", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.size} ocurențe ({self.score:.2f})"
+
+
+class DuplicateMember(models.Model):
+    """O ocurență dintr-un DuplicateCluster (cel mult un grup per ocurență)."""
+    cluster = models.ForeignKey(DuplicateCluster, on_delete=models.CASCADE, related_name="members")
+    occurrence = models.OneToOneField(Occurrence, on_delete=models.CASCADE, related_name="duplicate_membership")
+    best_score = models.FloatField()  # cel mai bun scor față de alt membru
+
+    def __str__(self):
+        return f"ocurența {self.occurrence_id} în grupul {self.cluster_id}"
+
+
+class ReserveYearTurnover(models.Model):
+    """Turnover de specii pe (rezervație, an) față de anul de inventariere anterior.
+
+    Tabel sumar, populat de comanda `compute_turnover`. `fingerprint` (md5 al
+    listei sortate de species_id) permite recalcularea doar a partițiilor
+    (rezervație, an) modificate de la rularea precedentă.
+    """
+    reserve = models.ForeignKey(Reserve, on_delete=models.CASCADE, related_name="turnover_rows")
+    year = models.PositiveSmallIntegerField()
+    prev_year = models.PositiveSmallIntegerField(blank=True, null=True)  # None = primul an inventariat
+
+    species_count = models.PositiveIntegerField(default=0)
+    gained = ArrayField(models.IntegerField(), default=list, blank=True)  # species_id apărute
+    lost = ArrayField(models.IntegerField(), default=list, blank=True)    # species_id dispărute
+    gained_count = models.PositiveIntegerField(default=0)
+    lost_count = models.PositiveIntegerField(default=0)
+    retained_count = models.PositiveIntegerField(default=0)
+
+    fingerprint = models.CharField(max_length=32)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("reserve", "year"),)
+        indexes = [
+            models.Index(fields=["year"]),
+        ]
+
+    def __str__(self):
+        return f"{self.reserve} {self.prev_year or '—'} → {self.year}"
 
 
 class ReserveAssociationYear(models.Model):
@@ -159,6 +539,11 @@ class Habitat(models.Model):
 
     class Meta:
         db_table = "core_habitat"
+        indexes = [
+            models.Index(Lower("name_romanian"), name="core_hab_name_ro_lower_idx"),
+            models.Index(Lower("name_english"), name="core_hab_name_en_lower_idx"),
+            models.Index(Lower("code"), name="core_hab_code_lower_idx"),
+        ]
 
     def __str__(self):
         return self.name_romanian or self.name_english
@@ -176,6 +561,7 @@ class Site(models.Model):
 
     longitude            = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     latitude             = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    geohash              = models.CharField(max_length=12, blank=True, default="", editable=False)  # core.spatial
 
     ste                  = models.BooleanField("STE")   
     conj                 = models.BooleanField("CONJ")
@@ -188,16 +574,25 @@ class Site(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SpatialQuerySet.as_manager()
+
     class Meta:
         db_table = "core_site"
         indexes = [
             models.Index(fields=["name"]),
             models.Index(fields=["code"]),
+            models.Index(Lower("name"), name="core_site_name_lower_idx"),
+            models.Index(fields=["geohash"], name="core_site_geohash_idx", opclasses=["varchar_pattern_ops"]),
         ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        _extend_update_fields(kwargs, {"latitude", "longitude"}, "geohash")
+        super().save(*args, **kwargs)
+
 
 class SiteHabitat(models.Model):
     site    = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="site_habitats")
@@ -219,4 +614,241 @@ class SiteHabitat(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.site} – {self.habitat} ({self.year})"
\ No newline at end of file
+        return f"{self.site} – {self.habitat} ({self.year})"
+
+
+class YearlyCount(models.Model):
+    """Rollup anual: numărul de înregistrări pe (dimensiune, cheie, an).
+
+    species / reserve / raion -> ocurențe (rare_count = cele cu raritate efectivă);
+    association -> legături rezervație–asociație; habitat -> legături site–habitat.
+    Întreținut incremental de semnale (doar cheile atinse, vezi signals.py) și
+    reconciliat complet de comanda `compute_year_series`.
+    """
+    DIMENSION_CHOICES = [
+        ("species", "Specie"),
+        ("reserve", "Rezervație"),
+        ("raion", "Raion"),
+        ("association", "Asociație"),
+        ("habitat", "Habitat"),
+    ]
+
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=255)  # id-ul obiectului sau numele raionului
+    year = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    rare_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("dimension", "key", "year"),)
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} {self.year} = {self.count}"
+
+    @staticmethod
+    def _source(dimension):
+        """(queryset sursă, câmpul-cheie) pentru o dimensiune."""
+        if dimension == "species":
+            return Occurrence.objects.all(), "species_id"
+        if dimension == "reserve":
+            return Occurrence.objects.all(), "reserve_id"
+        if dimension == "raion":
+            return Occurrence.objects.exclude(reserve__raion__isnull=True).exclude(reserve__raion=""), "reserve__raion"
+        if dimension == "association":
+            return ReserveAssociationYear.objects.all(), "association_id"
+        if dimension == "habitat":
+            return SiteHabitat.objects.all(), "habitat_id"
+        raise ValueError(f"Dimensiune necunoscută: {dimension}")
+
+    @classmethod
+    def refresh(cls, dimension, keys=None) -> int:
+        """Recalculează rollup-ul pentru cheile date (sau toate, dacă keys=None).
+
+        Un GROUP BY pe sursă (filtrat pe chei indexate), comparat cu ce e stocat:
+        se scriu doar rândurile schimbate și se șterg cele dispărute. Întoarce nr. de rânduri atinse.
+        """
+        qs, field = cls._source(dimension)
+        stored_qs = cls.objects.filter(dimension=dimension)
+        if keys is not None:
+            keys = sorted({str(k) for k in keys if k not in (None, "")})
+            if not keys:
+                return 0
+            qs = qs.filter(**{f"{field}__in": keys})
+            stored_qs = stored_qs.filter(key__in=keys)
+
+        counts = {"n": models.Count("pk")}
+        if qs.model is Occurrence:
+            counts["rare"] = models.Count("pk", filter=models.Q(effective_rare=True))
+        fresh = {
+            (str(row[field]), row["year"]): (row["n"], row.get("rare", 0))
+            for row in qs.order_by().values(field, "year").annotate(**counts)
+        }
+        stored = {
+            (k, y): (pk, n, rare)
+            for pk, k, y, n, rare in stored_qs.values_list("pk", "key", "year", "count", "rare_count")
+        }
+
+        changed = [
+            cls(dimension=dimension, key=k, year=y, count=n, rare_count=rare)
+            for (k, y), (n, rare) in fresh.items()
+            if stored.get((k, y), (None,))[1:] != (n, rare)
+        ]
+        if changed:
+            cls.objects.bulk_create(
+                changed, batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["dimension", "key", "year"],
+                update_fields=["count", "rare_count", "updated_at"],
+            )
+        removed = [pk for k, (pk, _, _) in stored.items() if k not in fresh]
+        if removed:
+            cls.objects.filter(pk__in=removed).delete()
+        return len(changed) + len(removed)
+
+    @classmethod
+    def series(cls, dimension, keys):
+        """{cheie: [{year, count, rare}]} din rollup, ordonat după an."""
+        out = {str(k): [] for k in keys}
+        rows = (cls.objects
+                .filter(dimension=dimension, key__in=list(out))
+                .order_by("key", "year")
+                .values_list("key", "year", "count", "rare_count"))
+        for k, y, n, rare in rows:
+            out[k].append({"year": y, "count": n, "rare": rare})
+        return out
+
+
+class RaionSummary(models.Model):
+    """Rollup pentru harta pe raioane (choropleth): un rând per (raion, an) + unul cu year=ALL_YEARS.
+
+    species_count / rare_species_count = specii distincte (rare = cu raritate efectivă) din ocurențele
+    rezervațiilor raionului. Pe un an, reserve_count / surface_ha privesc rezervațiile cu ocurențe
+    în acel an; pe ALL_YEARS, toate rezervațiile raionului (și cele fără ocurențe).
+    Întreținut incremental de semnale (doar raioanele atinse) și reconciliat de `compute_year_series`.
+    """
+    ALL_YEARS = 0
+
+    raion = models.CharField(max_length=255)
+    year = models.PositiveSmallIntegerField()
+    species_count = models.PositiveIntegerField(default=0)
+    rare_species_count = models.PositiveIntegerField(default=0)
+    reserve_count = models.PositiveIntegerField(default=0)
+    surface_ha = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    occurrence_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    VALUE_FIELDS = ("species_count", "rare_species_count", "reserve_count", "surface_ha", "occurrence_count")
+
+    class Meta:
+        unique_together = (("raion", "year"),)
+        indexes = [models.Index(fields=["year"])]
+
+    def __str__(self):
+        return f"{self.raion} {self.year or 'total'}: {self.species_count} specii"
+
+    @classmethod
+    def _compute(cls, raions=None):
+        """{(raion, an): {câmp: valoare}} calculat din Occurrence/Reserve."""
+        reserves = Reserve.objects.exclude(raion__isnull=True).exclude(raion="")
+        occurrences = Occurrence.objects.filter(reserve__in=reserves)
+        if raions is not None:
+            reserves = reserves.filter(raion__in=raions)
+            occurrences = occurrences.filter(reserve__raion__in=raions)
+        surface = {pk: (area or Decimal(0)) for pk, area in reserves.values_list("pk", "suprafata_ha")}
+        empty = dict.fromkeys(cls.VALUE_FIELDS, 0)
+
+        out = {}
+        for raion, pk in reserves.values_list("raion", "pk"):
+            row = out.setdefault((raion, cls.ALL_YEARS), dict(empty))
+            row["reserve_count"] += 1
+            row["surface_ha"] += surface[pk]
+
+        species = {
+            "species_count": models.Count("species_id", distinct=True),
+            "rare_species_count": models.Count("species_id", distinct=True,
+                                               filter=models.Q(effective_rare=True)),
+            "occurrence_count": models.Count("pk"),
+        }
+        base = occurrences.order_by()
+        for row in base.values("reserve__raion").annotate(**species):
+            raion = row.pop("reserve__raion")
+            out[(raion, cls.ALL_YEARS)].update(row)
+        for row in base.values("reserve__raion", "year").annotate(**species):
+            key = (row.pop("reserve__raion"), row.pop("year"))
+            out[key] = {**empty, **row}
+        for raion, year, pk in base.values_list("reserve__raion", "year", "reserve_id").distinct():
+            out[(raion, year)]["reserve_count"] += 1
+            out[(raion, year)]["surface_ha"] += surface[pk]
+        return out
+
+    @classmethod
+    def refresh(cls, raions=None) -> int:
+        """Recalculează rândurile raioanelor date (sau toate); scrie doar ce s-a schimbat, ca YearlyCount."""
+        stored_qs = cls.objects.all()
+        if raions is not None:
+            raions = sorted({r for r in raions if r not in (None, "")})
+            if not raions:
+                return 0
+            stored_qs = stored_qs.filter(raion__in=raions)
+        fresh = cls._compute(raions)
+        stored = {
+            (row[0], row[1]): (row[2], row[3:])
+            for row in stored_qs.values_list("raion", "year", "pk", *cls.VALUE_FIELDS)
+        }
+        changed = [
+            cls(raion=raion, year=year, **values)
+            for (raion, year), values in fresh.items()
+            if stored.get((raion, year), (None, None))[1] != tuple(values[f] for f in cls.VALUE_FIELDS)
+        ]
+        if changed:
+            cls.objects.bulk_create(
+                changed, batch_size=1000, update_conflicts=True,
+                unique_fields=["raion", "year"], update_fields=[*cls.VALUE_FIELDS, "updated_at"],
+            )
+        removed = [pk for key, (pk, _) in stored.items() if key not in fresh]
+        if removed:
+            cls.objects.filter(pk__in=removed).delete()
+        return len(changed) + len(removed)
+
+
+class SavedFilter(models.Model):
+    """Filtru salvat de un utilizator, cu snapshot opțional al listei de id-uri rezultate.
+
+    `params` = parametrii GET ai paginii de filtrare (vezi core/saved_filters.py pentru tipuri).
+    Snapshot-ul e valid cât timp `snapshot_stamp` == ReserveDataVersion.stamp(); altfel e
+    reîmprospătat de `manage.py refresh_saved_filters` (cron) sau la cerere.
+    """
+    KIND_CHOICES = [
+        ("plante", "Plante în rezervații"),
+        ("asociatii", "Asociații în rezervații"),
+        ("ocurente", "Interogare ocurențe"),
+    ]
+
+    user = models.ForeignKey("auth.User", on_delete=models.CASCADE, related_name="saved_filters")
+    name = models.CharField(max_length=120)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+
+    snapshot_enabled = models.BooleanField(default=True)
+    result_ids = ArrayField(models.BigIntegerField(), null=True, blank=True, editable=False)
+    result_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    snapshot_stamp = models.BigIntegerField(null=True, blank=True, editable=False)
+    snapshot_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("user", "name"),)
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
+    @property
+    def has_snapshot(self) -> bool:
+        return self.snapshot_enabled and self.result_ids is not None
+
+    def is_stale(self, stamp: int) -> bool:
+        return self.snapshot_enabled and (self.result_ids is None or self.snapshot_stamp != stamp)
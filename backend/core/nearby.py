@@ -0,0 +1,154 @@
+# core/nearby.py
+"""Cele mai apropiate rezervații / situri pentru ocurențe, rezervații și situri (tabelul NearestLink).
+
+Țintele (rezervații, situri cu coordonate) intră într-un KD-tree în memorie (core.geo.PointIndex),
+construit o dată per rulare; fiecare sursă face o interogare k-NN pe el. Scrierea e incrementală:
+  - sursele cu geohash diferit de cel din link-uri (coordonate schimbate) sau fără link-uri;
+  - toate sursele, dacă s-a schimbat amprenta țintelor (o rezervație/un sit mutat, adăugat, șters);
+  - link-urile surselor care nu mai au coordonate se șterg.
+Amprenta țintelor (targets_stamp, o scanare a tuturor țintelor) se calculează o singură dată per
+rulare, în NearestIndex, și se păstrează pe fiecare link. Paginile de detaliu doar citesc link-urile
+stocate (nearby_for), așa cum sunt; recalcularea rămâne pe seama `manage.py compute_nearest`.
+"""
+import hashlib
+
+from django.db import transaction
+
+from .geo import PointIndex
+from .models import NearestLink, Occurrence, Reserve, Site
+
+NEAREST_K = 5
+
+SOURCES = {"occurrence": Occurrence, "reserve": Reserve, "site": Site}
+TARGETS = {"reserve": Reserve, "site": Site}
+
+
+def _with_coords(model):
+    return model.objects.filter(latitude__isnull=False, longitude__isnull=False).exclude(geohash="")
+
+
+def targets_stamp() -> str:
+    """Amprenta (md5) coordonatelor tuturor țintelor; se schimbă la orice mutare/adăugare/ștergere.
+    Scanează toate țintele: se calculează doar la construirea unui NearestIndex, nu per cerere."""
+    h = hashlib.md5()
+    for target_type, model in TARGETS.items():
+        for pk, gh in _with_coords(model).order_by("pk").values_list("pk", "geohash"):
+            h.update(f"{target_type}:{pk}:{gh};".encode())
+    return h.hexdigest()
+
+
+class NearestIndex:
+    """KD-tree per tip de țintă + amprenta țintelor din care a fost construit."""
+
+    def __init__(self):
+        self.stamp = targets_stamp()
+        self.trees = {
+            target_type: PointIndex(_with_coords(model).values_list("pk", "latitude", "longitude"))
+            for target_type, model in TARGETS.items()
+        }
+
+    def links(self, source_type, source_id, lat, lon, geohash, k=NEAREST_K):
+        out = []
+        for target_type, tree in self.trees.items():
+            exclude = source_id if target_type == source_type else None
+            for rank, (target_id, km) in enumerate(tree.query(lat, lon, k, exclude=exclude), start=1):
+                out.append(NearestLink(
+                    source_type=source_type, source_id=source_id,
+                    target_type=target_type, target_id=target_id,
+                    rank=rank, distance_km=round(km, 3),
+                    source_geohash=geohash, targets_stamp=self.stamp,
+                ))
+        return out
+
+
+def _signature(link):
+    return link.target_type, link.rank, link.target_id, link.distance_km, link.source_geohash, link.targets_stamp
+
+
+@transaction.atomic
+def refresh(source_type, ids=None, index=None, k=NEAREST_K) -> int:
+    """Recalculează link-urile surselor date (toate, dacă ids=None); scrie doar rândurile schimbate.
+    Întoarce numărul de rânduri scrise sau șterse."""
+    index = index or NearestIndex()
+    sources = _with_coords(SOURCES[source_type])
+    existing = NearestLink.objects.filter(source_type=source_type)
+    if ids is not None:
+        ids = list(ids)
+        sources = sources.filter(pk__in=ids)
+        existing = existing.filter(source_id__in=ids)
+
+    stored = {}
+    for link in existing.iterator(chunk_size=5000):
+        stored[(link.source_id, link.target_type, link.rank)] = _signature(link)
+
+    fresh, seen = [], set()
+    for pk, lat, lon, gh in sources.values_list("pk", "latitude", "longitude", "geohash").iterator(chunk_size=5000):
+        for link in index.links(source_type, pk, lat, lon, gh, k):
+            key = (pk, link.target_type, link.rank)
+            seen.add(key)
+            if stored.get(key) != _signature(link):
+                fresh.append(link)
+
+    if fresh:
+        NearestLink.objects.bulk_create(
+            fresh, batch_size=2000, update_conflicts=True,
+            unique_fields=["source_type", "source_id", "target_type", "rank"],
+            update_fields=["target_id", "distance_km", "source_geohash", "targets_stamp", "computed_at"],
+        )
+    # rânduri rămase fără corespondent (sursă fără coordonate, mai puține ținte decât k)
+    gone = {}
+    for source_id, target_type, rank in stored.keys() - seen:
+        gone.setdefault((target_type, rank), []).append(source_id)
+    deleted = 0
+    for (target_type, rank), source_ids in gone.items():
+        deleted += NearestLink.objects.filter(
+            source_type=source_type, target_type=target_type, rank=rank, source_id__in=source_ids,
+        ).delete()[0]
+    return len(fresh) + deleted
+
+
+def changed_sources(source_type, stamp):
+    """Id-urile surselor ale căror link-uri lipsesc sau sunt învechite (inclusiv cele fără coordonate)."""
+    current = dict(_with_coords(SOURCES[source_type]).values_list("pk", "geohash"))
+    stored = dict(NearestLink.objects
+                  .filter(source_type=source_type, rank=1)
+                  .values_list("source_id", "source_geohash"))
+    outdated = set(NearestLink.objects
+                   .filter(source_type=source_type)
+                   .exclude(targets_stamp=stamp)
+                   .values_list("source_id", flat=True)
+                   .distinct())
+    changed = {pk for pk, gh in current.items() if stored.get(pk) != gh}
+    removed = set(stored) - set(current)
+    return sorted(changed | removed | outdated)
+
+
+def refresh_changed(index=None) -> dict:
+    """{tip sursă: rânduri scrise} după recalcularea surselor învechite."""
+    index = index or NearestIndex()
+    return {
+        source_type: refresh(source_type, changed_sources(source_type, index.stamp), index=index)
+        for source_type in SOURCES
+    }
+
+
+def nearby_for(source_type, source_id, k=NEAREST_K) -> dict:
+    """{ "reserve": [{id, name, distance_km}], "site": [{id, code, name, distance_km}] } pentru sursă.
+
+    Citește link-urile precalculate așa cum sunt (fără verificarea amprentei și fără recalculare);
+    o sursă fără link-uri întoarce liste goale până la următorul compute_nearest.
+    """
+    links = list(NearestLink.objects
+                 .filter(source_type=source_type, source_id=source_id, rank__lte=k)
+                 .order_by("target_type", "rank"))
+
+    out = {}
+    for target_type, model in TARGETS.items():
+        rows = [l for l in links if l.target_type == target_type]
+        fields = ("pk", "code", "name") if target_type == "site" else ("pk", "name")
+        names = {row[0]: row[1:] for row in model.objects.filter(pk__in=[l.target_id for l in rows]).values_list(*fields)}
+        out[target_type] = [
+            {"id": l.target_id, **dict(zip(fields[1:], names[l.target_id])), "distance_km": l.distance_km}
+            for l in rows if l.target_id in names
+        ]
+    return out
@@ -0,0 +1,311 @@
+# core/occurrence_query.py
+"""Interogare flexibilă peste Occurrence (API-ul JSON din views.occurrences_query).
+
+Parametrii GET (toți opționali, combinabili):
+  species    id-uri sau denumiri științifice, separate prin virgulă
+  family     familia (Species.familia), case-insensitive
+  class      clasa (Species.clasa), case-insensitive
+  red_book   categorii Cartea Roșie, ex. "VU,EN"
+  reserve    id-uri sau nume de rezervații, separate prin virgulă
+  raion      unul sau mai multe raioane, separate prin virgulă
+  year_from, year_to   interval de ani (inclusiv)
+  rare       1/0 -> doar rare / doar nerare (raritatea efectivă)
+  bbox       min_lon,min_lat,max_lon,max_lat
+
+Filtrele pe tabele mici (specii, rezervații) se rezolvă întâi în liste de id-uri, astfel încât
+interogarea pe Occurrence folosește doar coloanele proprii, acoperite de indexuri:
+  reserve (+ year)           -> (reserve, year); cu rare=1 -> indexul parțial rar (reserve, year)
+  species (+ year)           -> (species, year)
+  year_from/year_to (+ rare) -> (year); cu rare=1 -> indexul parțial rar (year)
+  bbox                       -> (latitude, longitude), parțial pe coordonate nenule
+Paginarea e pe cursor (id crescător), deci fiecare pagină e un range scan pe cheia primară.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Occurrence, ReserveDataVersion, Species
+from .refdata import resolve_ids
+
+
+class QueryError(ValueError):
+    """Parametru invalid sau nume necunoscut (răspuns 400)."""
+
+
+# nume public -> cale ORM (proiecția coloanelor prin ?fields=)
+FIELDS = {
+    "id": "id",
+    "species_id": "species_id",
+    "species": "species__denumire_stiintifica",
+    "species_pop": "species__denumire_populara",
+    "family": "species__familia",
+    "class": "species__clasa",
+    "red_book": "species__cartea_rosie_cat",
+    "reserve_id": "reserve_id",
+    "reserve": "reserve__name",
+    "raion": "reserve__raion",
+    "year": "year",
+    "rare": "effective_rare",
+    "lat": "latitude",
+    "lon": "longitude",
+    "source": "source",
+    "observer": "observer",
+}
+DEFAULT_FIELDS = ["id", "species", "reserve", "raion", "year", "rare", "lat", "lon"]
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+def _split(value) -> list:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def _int(value, label):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"Invalid {label}")
+
+
+def _intersect(current, ids):
+    ids = set(ids)
+    return ids if current is None else current & ids
+
+
+def _species_ids(params):
+    """Id-urile de specii permise de species/family/class/red_book; None = fără restricție."""
+    allowed = None
+
+    tokens = _split(params.get("species"))
+    if tokens:
+        ids = {int(t) for t in tokens if t.isdigit()}
+        names = {t.lower() for t in tokens if not t.isdigit()}
+        if names:
+            found = dict(Species.objects
+                         .annotate(_name=Lower("denumire_stiintifica"))
+                         .filter(_name__in=names)
+                         .values_list("_name", "id"))
+            missing = names - set(found)
+            if missing:
+                raise QueryError(f"Unknown species: {', '.join(sorted(missing))}")
+            ids |= set(found.values())
+        allowed = _intersect(allowed, ids)
+
+    attrs = Q()
+    family = (params.get("family") or "").strip()
+    if family:
+        attrs &= Q(familia__iexact=family)
+    klass = (params.get("class") or "").strip()
+    if klass:
+        attrs &= Q(clasa__iexact=klass)
+    categories = [c.upper() for c in _split(params.get("red_book"))]
+    if categories:
+        attrs &= Q(cartea_rosie_cat__in=categories)
+    if attrs:
+        allowed = _intersect(allowed, Species.objects.filter(attrs).values_list("id", flat=True))
+    return allowed
+
+
+def _reserve_ids(params):
+    """Id-urile de rezervații permise de reserve/raion; None = fără restricție."""
+    allowed = None
+
+    tokens = _split(params.get("reserve"))
+    if tokens:
+        ids = set()
+        for t in tokens:
+            found = [int(t)] if t.isdigit() else resolve_ids("reserve", t)
+            if not found:
+                raise QueryError(f"Unknown reserve: {t}")
+            ids.update(found)
+        allowed = _intersect(allowed, ids)
+
+    raions = _split(params.get("raion"))
+    if raions:
+        ids = set()
+        for r in raions:
+            found = resolve_ids("raion", r)
+            if not found:
+                raise QueryError(f"Unknown raion: {r}")
+            ids.update(found)
+        allowed = _intersect(allowed, ids)
+    return allowed
+
+
+def _bbox(value):
+    parts = _split(value)
+    if len(parts) != 4:
+        raise QueryError("Invalid bbox (expected min_lon,min_lat,max_lon,max_lat)")
+    try:
+        corners = [Decimal(p) for p in parts]
+    except InvalidOperation:
+        raise QueryError("Invalid bbox (expected min_lon,min_lat,max_lon,max_lat)")
+    if not all(c.is_finite() for c in corners):  # NaN / Infinity nu se pot compara
+        raise QueryError("Invalid bbox (expected min_lon,min_lat,max_lon,max_lat)")
+    min_lon, min_lat, max_lon, max_lat = corners
+    if min_lon > max_lon or min_lat > max_lat:
+        raise QueryError("Invalid bbox (min > max)")
+    return [str(min_lon), str(min_lat), str(max_lon), str(max_lat)]
+
+
+def parse_filters(params) -> dict:
+    """Parametrii GET -> filtre canonice (id-uri sortate, valori normalizate).
+
+    Rezultatul e serializabil JSON și stabil, deci poate fi folosit și ca semnătură de cache.
+    Ridică QueryError pentru parametri invalizi sau nume necunoscute.
+    """
+    species_ids = _species_ids(params)
+    reserve_ids = _reserve_ids(params)
+
+    year_from = (params.get("year_from") or "").strip()
+    year_to = (params.get("year_to") or "").strip()
+    year_from = _int(year_from, "year_from") if year_from else None
+    year_to = _int(year_to, "year_to") if year_to else None
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise QueryError("Invalid year range")
+
+    rare = (params.get("rare") or "").strip().lower()
+    if rare in ("1", "true", "yes", "on"):
+        rare = True
+    elif rare in ("0", "false", "no", "off"):
+        rare = False
+    elif rare:
+        raise QueryError("Invalid rare")
+    else:
+        rare = None
+
+    bbox = (params.get("bbox") or "").strip()
+    return {
+        "species_ids": sorted(species_ids) if species_ids is not None else None,
+        "reserve_ids": sorted(reserve_ids) if reserve_ids is not None else None,
+        "year_from": year_from,
+        "year_to": year_to,
+        "rare": rare,
+        "bbox": _bbox(bbox) if bbox else None,
+    }
+
+
+def filtered_queryset(filters: dict):
+    """QS-ul Occurrence pentru filtrele canonice întoarse de parse_filters()."""
+    qs = Occurrence.objects.all()
+    if filters.get("species_ids") is not None:
+        qs = qs.filter(species_id__in=filters["species_ids"])
+    if filters.get("reserve_ids") is not None:
+        qs = qs.filter(reserve_id__in=filters["reserve_ids"])
+    if filters.get("year_from") is not None:
+        qs = qs.filter(year__gte=filters["year_from"])
+    if filters.get("year_to") is not None:
+        qs = qs.filter(year__lte=filters["year_to"])
+    if filters.get("rare") is not None:
+        qs = qs.filter(effective_rare=filters["rare"])
+    if filters.get("bbox"):
+        min_lon, min_lat, max_lon, max_lat = filters["bbox"]
+        qs = qs.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+    return qs
+
+
+def parse_fields(value) -> list:
+    names = _split(value) or DEFAULT_FIELDS
+    unknown = [n for n in names if n not in FIELDS]
+    if unknown:
+        raise QueryError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def iter_rows(qs, fields, chunk_size=2000):
+    """Rânduri {câmp: valoare} doar cu coloanele cerute (JOIN doar pe tabelele necesare)."""
+    paths = [FIELDS[f] for f in fields]
+    for values in qs.values_list(*paths).iterator(chunk_size=chunk_size):
+        yield {
+            f: (float(v) if isinstance(v, Decimal) else v)
+            for f, v in zip(fields, values)
+        }
+
+
+# ------------------------ fațete ------------------------ #
+
+FACET_LIMIT = 20
+FACET_CACHE_TIMEOUT = 60 * 60
+
+# GROUPING(reserve_id, year, familia, effective_rare): bit 1 = coloana NU e în setul curent
+_FACET_GROUPS = {0b0111: "reserve", 0b1011: "year", 0b1101: "family", 0b1110: "rare"}
+_FACET_TOTAL = 0b1111
+
+
+def _empty_facets():
+    return {"total": 0, **{name: {"buckets": [], "total_buckets": 0} for name in _FACET_GROUPS.values()}}
+
+
+def facet_counts(qs, limit: int = FACET_LIMIT) -> dict:
+    """Numărători pe rezervație / an / familie / raritate pentru setul filtrat `qs`.
+
+    Un singur SELECT cu GROUPING SETS peste subinterogarea filtrată; primele `limit`
+    categorii per fațetă (după număr). Rezultatul e pus în cache pe semnătura SQL a
+    filtrului + ștampila globală de date (ReserveDataVersion), deci se invalidează
+    la orice modificare de ocurențe.
+    Întoarce { total, reserve|year|family|rare: { buckets: [{key, label, count}], total_buckets } }.
+    """
+    try:
+        inner_sql, inner_params = (qs.order_by()
+                                   .values("reserve_id", "year", "species_id", "effective_rare")
+                                   .query.sql_with_params())
+    except EmptyResultSet:
+        return _empty_facets()
+
+    signature = hashlib.md5(repr((inner_sql, inner_params, limit)).encode()).hexdigest()
+    key = f"occ:facets:{signature}:s{ReserveDataVersion.stamp()}"
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    sql = f"""
+        WITH f AS ({inner_sql}),
+        g AS (
+            SELECT GROUPING(f.reserve_id, f.year, s.familia, f.effective_rare) AS gid,
+                   f.reserve_id, r.name AS reserve_name, f.year, s.familia, f.effective_rare,
+                   COUNT(*) AS n
+            FROM f
+            JOIN core_species s ON s.id = f.species_id
+            JOIN core_reserve r ON r.id = f.reserve_id
+            GROUP BY GROUPING SETS ((f.reserve_id, r.name), (f.year), (s.familia), (f.effective_rare), ())
+        ),
+        ranked AS (
+            SELECT g.*,
+                   ROW_NUMBER() OVER (PARTITION BY gid ORDER BY n DESC, reserve_name, year, familia) AS rn,
+                   COUNT(*) OVER (PARTITION BY gid) AS buckets
+            FROM g
+        )
+        SELECT gid, reserve_id, reserve_name, year, familia, effective_rare, n, buckets
+        FROM ranked
+        WHERE rn <= %s
+        ORDER BY gid, rn
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*inner_params, limit])
+        rows = cursor.fetchall()
+
+    facets = _empty_facets()
+    for gid, rid, rname, year, familia, rare, n, buckets in rows:
+        if gid == _FACET_TOTAL:
+            facets["total"] = n
+            continue
+        name = _FACET_GROUPS[gid]
+        if name == "reserve":
+            bucket = {"key": rid, "label": rname, "count": n}
+        elif name == "year":
+            bucket = {"key": year, "label": str(year), "count": n}
+        elif name == "family":
+            bucket = {"key": familia, "label": familia or "—", "count": n}
+        else:
+            bucket = {"key": rare, "label": "Rare" if rare else "Nerare", "count": n}
+        facets[name]["buckets"].append(bucket)
+        facets[name]["total_buckets"] = buckets
+
+    cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,132 @@
+# core/range_metrics.py
+"""EOO / AOO (IUCN) pentru toate speciile, vectorizat cu NumPy.
+
+  - coordonatele sunt proiectate Lambert azimutal echivalent (centrat pe Moldova), deci
+    ariile în km² sunt corecte și grila AOO are celule reale de 2x2 km;
+  - AOO = nr. de celule (specie, cx, cy) distincte, pentru toate speciile dintr-un singur np.unique;
+  - EOO = aria învelitorii convexe (lanț monoton), ridicată la AOO când e mai mică
+    (ghidul IUCN; acoperă și speciile cu sub 3 puncte sau puncte coliniare).
+Incremental: md5 al coordonatelor din fereastra de ani, per specie (un singur GROUP BY);
+se recalculează doar speciile al căror md5 diferă de cel salvat.
+"""
+import numpy as np
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import MD5, Cast, Concat
+
+from .geo import EARTH_RADIUS_KM
+from .models import Occurrence, SpeciesRangeMetrics
+
+AOO_CELL_KM = 2.0
+PROJECTION_CENTER = (47.0, 28.5)  # (lat, lon) ~ centrul Republicii Moldova
+
+
+def project(lat, lon, center=PROJECTION_CENTER):
+    """Lambert azimutal echivalent pe sferă: (lat, lon) în grade -> (x, y) în km."""
+    phi, lam = np.radians(lat), np.radians(lon)
+    phi0, lam0 = np.radians(center[0]), np.radians(center[1])
+    cos_c = np.sin(phi0) * np.sin(phi) + np.cos(phi0) * np.cos(phi) * np.cos(lam - lam0)
+    k = np.sqrt(2.0 / (1.0 + cos_c))
+    x = EARTH_RADIUS_KM * k * np.cos(phi) * np.sin(lam - lam0)
+    y = EARTH_RADIUS_KM * k * (np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(lam - lam0))
+    return x, y
+
+
+def hull_area(x, y) -> float:
+    """Aria (km²) învelitorii convexe a punctelor; 0 pentru mai puțin de 3 puncte necoliniare."""
+    pts = np.unique(np.column_stack([x, y]), axis=0)  # sortate lexicografic (x, apoi y)
+    if len(pts) < 3:
+        return 0.0
+
+    def half(points):
+        chain = []
+        for p in points:
+            while len(chain) >= 2:
+                (ox, oy), (ax, ay) = chain[-2], chain[-1]
+                if (ax - ox) * (p[1] - oy) - (ay - oy) * (p[0] - ox) > 0:
+                    break
+                chain.pop()
+            chain.append(p)
+        return chain[:-1]
+
+    hull = np.array(half(pts) + half(pts[::-1]))
+    hx, hy = hull[:, 0], hull[:, 1]
+    return float(abs(np.dot(hx, np.roll(hy, -1)) - np.dot(hy, np.roll(hx, -1))) / 2.0)
+
+
+def compute(species_ids, lat, lon, cell_km=AOO_CELL_KM):
+    """{species_id: (points, eoo_km2, aoo_cells, aoo_km2)} pentru vectorii paraleli dați."""
+    species_ids = np.asarray(species_ids, dtype=np.int64)
+    if not len(species_ids):
+        return {}
+    x, y = project(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+
+    order = np.argsort(species_ids, kind="stable")
+    species_ids, x, y = species_ids[order], x[order], y[order]
+    uniq, starts, counts = np.unique(species_ids, return_index=True, return_counts=True)
+
+    # AOO: celulele (specie, cx, cy) distincte, apoi numărate per specie
+    cells = np.column_stack([np.searchsorted(uniq, species_ids),
+                             np.floor(x / cell_km).astype(np.int64),
+                             np.floor(y / cell_km).astype(np.int64)])
+    occupied = np.bincount(np.unique(cells, axis=0)[:, 0], minlength=len(uniq))
+
+    out = {}
+    for i, sid in enumerate(uniq):
+        sl = slice(starts[i], starts[i] + counts[i])
+        aoo_km2 = float(occupied[i]) * cell_km * cell_km
+        eoo_km2 = max(hull_area(x[sl], y[sl]), aoo_km2)
+        out[int(sid)] = (int(counts[i]), eoo_km2, int(occupied[i]), aoo_km2)
+    return out
+
+
+def _window_qs(year_from=None, year_to=None):
+    qs = Occurrence.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    if year_from is not None:
+        qs = qs.filter(year__gte=year_from)
+    if year_to is not None:
+        qs = qs.filter(year__lte=year_to)
+    return qs
+
+
+def fingerprints(year_from=None, year_to=None):
+    """{species_id: md5} al coordonatelor din fereastră (ordonate), un singur GROUP BY."""
+    coord = Concat(Cast("latitude", CharField()), Value(","), Cast("longitude", CharField()),
+                   output_field=CharField())
+    qs = (_window_qs(year_from, year_to)
+          .values("species_id")
+          .annotate(fp=MD5(StringAgg(coord, ";", order_by=("latitude", "longitude"))))
+          .values_list("species_id", "fp"))
+    return dict(qs)
+
+
+@transaction.atomic
+def refresh(year_from=None, year_to=None, full=False) -> dict:
+    """Recalculează metricile speciilor cu coordonate schimbate (sau toate, cu full=True sau
+    la schimbarea ferestrei de ani). Întoarce {"updated": n, "deleted": m}."""
+    current = fingerprints(year_from, year_to)
+    same_window = Q(year_from=year_from) if year_from is not None else Q(year_from__isnull=True)
+    same_window &= Q(year_to=year_to) if year_to is not None else Q(year_to__isnull=True)
+    stored = {} if full else dict(SpeciesRangeMetrics.objects.filter(same_window)
+                                  .values_list("species_id", "fingerprint"))
+    dirty = [sid for sid, fp in current.items() if stored.get(sid) != fp]
+
+    deleted = SpeciesRangeMetrics.objects.exclude(species_id__in=list(current)).delete()[0]
+    if not dirty:
+        return {"updated": 0, "deleted": deleted}
+
+    rows = np.array(list(_window_qs(year_from, year_to)
+                         .filter(species_id__in=dirty)
+                         .values_list("species_id", "latitude", "longitude")), dtype=float)
+    metrics = compute(rows[:, 0].astype(np.int64), rows[:, 1], rows[:, 2])
+    SpeciesRangeMetrics.objects.bulk_create(
+        [SpeciesRangeMetrics(species_id=sid, year_from=year_from, year_to=year_to,
+                             points=points, eoo_km2=eoo, aoo_cells=cells, aoo_km2=aoo,
+                             fingerprint=current[sid])
+         for sid, (points, eoo, cells, aoo) in metrics.items()],
+        batch_size=1000, update_conflicts=True, unique_fields=["species"],
+        update_fields=["year_from", "year_to", "points", "eoo_km2", "aoo_cells", "aoo_km2",
+                       "fingerprint", "computed_at"],
+    )
+    return {"updated": len(metrics), "deleted": deleted}
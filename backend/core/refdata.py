@@ -0,0 +1,139 @@
+# core/refdata.py
+"""Date de referință ținute în cache, validate printr-o generație per tabel (RefDataVersion).
+
+Generația e incrementată de semnalele post_save/post_delete (signals.py) și citită din baza de
+date o singură dată per cerere (memoria se golește la request_started, vezi apps.py; în afara
+cererilor expiră după GENERATION_MAX_AGE), deci e văzută de toate procesele, iar listele din
+memorie se servesc fără nicio interogare.
+Excepție: .update() / bulk_create() nu trimit semnale — după ele apelați bump_generation().
+
+- nume -> id: filtrele primesc nume (rezervație, raion, site, habitat); le transformăm o singură
+  dată în id-uri, iar interogările principale filtrează pe FK-uri indexate, fără JOIN + UPPER().
+  Harta e în cache sub o cheie care conține generația, deci o hartă veche nu mai e citită.
+- liste pentru dropdown-uri (rezervații, raioane, situri, habitate): ținute în memoria procesului
+  împreună cu generația din care au fost construite; se reîncarcă atunci când generația diferă.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Habitat, RefDataVersion, Reserve, Site
+
+REFDATA_TIMEOUT = 60 * 60
+# în afara cererilor (comenzi, worker-i) generațiile se recitesc după cel mult atâtea secunde
+GENERATION_MAX_AGE = 5
+
+# tip -> (model, câmpuri după care se caută; id-ul întors e mereu pk-ul modelului)
+NAME_SOURCES = {
+    "reserve": (Reserve, ("name",)),
+    "raion": (Reserve, ("raion",)),  # raion -> id-urile rezervațiilor din raion
+    "site": (Site, ("name",)),
+    "habitat": (Habitat, ("name_romanian", "name_english", "code")),
+}
+
+
+def _norm(value) -> str:
+    return (value or "").strip().lower()
+
+
+# (momentul citirii, {tabel: generație}) din cererea curentă; None = de citit
+_generations = None
+
+
+def _generation(model) -> str:
+    """Generația tabelului `model`; primul apel din cerere citește toate rândurile (o interogare)."""
+    global _generations
+    if _generations is None or time.monotonic() - _generations[0] > GENERATION_MAX_AGE:
+        _generations = (time.monotonic(), RefDataVersion.current())
+    return _generations[1].get(model._meta.model_name, "0")
+
+
+def reset_generations():
+    """Uită generațiile citite (la începutul fiecărei cereri, vezi apps.py)."""
+    global _generations
+    _generations = None
+
+
+def bump_generation(model):
+    """Marchează datele de referință din `model` ca schimbate (toate procesele)."""
+    RefDataVersion.bump(model._meta.model_name)
+    reset_generations()
+
+
+def name_map(kind: str) -> dict:
+    """{nume normalizat: [id, ...]} pentru tipul cerut; construit o dată per generație, apoi din cache."""
+    model, fields = NAME_SOURCES[kind]
+    key = f"refdata:names:{kind}:{_generation(model)}"
+    mapping = cache.get(key)
+    if mapping is None:
+        found = {}
+        for row in model.objects.values_list("id", *fields):
+            pk, values = row[0], row[1:]
+            for v in values:
+                if v:
+                    found.setdefault(_norm(v), set()).add(pk)
+        mapping = {name: sorted(ids) for name, ids in found.items()}
+        cache.set(key, mapping, REFDATA_TIMEOUT)
+    return mapping
+
+
+def resolve_ids(kind: str, value) -> list:
+    """Id-urile pentru un nume (case-insensitive); [] dacă numele nu există."""
+    name = _norm(value)
+    if not name:
+        return []
+    ids = name_map(kind).get(name)
+    if ids:
+        return ids
+    # cache-ul poate fi vechi (alt proces a adăugat/redenumit): verificare punctuală
+    # pe indexurile funcționale lower(...), fără scanarea tabelului
+    model, fields = NAME_SOURCES[kind]
+    annotations = {f"_lower_{f}": Lower(f) for f in fields}
+    q = Q()
+    for f in fields:
+        q |= Q(**{f"_lower_{f}": name})
+    return sorted(model.objects.annotate(**annotations).filter(q).values_list("id", flat=True))
+
+
+# ------------------------ liste pentru dropdown-uri ------------------------ #
+
+# tip -> (model, încărcarea listei)
+REF_LISTS = {
+    "reserves": (Reserve, lambda: list(Reserve.objects.order_by("name").values("id", "name", "raion"))),
+    "raions": (Reserve, lambda: list(Reserve.objects
+                                     .exclude(raion__isnull=True).exclude(raion="")
+                                     .values_list("raion", flat=True).distinct().order_by("raion"))),
+    "sites": (Site, lambda: list(Site.objects.order_by("name").values_list("name", flat=True))),
+    "habitats": (Habitat, lambda: list(Habitat.objects
+                                       .order_by("name_romanian", "name_english")
+                                       .values_list("name_romanian", flat=True))),
+}
+
+# tip -> (generație, listă); copia locală a procesului
+_LOCAL_LISTS = {}
+
+
+def ref_list(kind: str) -> list:
+    """Lista ordonată pentru dropdown-ul `kind` (vezi REF_LISTS); dacă e la zi, nicio interogare
+    (în afară de citirea generațiilor, o dată per cerere).
+
+    rezervații -> [{id, name, raion}], celelalte -> [str]. Nu modificați lista întoarsă (e partajată).
+    """
+    model, load = REF_LISTS[kind]
+    gen = _generation(model)
+    cached = _LOCAL_LISTS.get(kind)
+    if cached is not None and cached[0] == gen:
+        return cached[1]
+    value = load()
+    _LOCAL_LISTS[kind] = (gen, value)
+    return value
+
+
+def warm():
+    """Încarcă toate listele și hărțile de nume (la pornirea procesului, vezi apps.py)."""
+    for kind in REF_LISTS:
+        ref_list(kind)
+    for kind in NAME_SOURCES:
+        name_map(kind)
@@ -0,0 +1,112 @@
+# core/saved_filters.py
+"""Filtre salvate: tipurile suportate și snapshot-urile listelor de id-uri.
+
+Fiecare tip știe să construiască QS-ul din parametrii salvați (aceleași funcții ca paginile
+de filtrare) și să transforme un obiect în rândul de tabel/export. Snapshot-ul păstrează
+id-urile în ordinea rezultatului; deschiderea/exportul citesc doar rândurile paginii curente
+prin cheia primară, fără a re-rula JOIN-urile filtrului.
+"""
+from collections import namedtuple
+
+from django.utils import timezone
+
+from .models import Occurrence, ReserveAssociationYear, ReserveDataVersion, SavedFilter
+
+Kind = namedtuple("Kind", "model related headers build row")
+
+SNAPSHOT_CHUNK = 2000
+
+
+def _occurrence_row(o):
+    return [
+        o.reserve.name,
+        o.reserve.raion or "",
+        o.species.denumire_stiintifica,
+        o.species.denumire_populara or "",
+        o.year,
+        "Da" if o.effective_rare else "Nu",
+        o.latitude if o.latitude is not None else "",
+        o.longitude if o.longitude is not None else "",
+    ]
+
+
+def _association_row(link):
+    return [link.reserve.name, link.association.name, link.year, link.notes or ""]
+
+
+def _build_plante(params):
+    from .views import _build_occurrence_filters_queryset
+    return _build_occurrence_filters_queryset(
+        (params.get("mode") or "by_reserve_all").strip(),
+        (params.get("reserve_name") or "").strip(),
+        (params.get("raion") or "").strip(),
+    )
+
+
+def _build_asociatii(params):
+    from .views import _build_association_filters_queryset
+    return _build_association_filters_queryset(
+        (params.get("mode") or "by_reserve_year").strip(),
+        (params.get("reserve_name") or "").strip(),
+        (params.get("year") or "").strip(),
+    )
+
+
+def _build_ocurente(params):
+    from .occurrence_query import QueryError, filtered_queryset, parse_filters
+    try:
+        filters = parse_filters(params)
+    except QueryError as e:
+        return Occurrence.objects.none(), str(e)
+    return filtered_queryset(filters).order_by("id"), None
+
+
+OCCURRENCE_HEADERS = ["Rezervație", "Raion", "Specie (științific)", "Specie (popular)", "An", "Rară?", "Lat", "Lon"]
+
+KINDS = {
+    "plante": Kind(Occurrence, ("species", "reserve"), OCCURRENCE_HEADERS, _build_plante, _occurrence_row),
+    "asociatii": Kind(ReserveAssociationYear, ("reserve", "association"),
+                      ["Rezervație", "Asociație", "An", "Note"], _build_asociatii, _association_row),
+    "ocurente": Kind(Occurrence, ("species", "reserve"), OCCURRENCE_HEADERS, _build_ocurente, _occurrence_row),
+}
+
+
+def build_queryset(sf: SavedFilter):
+    """(qs, error) pentru filtrul salvat, rulat live."""
+    return KINDS[sf.kind].build(sf.params)
+
+
+def refresh_snapshot(sf: SavedFilter, stamp: int = None) -> SavedFilter:
+    """Recalculează lista de id-uri. Ștampila e citită ÎNAINTE de interogare: o modificare
+    concurentă lasă snapshot-ul marcat ca învechit, nu ascunde schimbarea."""
+    if stamp is None:
+        stamp = ReserveDataVersion.stamp()
+    qs, error = build_queryset(sf)
+    ids = [] if error else list(qs.values_list("id", flat=True))
+    sf.result_ids = ids
+    sf.result_count = len(ids)
+    sf.snapshot_stamp = stamp
+    sf.snapshot_at = timezone.now()
+    sf.save(update_fields=["result_ids", "result_count", "snapshot_stamp", "snapshot_at", "updated_at"])
+    return sf
+
+
+def stale_filters(stamp: int = None):
+    if stamp is None:
+        stamp = ReserveDataVersion.stamp()
+    return (SavedFilter.objects
+            .filter(snapshot_enabled=True)
+            .exclude(snapshot_stamp=stamp, result_ids__isnull=False))
+
+
+def objects_for_ids(sf: SavedFilter, ids):
+    """Obiectele pentru id-urile date, în ordinea snapshot-ului (rândurile șterse între timp lipsesc)."""
+    kind = KINDS[sf.kind]
+    found = kind.model.objects.select_related(*kind.related).in_bulk(list(ids))
+    return [found[i] for i in ids if i in found]
+
+
+def iter_snapshot_objects(sf: SavedFilter):
+    ids = sf.result_ids or []
+    for start in range(0, len(ids), SNAPSHOT_CHUNK):
+        yield from objects_for_ids(sf, ids[start:start + SNAPSHOT_CHUNK])
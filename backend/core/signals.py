@@ -1,7 +1,15 @@
 from django.contrib.auth.models import Group, User
-from django.db.models.signals import m2m_changed, post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from .dossier import invalidate_all as invalidate_dossiers
+from .models import (
+    Association, Habitat, Occurrence, RaionSummary, Reserve, ReserveAssociationYear, ReserveDataVersion,
+    Site, SiteHabitat, Species, YearlyCount,
+)
+from .refdata import bump_generation
+
 
 ADMIN_GROUP_NAME = "Administrators"
 CONTRIB_GROUP_NAME = "Contributors"
@@ -43,3 +51,230 @@ def on_user_created(sender, instance: User, created: bool, **kwargs):
         if changed:
             instance.save(update_fields=["is_active", "is_staff"])
 
+
+# ---------------- versiuni de date per rezervație (invalidare cache) ----------------
+
+@receiver(pre_save, sender=Occurrence)
+def on_occurrence_pre_save(sender, instance: Occurrence, **kwargs):
+    # reține rezervația/specia veche: dacă ocurența e mutată, se schimbă ambele părți
+    instance._old_reserve_id = instance._old_species_id = None
+    if instance.pk:
+        old = (Occurrence.objects
+               .filter(pk=instance.pk)
+               .values_list("reserve_id", "species_id")
+               .first())
+        if old:
+            instance._old_reserve_id, instance._old_species_id = old
+
+
+@receiver(post_save, sender=Occurrence)
+def on_occurrence_saved(sender, instance: Occurrence, **kwargs):
+    reserve_ids = [instance.reserve_id, getattr(instance, "_old_reserve_id", None)]
+    ReserveDataVersion.bump(reserve_ids)
+    _refresh_occurrence_series(reserve_ids, [instance.species_id, getattr(instance, "_old_species_id", None)])
+
+
+@receiver(post_delete, sender=Occurrence)
+def on_occurrence_deleted(sender, instance: Occurrence, **kwargs):
+    ReserveDataVersion.bump([instance.reserve_id])
+    _refresh_occurrence_series([instance.reserve_id], [instance.species_id])
+
+
+@receiver(pre_save, sender=Reserve)
+def on_reserve_pre_save(sender, instance: Reserve, **kwargs):
+    instance._old_name = instance._old_raion = instance._old_surface = None
+    if instance.pk:
+        old = Reserve.objects.filter(pk=instance.pk).values_list("name", "raion", "suprafata_ha").first()
+        if old:
+            instance._old_name, instance._old_raion, instance._old_surface = old
+
+
+@receiver(post_save, sender=Reserve)
+def on_reserve_saved(sender, instance: Reserve, created: bool, **kwargs):
+    # numele/raionul apar în rezultatele puse în cache
+    if created:
+        _refresh_raion_summary([instance.raion])
+    else:
+        ReserveDataVersion.bump([instance.pk])
+        if getattr(instance, "_old_name", None) != instance.name:
+            Occurrence.sync_sort_keys(reserve=instance)
+        old_raion = getattr(instance, "_old_raion", None)
+        if old_raion != instance.raion:
+            _refresh_year_series(raion=[old_raion, instance.raion])
+        elif getattr(instance, "_old_surface", None) != instance.suprafata_ha:
+            _refresh_raion_summary([instance.raion])
+
+
+@receiver(post_delete, sender=Reserve)
+def on_reserve_deleted(sender, instance: Reserve, **kwargs):
+    _refresh_raion_summary([instance.raion])
+
+
+# câmpurile speciei citite de cache-urile marcate cu versiunea/ștampila datelor
+# (comparații, fațete, dosar, detaliu specie, hărți filtrate pe red_book/class, filtre salvate)
+SPECIES_VERSIONED_FIELDS = {
+    "denumire_stiintifica", "denumire_populara", "is_rare", "familia", "clasa", "cartea_rosie_cat",
+}
+
+
+@receiver(post_save, sender=Species)
+def on_species_saved(sender, instance: Species, created: bool, update_fields=None, **kwargs):
+    # raritatea, numele, taxonomia și categoria speciei intră în comparații/fațete/dosar
+    # -> toate rezervațiile în care apare
+    if created:
+        return
+    if update_fields is not None and not (set(update_fields) & SPECIES_VERSIONED_FIELDS):
+        return
+    reserve_ids = list(Occurrence.objects
+                       .filter(species_id=instance.pk)
+                       .values_list("reserve_id", flat=True)
+                       .distinct())
+    if update_fields is None or "is_rare" in update_fields:
+        if Occurrence.sync_effective_rare(instance):
+            _refresh_occurrence_series(reserve_ids, [instance.pk])
+    if update_fields is None or "denumire_stiintifica" in update_fields:
+        Occurrence.sync_sort_keys(species=instance)
+    ReserveDataVersion.bump(reserve_ids)
+
+
+# ---------------- date de referință (refdata): nume -> id, liste dropdown ----------------
+
+@receiver(post_save, sender=Reserve)
+@receiver(post_delete, sender=Reserve)
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+@receiver(post_save, sender=Habitat)
+@receiver(post_delete, sender=Habitat)
+def on_refdata_changed(sender, **kwargs):
+    bump_generation(sender)
+
+
+# ---------------- rollup-uri (YearlyCount, RaionSummary) ----------------
+
+class _RollupBatch:
+    """Cheile atinse într-o tranzacție, recalculate o singură dată la commit (refresh idempotent).
+
+    Ștergerea în cascadă a unei rezervații cu 200 de ocurențe trimite 200 de post_delete; toate
+    ajung în același lot, deci un singur refresh pe dimensiune și unul pentru RaionSummary.
+    """
+
+    def __init__(self, savepoints):
+        self.savepoints = savepoints
+        self.keys = {}  # dimensiune YearlyCount -> chei
+        self.summary_raions = set()  # raioane de recalculat doar în RaionSummary
+        self.reserve_raions = {}  # rezervație -> raion, citit o dată per lot
+        self.done = False
+
+    def add(self, dimension, keys):
+        self.keys.setdefault(dimension, set()).update(k for k in keys if k not in (None, ""))
+
+    def __call__(self):
+        self.done = True
+        for dimension, keys in self.keys.items():
+            YearlyCount.refresh(dimension, keys)
+        raions = self.keys.get("raion", set()) | self.summary_raions
+        if raions:
+            RaionSummary.refresh(raions)
+
+
+def _queue_rollups(fill):
+    """Adaugă cheile (fill(lot)) în lotul tranzacției curente; primul apel îl programează on_commit.
+
+    Lotul e ținut pe conexiune, per nivel de savepoint (ca intrările on_commit); dacă a rulat deja
+    ori nu mai e în coada on_commit (tranzacție sau savepoint anulat), se începe unul nou.
+    În autocommit, on_commit îl rulează imediat.
+    """
+    conn = transaction.get_connection()
+    batch = getattr(conn, "_rollup_batch", None)
+    queued = (batch is not None and not batch.done and batch.savepoints == conn.savepoint_ids
+              and any(entry[1] is batch for entry in conn.run_on_commit))
+    if not queued:
+        batch = conn._rollup_batch = _RollupBatch(list(conn.savepoint_ids))
+    fill(batch)
+    if not queued:
+        transaction.on_commit(batch)
+
+
+def _refresh_year_series(**keys_by_dimension):
+    """Recalculează rollup-ul doar pentru cheile atinse, după commit (o dată per tranzacție)."""
+    def fill(batch):
+        for dimension, keys in keys_by_dimension.items():
+            batch.add(dimension, keys)
+
+    _queue_rollups(fill)
+
+
+def _refresh_raion_summary(raions):
+    """Rollup-ul pe raioane (harta choropleth), după commit; tot ce schimbă ocurențele trece prin
+    _refresh_year_series(raion=...), aici doar modificările rezervației fără ocurențe atinse."""
+    raions = [r for r in raions if r]
+    if raions:
+        _queue_rollups(lambda batch: batch.summary_raions.update(raions))
+
+
+def _refresh_occurrence_series(reserve_ids, species_ids):
+    reserve_ids = [r for r in reserve_ids if r is not None]
+
+    def fill(batch):
+        # raionul se citește acum: la ștergerea în cascadă a unei rezervații, rândul ei încă
+        # există; o singură citire per rezervație și lot
+        missing = [r for r in reserve_ids if r not in batch.reserve_raions]
+        if missing:
+            batch.reserve_raions.update(Reserve.objects.filter(pk__in=missing).values_list("id", "raion"))
+        batch.add("species", species_ids)
+        batch.add("reserve", reserve_ids)
+        batch.add("raion", [batch.reserve_raions.get(r) for r in reserve_ids])
+
+    _queue_rollups(fill)
+
+
+@receiver(pre_save, sender=ReserveAssociationYear)
+@receiver(pre_save, sender=SiteHabitat)
+def on_link_pre_save(sender, instance, **kwargs):
+    field = "association_id" if sender is ReserveAssociationYear else "habitat_id"
+    instance._old_series_key = None
+    if instance.pk:
+        instance._old_series_key = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=ReserveAssociationYear)
+@receiver(post_delete, sender=ReserveAssociationYear)
+def on_association_link_changed(sender, instance, **kwargs):
+    # asociațiile fac parte din datele rezervației (filtre salvate, dosar)
+    ReserveDataVersion.bump([instance.reserve_id])
+    _refresh_year_series(association=[instance.association_id, getattr(instance, "_old_series_key", None)])
+
+
+@receiver(post_save, sender=SiteHabitat)
+@receiver(post_delete, sender=SiteHabitat)
+def on_habitat_link_changed(sender, instance, **kwargs):
+    _refresh_year_series(habitat=[instance.habitat_id, getattr(instance, "_old_series_key", None)])
+
+
+# ---------------- dosarul rezervației ----------------
+
+@receiver(post_save, sender=Association)
+def on_association_saved(sender, instance: Association, created: bool, **kwargs):
+    # numele asociației apare în dosarele rezervațiilor legate de ea
+    if not created:
+        ReserveDataVersion.bump(instance.reserve_links.values_list("reserve_id", flat=True).distinct())
+
+
+SITE_DOSSIER_FIELDS = ("code", "name", "latitude", "longitude")
+
+
+@receiver(pre_save, sender=Site)
+def on_site_pre_save(sender, instance: Site, **kwargs):
+    instance._old_dossier_fields = None
+    if instance.pk:
+        instance._old_dossier_fields = Site.objects.filter(pk=instance.pk).values_list(*SITE_DOSSIER_FIELDS).first()
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def on_site_changed(sender, instance: Site, **kwargs):
+    # situl apropiat intră în dosarul oricărei rezervații; metadatele (note etc.) nu contează
+    current = tuple(getattr(instance, f) for f in SITE_DOSSIER_FIELDS)
+    if kwargs.get("signal") is post_save and getattr(instance, "_old_dossier_fields", None) == current:
+        return
+    invalidate_dossiers()
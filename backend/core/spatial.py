@@ -0,0 +1,83 @@
+# core/spatial.py
+"""Interogări spațiale pe PostgreSQL simplu (fără PostGIS), peste coloana `geohash`.
+
+Modelele cu coordonate (Occurrence, Reserve, Site) țin un geohash întreținut în save(),
+cu index B-tree varchar_pattern_ops. Interogările folosesc prefixele care acoperă zona
+(`geohash LIKE 'u8k5%' OR ...`, range scan pe index), apoi filtrul exact:
+
+  Model.objects.within_bbox(min_lon, min_lat, max_lon, max_lat)
+  Model.objects.within_radius(lat, lon, km)        -> adnotat cu distance_km
+  Model.objects.nearest(lat, lon, k=10)            -> primele k, după distance_km
+"""
+from functools import reduce
+from math import asin, cos, degrees, pi, radians, sin
+from operator import or_
+
+from django.db import models
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+from .geo import EARTH_RADIUS_KM, geohash_cover, geohash_encode
+
+NEAREST_START_KM = 5.0
+NEAREST_MAX_KM = pi * EARTH_RADIUS_KM  # jumătate de circumferință: tot globul
+
+
+def geohash_for(lat, lon) -> str:
+    if lat is None or lon is None:
+        return ""
+    return geohash_encode(lat, lon)
+
+
+def _radius_bbox(lat, lon, km):
+    """Dreptunghiul care cuprinde cercul haversine de rază `km` (aceeași rază a Pământului ca
+    distance_expression): Δφ = km / R, iar Δλ maxim al calotei = asin(sin(km / R) / cos φ)."""
+    angle = min(km / EARTH_RADIUS_KM, pi / 2)
+    dlat = degrees(angle)
+    ratio = sin(angle) / max(cos(radians(lat)), 0.01)
+    dlon = degrees(asin(ratio)) if ratio < 1 else 180.0
+    return lon - dlon, max(lat - dlat, -90.0), lon + dlon, min(lat + dlat, 90.0)
+
+
+def distance_expression(lat, lon):
+    """Expresie SQL (haversine, km) între coordonatele rândului și punctul dat."""
+    lat_r, lon_r = radians(lat), radians(lon)
+    row_lat = Radians(Cast("latitude", FloatField()))
+    row_lon = Radians(Cast("longitude", FloatField()))
+    a = (Power(Sin((row_lat - Value(lat_r)) / Value(2.0)), 2)
+         + Value(cos(lat_r)) * Cos(row_lat) * Power(Sin((row_lon - Value(lon_r)) / Value(2.0)), 2))
+    return models.ExpressionWrapper(Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a)), output_field=FloatField())
+
+
+class SpatialQuerySet(models.QuerySet):
+
+    def _geohash_prefilter(self, min_lon, min_lat, max_lon, max_lat):
+        prefixes = [p for p in geohash_cover(min_lon, min_lat, max_lon, max_lat) if p]
+        qs = self.exclude(geohash="")
+        if prefixes:
+            qs = qs.filter(reduce(or_, (Q(geohash__startswith=p) for p in prefixes)))
+        return qs
+
+    def within_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Rândurile cu coordonate în dreptunghiul dat (grade zecimale, inclusiv)."""
+        return (self._geohash_prefilter(min_lon, min_lat, max_lon, max_lat)
+                .filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)))
+
+    def within_radius(self, lat, lon, km):
+        """Rândurile la cel mult `km` de punct, adnotate cu `distance_km`."""
+        lat, lon, km = float(lat), float(lon), float(km)
+        min_lon, min_lat, max_lon, max_lat = _radius_bbox(lat, lon, km)
+        return (self._geohash_prefilter(min_lon, min_lat, max_lon, max_lat)
+                .annotate(distance_km=distance_expression(lat, lon))
+                .filter(distance_km__lte=km))
+
+    def nearest(self, lat, lon, k: int = 10, max_km: float = NEAREST_MAX_KM):
+        """Cele mai apropiate `k` rânduri (ordonate după `distance_km`).
+
+        Raza de căutare se dublează până cuprinde cel puțin k rânduri: tot ce e în afara
+        razei e mai departe decât orice rând din interior, deci primele k sunt exacte.
+        """
+        km = NEAREST_START_KM
+        while km < max_km and self.within_radius(lat, lon, km).count() < k:
+            km *= 2
+        return self.within_radius(lat, lon, min(km, max_km)).order_by("distance_km", "pk")[:k]
@@ -1,3 +1,1371 @@
-from django.test import TestCase
+import json
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (
+    Association, CoordinateIssue, DuplicateCluster, NearestLink, Occurrence, Reserve, ReserveAssociationYear, ReserveDossier, SavedFilter, Site,
+    RaionSummary, RefDataVersion, ReserveDataVersion, ReserveYearTurnover, Species, SpeciesRangeMetrics, YearlyCount,
+)
+from .coord_quality import scan as scan_coordinates
+from .coords import CoordinateParser
+from .dedup import candidate_pairs, detect as detect_duplicates
+from .management.commands.bench_coord_parser import legacy_parse_coords
+from .management.commands.compute_turnover import affected_partitions, diff_sorted
+from .geo import EARTH_RADIUS_KM, geohash_encode, haversine_km_np
+from .heatmap import unrle
+from .nearby import nearby_for, refresh_changed
+from .range_metrics import refresh as refresh_range_metrics
+from .refdata import name_map, ref_list, reset_generations, resolve_ids
+from .spatial import _radius_bbox
+from .tiles import EMPTY_TILE, TILE_SIZE, build as build_tiles, pixel_xy, read_manifest, tile_path
+from .views import _accumulation_curves, _comparison_matrix, _raion_aggregates, _rare_years_by_reserve
+
+
+class ComparatiiPlanteDataTests(TestCase):
+    """comparatii_plante_data: comun / unic / reuniune calculate în DB."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.r1 = Reserve.objects.create(name="Rezervația A", raion="Orhei")
+        cls.r2 = Reserve.objects.create(name="Rezervația B", raion="Orhei")
+        cls.r3 = Reserve.objects.create(name="Rezervația C", raion="Soroca")
+        cls.rare = {
+            name: Species.objects.create(denumire_stiintifica=name, is_rare=True)
+            for name in ("Adonis vernalis", "Iris pumila", "Paeonia tenuifolia", "Stipa pennata", "Tulipa biebersteiniana")
+        }
+        cls.common_sp = Species.objects.create(denumire_stiintifica="Quercus robur")
+
+        seed = {
+            cls.r1: ["Adonis vernalis", "Iris pumila", "Paeonia tenuifolia"],
+            cls.r2: ["Adonis vernalis", "Iris pumila", "Stipa pennata"],
+            cls.r3: ["Adonis vernalis", "Tulipa biebersteiniana"],
+        }
+        for reserve, names in seed.items():
+            for name in names:
+                Occurrence.objects.create(species=cls.rare[name], reserve=reserve, year=2015)
+        # aceeași specie în doi ani diferiți nu trebuie numărată de două ori
+        Occurrence.objects.create(species=cls.rare["Paeonia tenuifolia"], reserve=cls.r1, year=2020)
+        # specie nerară, prezentă peste tot
+        for reserve in (cls.r1, cls.r2, cls.r3):
+            Occurrence.objects.create(species=cls.common_sp, reserve=reserve, year=2015)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        resp = self.client.get(reverse("comparatii_plante_data"), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    @staticmethod
+    def _names(rows):
+        return [row["name"] for row in rows]
+
+    def test_two_reserves(self):
+        data = self._get(res=f"{self.r1.id},{self.r2.id}")
+        self.assertEqual([r["id"] for r in data["reserves"]], [self.r1.id, self.r2.id])
+        self.assertEqual(self._names(data["common"]), ["Adonis vernalis", "Iris pumila"])
+        self.assertEqual(self._names(data["unique"][str(self.r1.id)]), ["Paeonia tenuifolia"])
+        self.assertEqual(self._names(data["unique"][str(self.r2.id)]), ["Stipa pennata"])
+        self.assertEqual(data["totalDistinct"], 4)
+
+    def test_n_reserves(self):
+        data = self._get(res=f"{self.r3.id},{self.r1.id},{self.r2.id}")
+        self.assertEqual([r["id"] for r in data["reserves"]], [self.r3.id, self.r1.id, self.r2.id])
+        self.assertEqual(self._names(data["common"]), ["Adonis vernalis"])
+        self.assertEqual(self._names(data["unique"][str(self.r3.id)]), ["Tulipa biebersteiniana"])
+        # Iris pumila e în A și B -> nu e unică nici uneia
+        self.assertEqual(self._names(data["unique"][str(self.r1.id)]), ["Paeonia tenuifolia"])
+        self.assertEqual(self._names(data["unique"][str(self.r2.id)]), ["Stipa pennata"])
+        union = {row["name"]: row["reserves"] for row in data["union"]}
+        self.assertEqual(union["Adonis vernalis"], 3)
+        self.assertEqual(union["Iris pumila"], 2)
+        self.assertEqual(data["totalDistinct"], 5)
+
+    def test_rare_flag_off_includes_all_species(self):
+        data = self._get(res=f"{self.r1.id},{self.r2.id}", rare="0")
+        self.assertIn("Quercus robur", self._names(data["common"]))
+        self.assertEqual(data["totalDistinct"], 5)
+
+    def test_no_reserves(self):
+        data = self._get(res="")
+        self.assertEqual(data, {"reserves": [], "common": [], "unique": {}, "union": [], "totalDistinct": 0})
+
+    def test_export_matches_data(self):
+        resp = self.client.get(reverse("comparatii_plante_export"), {"res": f"{self.r1.id},{self.r2.id}"})
+        self.assertEqual(resp.status_code, 200)
+        lines = b"".join(resp.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines[0], "Tip,Specie (științific),Rezervația A,Rezervația B")
+        self.assertIn("Unic Rezervația A,Paeonia tenuifolia,Da,Nu", lines)
+        self.assertIn("Comun,Iris pumila,Da,Da", lines)
+        self.assertEqual(len(lines), 5)
+
+
+class ComparisonMatrixCacheTests(TestCase):
+    """_comparison_matrix / _rare_years_by_reserve: cache marcat cu versiunea fiecărei rezervații."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.a = Reserve.objects.create(name="Rezervația A")
+        cls.b = Reserve.objects.create(name="Rezervația B")
+        cls.c = Reserve.objects.create(name="Rezervația C")
+        cls.sp = [Species.objects.create(denumire_stiintifica=f"Specia {i}", is_rare=True) for i in range(6)]
+        for reserve, year, members in [(cls.a, 2000, [0, 1, 2, 3]), (cls.a, 2005, [1, 2, 4]),
+                                       (cls.b, 2001, [1, 5]), (cls.c, 2001, [2])]:
+            for i in members:
+                Occurrence.objects.create(species=cls.sp[i], reserve=reserve, year=year)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_edit_invalidates_only_matrices_with_the_reserve(self):
+        with_b = [(self.a.pk, 2000), (self.b.pk, 2001)]
+        without_b = [(self.a.pk, 2000), (self.c.pk, 2001)]
+        _comparison_matrix(with_b)
+        _comparison_matrix(without_b)
+        self.assertEqual(_rare_years_by_reserve([self.a.pk, self.b.pk]), {self.a.pk: [2005, 2000], self.b.pk: [2001]})
+
+        Occurrence.objects.create(species=self.sp[3], reserve=self.b, year=2003)
+
+        with self.assertNumQueries(1):  # doar versiunile: matricea fără B vine din cache
+            _comparison_matrix(without_b)
+        with self.assertNumQueries(2):  # versiuni + recalculare
+            rows = _comparison_matrix(with_b)
+        self.assertEqual({r["species_name"]: r["presence"] for r in rows}["Specia 1"], [True, True])
+        with self.assertNumQueries(2):  # A din cache, B recalculată
+            years = _rare_years_by_reserve([self.a.pk, self.b.pk])
+        self.assertEqual(years[self.b.pk], [2003, 2001])
+
+    def test_paging_slices_cached_matrix(self):
+        self.client.force_login(self.user)
+        url = reverse("comparatii_plante_detail", args=[self.a.pk])
+        params = {"mode": "years", "years": "2000,2005", "per_page": 2}
+        first = self.client.get(url, {**params, "page": 1})
+        self.assertEqual(first.context["total_species"], 5)
+        self.assertEqual([r["species_name"] for r in first.context["rows"]], ["Specia 0", "Specia 1"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url, {**params, "page": 3})
+        self.assertEqual([r["species_name"] for r in second.context["rows"]], ["Specia 4"])
+        self.assertEqual(second.context["rows"][0]["presence"], [False, True])
+        self.assertFalse([q for q in ctx.captured_queries if "core_occurrence" in q["sql"]])
+
+
+class RaionComparisonTests(TestCase):
+    """_raion_aggregates / comparatii_raioane: totaluri, rânduri pe ani și defalcarea pe Cartea Roșie."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        codrii = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        plai = Reserve.objects.create(name="Plaiul", raion="Strășeni")
+        prut = Reserve.objects.create(name="Prutul", raion="Cahul")
+        Reserve.objects.create(name="Fără raion")
+        iris = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True, cartea_rosie_cat="VU")
+        stipa = Species.objects.create(denumire_stiintifica="Stipa pennata", cartea_rosie_cat="EN")
+        oak = Species.objects.create(denumire_stiintifica="Quercus robur")
+        for reserve, species, year, rare in [
+            (codrii, iris, 2000, False), (plai, iris, 2000, False), (plai, stipa, 2000, False),
+            (codrii, oak, 2005, True), (prut, oak, 2005, False), (prut, stipa, 2010, False),
+        ]:
+            Occurrence.objects.create(species=species, reserve=reserve, year=year, is_rare=rare)
+
+    def test_aggregates(self):
+        data = _raion_aggregates()
+        self.assertEqual(set(data), {"Strășeni", "Cahul"})
+        straseni = data["Strășeni"]
+        self.assertEqual(straseni[2000], {"reserves": 2, "species": 2, "rare_species": 1,
+                                          "red_book": {"VU": 1, "EN": 1}})
+        # stejarul e rar doar prin ocurența marcată explicit (effective_rare)
+        self.assertEqual(straseni[2005], {"reserves": 1, "species": 1, "rare_species": 1, "red_book": {}})
+        # totalul numără distinct pe toți anii, nu suma anilor
+        self.assertEqual(straseni["total"], {"reserves": 2, "species": 3, "rare_species": 2,
+                                             "red_book": {"VU": 1, "EN": 1}})
+        self.assertEqual(data["Cahul"]["total"], {"reserves": 1, "species": 2, "rare_species": 0,
+                                                  "red_book": {"EN": 1}})
+
+        only_2005 = _raion_aggregates(["Cahul"], year=2005)
+        self.assertEqual(set(only_2005), {"Cahul"})
+        self.assertEqual(set(only_2005["Cahul"]), {2005, "total"})
+        self.assertEqual(only_2005["Cahul"]["total"]["species"], 1)
+
+    def test_data_endpoint_and_page(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse("comparatii_raioane_data"), {"raions": "Cahul,Strășeni"}).json()
+        self.assertEqual((data["raions"], data["years"]), (["Cahul", "Strășeni"], [2000, 2005, 2010]))
+        self.assertEqual(data["data"]["Cahul"]["2010"]["red_book"], {"EN": 1})
+        self.assertEqual(self.client.get(reverse("comparatii_raioane_data"), {"year": "x"}).status_code, 400)
+
+        resp = self.client.get(reverse("comparatii_raioane"), {"raion": ["Strășeni", "Cahul", "Necunoscut"]})
+        self.assertEqual(resp.context["selected"], ["Strășeni", "Cahul"])
+        self.assertEqual([c["total"]["species"] for c in resp.context["columns"]], [3, 2])
+        rows = {row["year"]: row["cells"] for row in resp.context["year_rows"]}
+        self.assertEqual(list(rows), [2010, 2005, 2000])
+        self.assertIsNone(rows[2010][0])  # Strășeni fără inventar în 2010
+        self.assertEqual(rows[2000][0]["red_book"], {"VU": 1, "EN": 1})
+        self.assertContains(resp, "VU: 1")
+
+
+class AccumulationCurveTests(TestCase):
+    """_accumulation_curves: nr. cumulat de specii distincte pe anii inventariați, pe rezervație / raion."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.codrii = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        cls.plai = Reserve.objects.create(name="Plaiul", raion="Strășeni")
+        sp = [Species.objects.create(denumire_stiintifica=f"Specia {i}", is_rare=i == 0) for i in range(4)]
+        for reserve, i, year in [(cls.codrii, 0, 2000), (cls.codrii, 1, 2000), (cls.codrii, 1, 2005),
+                                 (cls.codrii, 2, 2010), (cls.codrii, 0, 2012),
+                                 (cls.plai, 3, 2001), (cls.plai, 0, 2003), (cls.plai, 2, 2003)]:
+            Occurrence.objects.create(species=sp[i], reserve=reserve, year=year)
+
+    @staticmethod
+    def points(curve):
+        return [(p["year"], p["new"], p["cumulative"]) for p in curve]
+
+    def test_curves_are_monotonic(self):
+        for level in ("reserve", "raion"):
+            for only_rare in (False, True):
+                for curve in _accumulation_curves(level, only_rare=only_rare).values():
+                    totals = [p["cumulative"] for p in curve]
+                    self.assertEqual(totals, sorted(totals))
+                    self.assertEqual(totals[-1], sum(p["new"] for p in curve))
+                    self.assertEqual([p["year"] for p in curve], sorted({p["year"] for p in curve}))
+
+    def test_reserve_vs_raion(self):
+        curves = _accumulation_curves("reserve")
+        # anii fără specii noi (2005, 2012) rămân pe curbă, cu new=0
+        self.assertEqual(self.points(curves[self.codrii.pk]),
+                         [(2000, 2, 2), (2005, 0, 2), (2010, 1, 3), (2012, 0, 3)])
+        self.assertEqual(self.points(curves[self.plai.pk]), [(2001, 1, 1), (2003, 2, 3)])
+
+        # pe raion, o specie văzută întâi în altă rezervație nu mai e nouă
+        raion = _accumulation_curves("raion", "Strășeni")
+        self.assertEqual(list(raion), ["Strășeni"])
+        self.assertEqual(self.points(raion["Strășeni"]),
+                         [(2000, 2, 2), (2001, 1, 3), (2003, 1, 4), (2005, 0, 4), (2010, 0, 4), (2012, 0, 4)])
+        self.assertEqual(self.points(_accumulation_curves("reserve", self.plai.pk, only_rare=True)[self.plai.pk]),
+                         [(2003, 1, 1)])
+
+    def test_data_and_export(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse("accumulation_curves_data"), {"level": "raion", "rare": "1"}).json()
+        self.assertEqual(data["curves"]["Strășeni"][-1]["cumulative"], 1)
+        self.assertEqual(self.client.get(reverse("accumulation_curves_data"), {"level": "x"}).status_code, 400)
+
+        resp = self.client.get(reverse("accumulation_curves_export"))
+        self.assertEqual(resp.status_code, 200)
+        lines = b"".join(resp.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines[0], "Rezervație,An,Specii noi,Specii cumulat")
+        self.assertEqual(lines[1:], ["Codrii,2000,2,2", "Codrii,2005,0,2", "Codrii,2010,1,3", "Codrii,2012,0,3",
+                                     "Plaiul,2001,1,1", "Plaiul,2003,2,3"])
+
+        resp = self.client.get(reverse("accumulation_curves_export"), {"level": "raion", "rare": "1"})
+        lines = b"".join(resp.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines, ["Raion,An,Specii noi,Specii cumulat", "Strășeni,2000,1,1", "Strășeni,2003,0,1",
+                                 "Strășeni,2012,0,1"])
+
+
+class NameResolutionTests(TestCase):
+    """Filtrele rezolvă numele în id-uri (refdata) și raportează numele necunoscute."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.reserve = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        sp = Species.objects.create(denumire_stiintifica="Quercus robur")
+        Occurrence.objects.create(species=sp, reserve=cls.reserve, year=2019)
+
+    def setUp(self):
+        cache.clear()
+        reset_generations()
+        self.client.force_login(self.user)
+
+    def test_resolve_is_case_insensitive(self):
+        self.assertEqual(resolve_ids("reserve", "  CODRII "), [self.reserve.id])
+        self.assertEqual(resolve_ids("raion", "strășeni"), [self.reserve.id])
+        self.assertEqual(resolve_ids("reserve", "Inexistentă"), [])
+
+    def test_map_invalidated_on_save(self):
+        resolve_ids("reserve", "Codrii")  # populează cache-ul
+        other = Reserve.objects.create(name="Plaiul Fagului")
+        self.assertEqual(resolve_ids("reserve", "plaiul fagului"), [other.id])
+        other.name = "Plaiul Fagului II"
+        other.save()
+        self.assertEqual(resolve_ids("reserve", "Plaiul Fagului"), [])
+
+    def test_ref_lists_cached_and_invalidated(self):
+        self.assertEqual([r["name"] for r in ref_list("reserves")], ["Codrii"])
+        self.assertEqual(ref_list("raions"), ["Strășeni"])
+        name_map("reserve")
+        with self.assertNumQueries(0):  # generația e deja citită în această cerere
+            ref_list("reserves")
+            ref_list("raions")
+            name_map("reserve")
+        reset_generations()  # cerere nouă: o singură citire a generațiilor, listele rămân
+        with self.assertNumQueries(1):
+            ref_list("reserves")
+            ref_list("raions")
+        Reserve.objects.create(name="Bădragii", raion="Edineț")
+        self.assertEqual([r["name"] for r in ref_list("reserves")], ["Bădragii", "Codrii"])
+        self.assertEqual(ref_list("raions"), ["Edineț", "Strășeni"])
+
+    def test_change_from_other_process_is_seen(self):
+        # alt proces: modifică tabelul și generația, fără semnale / memorie locală în acest proces
+        resolve_ids("reserve", "Codrii")
+        ref_list("reserves")
+        Reserve.objects.filter(pk=self.reserve.pk).update(name="Codrii Noi")
+        RefDataVersion.bump("reserve")
+        reset_generations()
+        self.assertEqual([r["name"] for r in ref_list("reserves")], ["Codrii Noi"])
+        self.assertEqual(name_map("reserve").get("codrii noi"), [self.reserve.id])
+        self.assertNotIn("codrii", name_map("reserve"))
+
+    def test_unknown_reserve_reports_error(self):
+        resp = self.client.get(reverse("occurrences_filters"), {"mode": "by_reserve_all", "reserve_name": "Nu există"})
+        self.assertEqual(resp.context["error"], "Rezervație inexistentă.")
+        self.assertEqual(resp.context["rows"], [])
+
+        resp = self.client.get(reverse("occurrences_filters"), {"mode": "by_reserve_all", "reserve_name": "codrii"})
+        self.assertIsNone(resp.context["error"])
+        self.assertEqual(len(resp.context["rows"]), 1)
+
+
+class OccurrencesQueryTests(TestCase):
+    """occurrences_query: filtre combinate, proiecție, paginare pe cursor, streaming."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.r1 = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        cls.r2 = Reserve.objects.create(name="Prutul de Jos", raion="Cahul")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila", familia="Iridaceae",
+                                          is_rare=True, cartea_rosie_cat="VU")
+        cls.quercus = Species.objects.create(denumire_stiintifica="Quercus robur", familia="Fagaceae")
+        for year in (2010, 2015, 2020):
+            Occurrence.objects.create(species=cls.iris, reserve=cls.r1, year=year,
+                                      latitude="47.100000", longitude="28.500000")
+            Occurrence.objects.create(species=cls.quercus, reserve=cls.r2, year=year)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        return self.client.get(reverse("occurrences_query"), params)
+
+    def test_combined_filters_and_projection(self):
+        data = self._get(family="iridaceae", raion="Strășeni", year_from=2012,
+                         bbox="28,47,29,48", fields="species,year,lat").json()
+        self.assertEqual(data["fields"], ["species", "year", "lat"])
+        self.assertEqual(data["results"], [
+            {"species": "Iris pumila", "year": 2015, "lat": 47.1},
+            {"species": "Iris pumila", "year": 2020, "lat": 47.1},
+        ])
+        self.assertIsNone(data["next_cursor"])
+        self.assertEqual(self._get(red_book="vu", rare=0).json()["results"], [])
+
+    def test_cursor_pagination(self):
+        seen, cursor = [], None
+        while True:
+            params = {"reserve": "prutul de jos", "fields": "year", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = self._get(**params).json()
+            seen += [row["year"] for row in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [2010, 2015, 2020])
+
+    def test_ndjson_stream_and_errors(self):
+        resp = self._get(species="Quercus robur", fields="reserve,year", format="ndjson")
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0]), {"reserve": "Prutul de Jos", "year": 2010})
+
+        self.assertEqual(self._get(reserve="Nu există").status_code, 400)
+        self.assertEqual(self._get(fields="year,parola").status_code, 400)
+        self.assertEqual(self._get(year_from=2020, year_to=2010).status_code, 400)
+        for bbox in ("NaN,47,29,48", "28,47,Infinity,48", "28,-inf,29,48"):
+            self.assertEqual(self._get(bbox=bbox).status_code, 400)
+
+    def test_facets(self):
+        facets = self._get(fields="id", facets=1, facet_limit=1).json()["facets"]
+        self.assertEqual(facets["total"], 6)
+        self.assertEqual(facets["family"]["total_buckets"], 2)
+        self.assertEqual(len(facets["family"]["buckets"]), 1)
+        self.assertEqual(facets["year"]["buckets"], [{"key": 2010, "label": "2010", "count": 2}])
+
+        # cache-ul pe semnătura filtrului se invalidează la orice ocurență nouă
+        facets = self._get(raion="Cahul", facets=1).json()["facets"]
+        self.assertEqual(facets["reserve"]["buckets"], [{"key": self.r2.id, "label": "Prutul de Jos", "count": 3}])
+        Occurrence.objects.create(species=self.quercus, reserve=self.r2, year=2024)
+        facets = self._get(raion="Cahul", facets=1).json()["facets"]
+        self.assertEqual(facets["reserve"]["buckets"][0]["count"], 4)
+        self.assertEqual(facets["rare"]["buckets"], [{"key": False, "label": "Nerare", "count": 4}])
+
+
+class YearSeriesTests(TestCase):
+    """Rollup-ul YearlyCount: actualizat incremental prin semnale, servit de year_series_data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.r1 = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        cls.r2 = Reserve.objects.create(name="Plaiul Fagului", raion="Ungheni")
+        cls.sp = Species.objects.create(denumire_stiintifica="Iris pumila")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _series(self, dimension, key):
+        resp = self.client.get(reverse("year_series_data"), {"dimension": dimension, "key": key})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()["series"][str(key)]
+
+    def test_signals_keep_rollup_in_sync(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Occurrence.objects.create(species=self.sp, reserve=self.r1, year=2010)
+            occ = Occurrence.objects.create(species=self.sp, reserve=self.r2, year=2010)
+        self.assertEqual(self._series("species", self.sp.id), [{"year": 2010, "count": 2, "rare": 0}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            occ.year = 2015
+            occ.save()
+        self.assertEqual(self._series("species", self.sp.id), [
+            {"year": 2010, "count": 1, "rare": 0},
+            {"year": 2015, "count": 1, "rare": 0},
+        ])
+        self.assertEqual(self._series("raion", "ungheni"), [{"year": 2015, "count": 1, "rare": 0}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sp.is_rare = True
+            self.sp.save()
+        self.assertEqual(self._series("reserve", self.r1.id), [{"year": 2010, "count": 1, "rare": 1}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            occ.delete()
+        self.assertEqual(self._series("reserve", self.r2.id), [])
+
+    def test_one_refresh_per_transaction(self):
+        other = Species.objects.create(denumire_stiintifica="Quercus robur")
+        with self.captureOnCommitCallbacks(execute=True):
+            for year in range(2000, 2010):
+                Occurrence.objects.create(species=self.sp, reserve=self.r2, year=year)
+            Occurrence.objects.create(species=other, reserve=self.r2, year=2000)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.r2.delete()  # ștergere în cascadă: un post_delete per ocurență
+        self.assertEqual(len(callbacks), 1)
+        # un refresh per dimensiune (species, reserve, raion) + RaionSummary, oricâte ocurențe
+        with self.assertNumQueries(16):
+            callbacks[0]()
+        self.assertFalse(YearlyCount.objects.filter(dimension="reserve", key=str(self.r2.id)).exists())
+        self.assertFalse(YearlyCount.objects.filter(dimension="species", key=str(other.id)).exists())
+
+    def test_refresh_reconciles_bulk_changes(self):
+        Occurrence.objects.bulk_create([
+            Occurrence(species=self.sp, reserve=self.r1, year=y) for y in (2001, 2002)
+        ])
+        self.assertFalse(YearlyCount.objects.exists())
+        self.assertEqual(YearlyCount.refresh("reserve"), 2)
+        self.assertEqual(YearlyCount.refresh("reserve"), 0)  # nimic schimbat -> nicio scriere
+        self.assertEqual([p["year"] for p in self._series("reserve", self.r1.id)], [2001, 2002])
+
+    def test_invalid_params(self):
+        url = reverse("year_series_data")
+        self.assertEqual(self.client.get(url, {"dimension": "gen", "key": "1"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"dimension": "species", "key": "abc"}).status_code, 400)
+
+
+class SortKeyTests(TestCase):
+    """Cheile de sortare denormalizate pe Occurrence urmează numele rezervației / speciei."""
+
+    def test_sort_keys_follow_renames(self):
+        reserve = Reserve.objects.create(name="Pădurea Hîncești")
+        species = Species.objects.create(denumire_stiintifica="Iris pumila")
+        occ = Occurrence.objects.create(species=species, reserve=reserve, year=2010)
+        self.assertEqual((occ.reserve_sort, occ.species_sort), ("padurea hincesti", "iris pumila"))
+
+        reserve.name = "Ștefănești"
+        reserve.save()
+        species.denumire_stiintifica = "Iris aphylla"
+        species.save(update_fields=["denumire_stiintifica"])
+        occ.refresh_from_db()
+        self.assertEqual((occ.reserve_sort, occ.species_sort), ("stefanesti", "iris aphylla"))
+
+    def test_save_reads_species_and_reserve_only_when_changed(self):
+        reserve = Reserve.objects.create(name="Codrii")
+        other = Reserve.objects.create(name="Ștefănești")
+        species = Species.objects.create(denumire_stiintifica="Iris pumila")
+        occ = Occurrence.objects.get(pk=Occurrence.objects.create(species=species, reserve=reserve, year=2010).pk)
+        # rândul vechi (pre_save), UPDATE, versiunea rezervației; fără specie / rezervație
+        # (raionul rezervației e deja în lotul de rollup al tranzacției)
+        with self.assertNumQueries(3):
+            occ.year = 2011
+            occ.save()
+        with self.assertNumQueries(5):  # rezervația nouă se citește pentru cheia de sortare
+            occ.reserve_id = other.pk
+            occ.save()
+        self.assertEqual(Occurrence.objects.get(pk=occ.pk).reserve_sort, "stefanesti")
+
+
+class SavedFilterTests(TestCase):
+    """Filtre salvate: snapshot de id-uri, marcare ca învechit la modificări, export."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.reserve = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        cls.species = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True)
+        for year in (2010, 2015):
+            Occurrence.objects.create(species=cls.species, reserve=cls.reserve, year=year)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_snapshot_lifecycle(self):
+        resp = self.client.post(reverse("saved_filters"), {
+            "name": "Iris în Codrii", "kind": "plante", "snapshot": "1",
+            "query": "mode=by_reserve_all&reserve_name=codrii&page=3",
+        })
+        sf = SavedFilter.objects.get(user=self.user)
+        self.assertRedirects(resp, reverse("saved_filter_detail", args=[sf.pk]))
+        self.assertEqual(sf.params, {"mode": "by_reserve_all", "reserve_name": "codrii"})
+        self.assertEqual(sf.result_count, 2)
+
+        detail = self.client.get(reverse("saved_filter_detail", args=[sf.pk]))
+        self.assertEqual(len(detail.context["rows"]), 2)
+        self.assertFalse(detail.context["stale"])
+
+        # ocurență nouă: snapshot-ul rămâne, dar e marcat ca învechit
+        Occurrence.objects.create(species=self.species, reserve=self.reserve, year=2020)
+        detail = self.client.get(reverse("saved_filter_detail", args=[sf.pk]))
+        self.assertEqual(len(detail.context["rows"]), 2)
+        self.assertTrue(detail.context["stale"])
+
+        self.client.post(reverse("saved_filter_detail", args=[sf.pk]), {"action": "refresh"})
+        sf.refresh_from_db()
+        self.assertEqual(sf.result_count, 3)
+
+        export = self.client.get(reverse("saved_filter_detail", args=[sf.pk]), {"export": "csv"})
+        lines = b"".join(export.streaming_content).decode("utf-8-sig").strip().splitlines()
+        self.assertEqual(len(lines), 4)
+
+    def test_other_users_filters_are_hidden(self):
+        other = User.objects.create_user("other", password="x")
+        sf = SavedFilter.objects.create(user=other, name="x", kind="plante", params={})
+        self.assertEqual(self.client.get(reverse("saved_filter_detail", args=[sf.pk])).status_code, 404)
+
+
+class ReserveDossierTests(TestCase):
+    """Dosarul rezervației: conținut, reutilizare a rândului precalculat, reconstruire la modificări."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.reserve = Reserve.objects.create(name="Codrii", latitude="47.100000", longitude="28.400000")
+        cls.other = Reserve.objects.create(name="Prutul de Jos")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True, cartea_rosie_cat="VU")
+        cls.quercus = Species.objects.create(denumire_stiintifica="Quercus robur")
+        Occurrence.objects.create(species=cls.iris, reserve=cls.reserve, year=2010)
+        Occurrence.objects.create(species=cls.quercus, reserve=cls.reserve, year=2010)
+        Occurrence.objects.create(species=cls.iris, reserve=cls.reserve, year=2015)
+        cls.assoc = Association.objects.create(name="Quercetum")
+        ReserveAssociationYear.objects.create(association=cls.assoc, reserve=cls.reserve, year=2015)
+        Site.objects.create(code="MD01", name="Aproape", surface_ha=1, bird_species_count=0, other_species_count=0,
+                            ste=False, conj=False, latitude="47.150000", longitude="28.400000")
+        Site.objects.create(code="MD02", name="Departe", surface_ha=1, bird_species_count=0, other_species_count=0,
+                            ste=False, conj=False, latitude="46.000000", longitude="28.400000")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _get(self, reserve=None):
+        return self.client.get(reverse("viz_rez_dossier", args=[(reserve or self.reserve).pk])).json()
+
+    def test_dossier_content(self):
+        data = self._get()
+        self.assertEqual([(y["year"], y["count"], y["rare_count"]) for y in data["species_by_year"]],
+                         [(2010, 2, 1), (2015, 1, 1)])
+        self.assertEqual(data["associations_by_year"], [{"year": 2015, "associations": [
+            {"id": self.assoc.pk, "name": "Quercetum"}]}])
+        self.assertEqual(data["red_book"], {"VU": 1})
+        self.assertEqual([s["code"] for s in data["nearest_sites"]], ["MD01", "MD02"])
+        self.assertAlmostEqual(data["nearest_sites"][0]["distance_km"], 5.56, places=1)
+
+    def test_rebuilt_only_for_changed_reserve(self):
+        self._get()
+        self._get(self.other)
+        with self.assertNumQueries(5):  # sesiune, utilizator, rezervație, versiune, dosar
+            self._get()
+
+        Occurrence.objects.create(species=self.quercus, reserve=self.reserve, year=2020)
+        other_before = ReserveDossier.objects.get(pk=self.other.pk).computed_at
+        self.assertEqual(self._get()["species_by_year"][-1]["year"], 2020)
+        self._get(self.other)
+        self.assertEqual(ReserveDossier.objects.get(pk=self.other.pk).computed_at, other_before)
+
+        site = Site.objects.get(code="MD02")
+        site.latitude = "47.100000"
+        site.save()
+        self.assertEqual(self._get()["nearest_sites"][0]["code"], "MD02")
+
+    def test_red_book_change_rebuilds_every_reserve_with_species(self):
+        Occurrence.objects.create(species=self.iris, reserve=self.other, year=2012)
+        self.assertEqual(self._get()["red_book"], {"VU": 1})
+        self.assertEqual(self._get(self.other)["red_book"], {"VU": 1})
+
+        self.client.post(reverse("update_species_meta", args=[self.iris.pk]), {"cartea_rosie_cat": "EN"})
+        for reserve in (self.reserve, self.other):
+            self.assertEqual(self._get(reserve)["red_book"], {"EN": 1})
+            dossier = ReserveDossier.objects.get(pk=reserve.pk)
+            self.assertEqual(dossier.version, ReserveDataVersion.current([reserve.pk])[reserve.pk])
+            self.assertEqual(dossier.data["red_book"], {"EN": 1})
+
+
+class SpeciesDetailTests(TestCase):
+    """viz_specii_detail: sumar agregat, număr constant de interogări, cache per specie."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.species = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True)
+        cls.reserves = [Reserve.objects.create(name=f"R{i}", raion="Cahul" if i % 2 else "Orhei") for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get(reverse("viz_specii"))  # încălzirea dropdown-urilor la prima cerere
+
+    def _add(self, n, start=2000):
+        for i in range(n):
+            Occurrence.objects.create(species=self.species, reserve=self.reserves[i % 4], year=start + i,
+                                      latitude="47.000000", longitude="28.000000")
+
+    def _queries(self):
+        cache.clear()
+        url = reverse("viz_specii_detail", args=[self.species.pk])
+        with self.assertNumQueries(7) as ctx:  # sesiune, utilizator, specie, versiuni, sumar, areal, grupuri
+            resp = self.client.get(url)
+        return resp, len(ctx.captured_queries)
+
+    def test_constant_queries_and_summary(self):
+        self._add(2)
+        resp, few = self._queries()
+        self._add(20, start=2002)
+        resp, many = self._queries()
+        self.assertEqual(few, many)
+
+        summary = resp.context["summary"]
+        self.assertEqual((summary["first_year"], summary["last_year"]), (2000, 2021))
+        self.assertEqual(summary["raions"], [{"raion": "Cahul", "reserves": 2}, {"raion": "Orhei", "reserves": 2}])
+        self.assertEqual(len(summary["points"]), 22)
+        self.assertEqual(summary["reserves"][0]["years"], [2000, 2002, 2006, 2010, 2014, 2018])
+
+        # din cache: fără interogarea agregată
+        with self.assertNumQueries(6):
+            self.client.get(reverse("viz_specii_detail", args=[self.species.pk]))
+
+    def test_cache_follows_own_reserves_only(self):
+        self._add(2)  # R0, R1
+        url = reverse("viz_specii_detail", args=[self.species.pk])
+        self.client.get(url)
+        other = Species.objects.create(denumire_stiintifica="Quercus robur")
+        Occurrence.objects.create(species=other, reserve=self.reserves[3], year=2000)
+        with self.assertNumQueries(6):  # altă rezervație modificată: sumarul rămâne în cache
+            self.client.get(url)
+        Occurrence.objects.create(species=self.species, reserve=self.reserves[3], year=2001)
+        resp = self.client.get(url)
+        self.assertEqual([r["name"] for r in resp.context["summary"]["reserves"]], ["R0", "R1", "R3"])
+        Occurrence.objects.create(species=other, reserve=self.reserves[0], year=2005)
+        with self.assertNumQueries(7):  # rezervație a speciei modificată: sumarul se recalculează
+            self.client.get(url)
+
+
+class MapClusterTests(TestCase):
+    """map_clusters_data: grupare pe grilă per tile, cache per tile, filtre pe ocurențe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        reserve = Reserve.objects.create(name="Codrii", latitude="47.100000", longitude="28.400000")
+        rare = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True)
+        common = Species.objects.create(denumire_stiintifica="Quercus robur")
+        for year in range(2000, 2010):  # grup compact lângă Codrii
+            Occurrence.objects.create(species=common, reserve=reserve, year=year,
+                                      latitude="47.100000", longitude=f"28.40{year % 10}000")
+        Occurrence.objects.create(species=rare, reserve=reserve, year=2000,
+                                  latitude="46.000000", longitude="29.500000")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        return self.client.get(reverse("map_clusters_data"), {"bbox": "26.5,45.4,30.2,48.5", **params})
+
+    def test_clusters_and_filters(self):
+        data = self._get(zoom=7).json()
+        counts = sorted(f["properties"]["count"] for f in data["features"])
+        self.assertEqual(counts, [1, 10])
+        single = next(f for f in data["features"] if f["properties"]["count"] == 1)
+        self.assertEqual(single["properties"]["label"], "Iris pumila — Codrii")
+
+        rare = self._get(zoom=7, rare=1).json()
+        self.assertEqual([f["properties"]["count"] for f in rare["features"]], [1])
+
+        reserves = self._get(zoom=7, layer="reserves").json()
+        self.assertEqual(reserves["features"][0]["properties"]["label"], "Codrii")
+
+    def test_tiles_are_cached(self):
+        self._get(zoom=7)
+        with self.assertNumQueries(3):  # sesiune, utilizator, ștampilă
+            self._get(zoom=7)
+        Occurrence.objects.filter(year=2000, species__is_rare=True).delete()
+        self.assertEqual(len(self._get(zoom=7).json()["features"]), 1)
+
+    def test_invalid_params(self):
+        self.assertEqual(self._get(zoom="x").status_code, 400)
+        self.assertEqual(self._get(zoom=7, layer="roads").status_code, 400)
+        self.assertEqual(self._get(zoom=14).status_code, 400)  # prea multe tile-uri
+
+
+class SpatialQueryTests(TestCase):
+    """core.spatial: geohash întreținut în save(), bbox / rază / k-cei-mai-apropiați."""
+
+    @classmethod
+    def setUpTestData(cls):
+        points = {"Chișinău": ("47.010000", "28.860000"), "Orhei": ("47.380000", "28.820000"),
+                  "Cahul": ("45.900000", "28.190000"), "Bălți": ("47.760000", "27.930000")}
+        cls.reserves = {name: Reserve.objects.create(name=name, latitude=lat, longitude=lon)
+                        for name, (lat, lon) in points.items()}
+        Reserve.objects.create(name="Fără coordonate")
+
+    def test_geohash_maintained_on_save(self):
+        reserve = self.reserves["Cahul"]
+        self.assertTrue(reserve.geohash.startswith("u8"))
+        reserve.latitude, reserve.longitude = "47.010000", "28.860000"
+        reserve.save(update_fields=["latitude", "longitude"])
+        reserve.refresh_from_db()
+        self.assertEqual(reserve.geohash, self.reserves["Chișinău"].geohash)
+
+    def test_bbox_radius_nearest(self):
+        names = lambda qs: sorted(r.name for r in qs)
+        self.assertEqual(names(Reserve.objects.within_bbox(28.5, 46.8, 29.0, 47.5)), ["Chișinău", "Orhei"])
+
+        within = Reserve.objects.within_radius(47.01, 28.86, 50)
+        self.assertEqual(names(within), ["Chișinău", "Orhei"])
+        orhei = next(r for r in within if r.name == "Orhei")
+        self.assertAlmostEqual(orhei.distance_km, 41.2, delta=1)
+
+        nearest = list(Reserve.objects.nearest(47.0, 28.8, k=3))
+        self.assertEqual([r.name for r in nearest], ["Chișinău", "Orhei", "Bălți"])
+
+    def test_radius_bbox_contains_circle(self):
+        # puncte chiar sub rază, spre nord și spre est, trebuie să fie în dreptunghiul de prefiltrare
+        for lat, km in [(47.0, 1.0), (48.4, 50.0), (46.0, 300.0)]:
+            min_lon, min_lat, max_lon, max_lat = _radius_bbox(lat, 28.0, km)
+            north = lat + np.degrees(0.9995 * km / EARTH_RADIUS_KM)
+            self.assertLessEqual(north, max_lat)
+            # cel mai estic punct al cercului e la o latitudine puțin mai mare decât centrul
+            plat, plon = np.meshgrid(np.linspace(lat, north, 50), np.linspace(28.0, max_lon + 0.01, 400))
+            inside = haversine_km_np(lat, 28.0, plat, plon) <= km
+            self.assertLessEqual(plon[inside].max(), max_lon)
+
+
+class NearbyTests(TestCase):
+    """core.nearby: k-NN pe KD-tree, tabelul NearestLink reîmprospătat incremental."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.chisinau = Reserve.objects.create(name="Chișinău", latitude="47.010000", longitude="28.860000")
+        cls.orhei = Reserve.objects.create(name="Orhei", latitude="47.380000", longitude="28.820000")
+        cls.cahul = Reserve.objects.create(name="Cahul", latitude="45.900000", longitude="28.190000")
+        cls.site = Site.objects.create(code="MD01", name="Nistru", surface_ha=1, bird_species_count=0,
+                                       other_species_count=0, ste=False, conj=False,
+                                       latitude="47.300000", longitude="28.900000")
+        species = Species.objects.create(denumire_stiintifica="Iris pumila")
+        cls.occ = Occurrence.objects.create(species=species, reserve=cls.chisinau, year=2010,
+                                            latitude="45.950000", longitude="28.200000")
+
+    def test_batch_refresh_is_incremental(self):
+        refresh_changed()
+        self.assertEqual(
+            list(NearestLink.objects.filter(source_type="occurrence", target_type="reserve")
+                 .order_by("rank").values_list("target_id", flat=True)),
+            [self.cahul.pk, self.chisinau.pk, self.orhei.pk],
+        )
+        # rezervația nu e propria vecină
+        self.assertFalse(NearestLink.objects.filter(source_type="reserve", source_id=self.orhei.pk,
+                                                    target_type="reserve", target_id=self.orhei.pk).exists())
+        self.assertEqual(sum(refresh_changed().values()), 0)
+
+        self.occ.latitude, self.occ.longitude = "47.370000", "28.820000"
+        self.occ.save()
+        touched = refresh_changed()
+        self.assertEqual((touched["reserve"], touched["site"]), (0, 0))
+        self.assertEqual(NearestLink.objects.get(source_type="occurrence", target_type="reserve", rank=1).target_id,
+                         self.orhei.pk)
+
+    def test_api_and_detail_page(self):
+        self.client.force_login(self.user)
+        refresh_changed()
+        data = self.client.get(reverse("nearby_data"), {"type": "reserve", "id": self.chisinau.pk, "k": 2}).json()
+        self.assertEqual([r["name"] for r in data["reserves"]], ["Orhei", "Cahul"])
+        self.assertEqual(data["sites"][0]["code"], "MD01")
+
+        # ținta mutată: cererile arată link-urile stocate, fără scanarea țintelor și fără scrieri
+        Reserve.objects.filter(pk=self.cahul.pk).update(latitude="47.050000", longitude="28.860000",
+                                                        geohash=geohash_encode(47.05, 28.86))
+        with self.assertNumQueries(6):  # sesiune, utilizator, sursa (404), link-uri, nume rezervații, nume situri
+            data = self.client.get(reverse("nearby_data"), {"type": "reserve", "id": self.chisinau.pk}).json()
+        self.assertEqual(data["reserves"][0]["name"], "Orhei")
+        resp = self.client.get(reverse("viz_rez_detail", args=[self.chisinau.pk]))
+        self.assertEqual(resp.context["nearby"]["reserve"][0]["name"], "Orhei")
+
+        refresh_changed()  # compute_nearest
+        resp = self.client.get(reverse("viz_rez_detail", args=[self.chisinau.pk]))
+        self.assertEqual(resp.context["nearby"]["reserve"][0]["name"], "Cahul")
+        self.assertEqual(self.client.get(reverse("nearby_data"), {"type": "x", "id": 1}).status_code, 400)
+
+    def test_source_without_links_is_empty(self):
+        self.assertEqual(nearby_for("reserve", self.chisinau.pk), {"reserve": [], "site": []})
+        self.assertFalse(NearestLink.objects.exists())
+
+
+class RangeMetricsTests(TestCase):
+    """core.range_metrics: EOO/AOO vectorizat, recalculare doar pentru speciile modificate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reserve = Reserve.objects.create(name="Codrii")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila")
+        cls.quercus = Species.objects.create(denumire_stiintifica="Quercus robur")
+        # pătrat de ~11 x 7.6 km (0.1° lat x 0.1° lon la 47°N) + un punct în interior
+        for year, (lat, lon) in enumerate([("47.000000", "28.500000"), ("47.100000", "28.500000"),
+                                           ("47.000000", "28.600000"), ("47.100000", "28.600000"),
+                                           ("47.050000", "28.550000")], start=2000):
+            Occurrence.objects.create(species=cls.iris, reserve=cls.reserve, year=year, latitude=lat, longitude=lon)
+        Occurrence.objects.create(species=cls.quercus, reserve=cls.reserve, year=2000,
+                                  latitude="47.000000", longitude="28.500000")
+
+    def test_metrics_and_incremental_refresh(self):
+        refresh = refresh_range_metrics
+        self.assertEqual(refresh(), {"updated": 2, "deleted": 0})
+        iris = SpeciesRangeMetrics.objects.get(species=self.iris)
+        self.assertEqual((iris.points, iris.aoo_cells, iris.aoo_km2), (5, 5, 20.0))
+        self.assertAlmostEqual(iris.eoo_km2, 11.12 * 7.59, delta=2)
+        quercus = SpeciesRangeMetrics.objects.get(species=self.quercus)
+        self.assertEqual((quercus.aoo_km2, quercus.eoo_km2), (4.0, 4.0))  # EOO ridicat la AOO
+
+        self.assertEqual(refresh()["updated"], 0)
+        Occurrence.objects.create(species=self.quercus, reserve=self.reserve, year=2001,
+                                  latitude="47.300000", longitude="28.500000")
+        self.assertEqual(refresh()["updated"], 1)
+
+        # fereastra de ani: doar 2000-2001 -> iris are 2 puncte
+        refresh(year_from=2000, year_to=2001)
+        iris.refresh_from_db()
+        self.assertEqual((iris.points, iris.year_from, iris.year_to), (2, 2000, 2001))
+
+
+class CoordinateQualityTests(TestCase):
+    """core.coord_quality: inversări lat/lon, puncte în afara țării sau departe de rezervație."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reserve = Reserve.objects.create(name="Codrii", latitude="47.100000", longitude="28.400000",
+                                             suprafata_ha="5000")
+        cls.empty = Reserve.objects.create(name="Fără coordonate")
+        species = [Species.objects.create(denumire_stiintifica=f"Sp {i}") for i in range(5)]
+
+        def occ(i, reserve, lat, lon):
+            return Occurrence.objects.create(species=species[i], reserve=reserve, year=2010,
+                                             latitude=lat, longitude=lon)
+
+        cls.ok = occ(0, cls.reserve, "47.120000", "28.410000")
+        cls.swapped = occ(1, cls.reserve, "28.400000", "47.110000")
+        cls.far = occ(2, cls.reserve, "46.000000", "28.400000")
+        cls.abroad = occ(3, cls.empty, "44.000000", "20.000000")
+        cls.ok_no_centre = occ(4, cls.empty, "47.000000", "28.000000")
+
+    def test_scan_flags_and_clears(self):
+        result = scan_coordinates(chunk_size=2)  # loturi mici: keyset pe mai multe pagini
+        issues = {i.occurrence_id: i for i in CoordinateIssue.objects.all()}
+        self.assertEqual(set(issues), {self.swapped.pk, self.far.pk, self.abroad.pk})
+        self.assertEqual(issues[self.swapped.pk].kind, CoordinateIssue.KIND_SWAPPED)
+        self.assertEqual(float(issues[self.swapped.pk].suggested_latitude), 47.11)
+        self.assertEqual(issues[self.far.pk].kind, CoordinateIssue.KIND_FAR)
+        self.assertAlmostEqual(issues[self.far.pk].distance_km, 122.3, delta=1)
+        self.assertEqual(issues[self.abroad.pk].kind, CoordinateIssue.KIND_OUT_OF_BOUNDS)
+        self.assertEqual(result["issues"][CoordinateIssue.KIND_SWAPPED], 1)
+
+        # corectat -> dispare la rescanare; revizuirea se păstrează pentru rest
+        CoordinateIssue.objects.filter(occurrence=self.far).update(reviewed=True)
+        self.swapped.latitude, self.swapped.longitude = "47.110000", "28.400000"
+        self.swapped.save()
+        self.assertEqual(scan_coordinates()["removed"], 1)
+        self.assertTrue(CoordinateIssue.objects.get(occurrence=self.far).reviewed)
+
+
+class MapTileTests(TestCase):
+    """core.tiles: generare incrementală (doar tile-urile schimbate) și servirea publică din disc."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(MAP_TILES_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.codrii = Reserve.objects.create(name="Codrii", latitude="47.100000", longitude="28.400000")
+        self.prut = Reserve.objects.create(name="Prutul", latitude="45.700000", longitude="28.200000")
+
+    def test_incremental_build_and_serving(self):
+        first = build_tiles("reserves", 8, 9)
+        self.assertEqual((first["written"], first["unchanged"], first["build"]), (4, 0, 1))
+        self.assertEqual(build_tiles("reserves", 8, 9)["written"], 0)  # nimic schimbat -> nimic rescris
+
+        self.prut.latitude = "45.701000"
+        self.prut.save()
+        again = build_tiles("reserves", 8, 9)
+        self.assertEqual((again["written"], again["unchanged"], again["build"]), (2, 2, 2))
+
+        self.prut.delete()
+        gone = build_tiles("reserves", 8, 9)
+        self.assertEqual((gone["written"], gone["deleted"]), (0, 2))
+
+        index = self.client.get(reverse("map_tiles_index")).json()  # fără login
+        url = index["layers"]["reserves"]["url"]
+        self.assertTrue(url.endswith("/{z}/{x}/{y}.png?v=3"))
+
+        x_dir = next(tile_path("reserves", 9, 0, 0).parent.parent.iterdir())
+        x, y = x_dir.name, next(x_dir.iterdir()).stem
+        r = self.client.get(url.replace("{z}", "9").replace("{x}", x).replace("{y}", y))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/png")
+        self.assertIn("immutable", r["Cache-Control"])
+        self.assertTrue(r.content.startswith(b"\x89PNG"))
+        self.assertNotEqual(r.content, EMPTY_TILE)
+        self.assertEqual(self.client.get(r.wsgi_request.path, HTTP_IF_NONE_MATCH=r["ETag"]).status_code, 304)
+
+        empty = self.client.get(reverse("map_tile", args=["reserves", 9, 0, 0]))
+        self.assertEqual(empty.content, EMPTY_TILE)
+        self.assertEqual(self.client.get(reverse("map_tile", args=["nope", 9, 0, 0])).status_code, 404)
+
+    def test_edge_points_reach_neighbour_tile(self):
+        self.prut.delete()
+        # Codrii la 1 px de marginea stângă a tile-ului său (zoom 9): pătratul 5x5 intră și în vecin
+        gx = int(pixel_xy(np.array([47.1]), np.array([28.4]), 9)[0][0]) // TILE_SIZE * TILE_SIZE + 1
+        self.codrii.longitude = f"{(gx + 0.5) / (TILE_SIZE << 9) * 360 - 180:.6f}"
+        self.codrii.save()
+        self.assertEqual(build_tiles("reserves", 9, 9)["written"], 2)
+        tile_x = gx // TILE_SIZE
+        tile_y = int(pixel_xy(np.array([47.1]), np.array([28.4]), 9)[1][0]) // TILE_SIZE
+        self.assertNotEqual(tile_path("reserves", 9, tile_x - 1, tile_y).read_bytes(), EMPTY_TILE)
+
+        # mutarea punctului (tot la margine) schimbă amprenta ambelor tile-uri pe care le atinge
+        self.codrii.longitude = f"{(gx - 0.5) / (TILE_SIZE << 9) * 360 - 180:.6f}"
+        self.codrii.save()
+        self.assertEqual(build_tiles("reserves", 9, 9)["written"], 2)
+
+    def test_colour_scale_is_per_zoom(self):
+        build_tiles("reserves", 8, 9)
+        manifest = read_manifest("reserves")
+        self.assertEqual(manifest["peaks"], {"8": 1, "9": 1})
+        before = tile_path("reserves", 9, *self._tile(45.7, 28.2)).read_bytes()
+
+        # un al doilea punct peste Codrii dublează maximul: și tile-urile Prutului se redesenează
+        Reserve.objects.create(name="Codrii II", latitude="47.100000", longitude="28.400000")
+        again = build_tiles("reserves", 8, 9)
+        self.assertEqual((again["written"], again["unchanged"]), (4, 0))
+        self.assertEqual(read_manifest("reserves")["peaks"], {"8": 2, "9": 2})
+        self.assertNotEqual(tile_path("reserves", 9, *self._tile(45.7, 28.2)).read_bytes(), before)
+
+    @staticmethod
+    def _tile(lat, lon, zoom=9):
+        gx, gy = pixel_xy(np.array([lat]), np.array([lon]), zoom)
+        return int(gx[0]) // TILE_SIZE, int(gy[0]) // TILE_SIZE
+
+
+class CoordinateParserTests(SimpleTestCase):
+    """core.coords: aceleași rezultate ca vechiul parser, cu cache și statistici pe format."""
+
+    SAMPLES = [
+        "47°04′N 28°30′E", "47°22′40″N 29°09′45″E", "46.678361°N 28.228158°E",
+        "46.678361, 28.228158", "46.678361 28.228158", " 47.6 27.3 ", "46,5; 28,1",
+        "47.1° 28.4°", "lat 47.1 lon 28.4", "100 200", "28°30′E", "", None, "n/a",
+    ]
+
+    def test_matches_legacy_parser(self):
+        parser = CoordinateParser()
+        self.assertEqual(parser.parse_many(self.SAMPLES), [legacy_parse_coords(v) for v in self.SAMPLES])
+
+    def test_stats_and_cache(self):
+        parser = CoordinateParser()
+        pairs = parser.parse_many(["46.5 28.1", "46.5 28.1", "47°04′N 28°30′E", "", "abc"])
+        self.assertEqual(pairs[0], (46.5, 28.1))
+        self.assertAlmostEqual(pairs[2][0], 47 + 4 / 60)
+        self.assertEqual(parser.stats, {"decimal": 2, "cached": 1, "dms": 1, "empty": 1, "invalid": 1})
+
+    def test_single_values(self):
+        parser = CoordinateParser()
+        self.assertEqual(parser.parse_many_values(["47,25", "47°15′N", "", "95"], "lat"), [47.25, 47.25, None, None])
+        self.assertEqual(parser.parse_value("28°30′W", "lon"), -28.5)
+        self.assertIsNone(parser.parse_value("28°30′W", "lat"))
+
+
+class RaionChoroplethTests(TestCase):
+    """RaionSummary: rollup pe raioane pentru hartă, întreținut de semnale, servit ca un singur JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True)
+        cls.quercus = Species.objects.create(denumire_stiintifica="Quercus robur")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _map(self, **params):
+        resp = self.client.get(reverse("raion_choropleth_data"), params)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        return data, {row["raion"]: row for row in data["raions"]}
+
+    def test_rollup_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            codrii = Reserve.objects.create(name="Codrii", raion="Strășeni", suprafata_ha="5177.00")
+            Reserve.objects.create(name="Fără date", raion="Strășeni", suprafata_ha="10.50")
+            fagului = Reserve.objects.create(name="Plaiul Fagului", raion="Ungheni", suprafata_ha="5642.00")
+            Occurrence.objects.create(species=self.iris, reserve=codrii, year=2010)
+            Occurrence.objects.create(species=self.quercus, reserve=codrii, year=2010)
+            Occurrence.objects.create(species=self.quercus, reserve=codrii, year=2012)
+            occ = Occurrence.objects.create(species=self.quercus, reserve=fagului, year=2012)
+
+        data, raions = self._map()
+        self.assertEqual(raions["Strășeni"], {
+            "raion": "Strășeni", "species_count": 2, "rare_species_count": 1, "reserve_count": 2,
+            "surface_ha": 5187.5, "occurrence_count": 3,
+        })
+        self.assertEqual(data["years"], [2010, 2012])
+        self.assertEqual(data["max"]["surface_ha"], 5642.0)
+
+        _, by_year = self._map(year=2012)
+        self.assertEqual(by_year["Strășeni"]["reserve_count"], 1)  # doar rezervațiile cu date în 2012
+        self.assertEqual(by_year["Strășeni"]["species_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            occ.delete()
+            fagului.suprafata_ha = "6000.00"
+            fagului.save()
+        _, raions = self._map()
+        self.assertEqual((raions["Ungheni"]["species_count"], raions["Ungheni"]["surface_ha"]), (0, 6000.0))
+        _, by_year = self._map(year=2012)
+        self.assertNotIn("Ungheni", by_year)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fagului.raion = "Nisporeni"
+            fagului.save()
+        _, raions = self._map()
+        self.assertEqual(set(raions), {"Strășeni", "Nisporeni"})
+        self.assertEqual(RaionSummary.refresh(), 0)  # incremental == recalcul complet
+        self.assertEqual(self.client.get(reverse("raion_choropleth_data"), {"year": "x"}).status_code, 400)
+
+
+class HeatmapTests(TestCase):
+    """core.heatmap: grilă histogram2d pe filtre, RLE / binar, cache pe semnătura filtrelor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        reserve = Reserve.objects.create(name="Codrii", raion="Strășeni")
+        iris = Species.objects.create(denumire_stiintifica="Iris pumila", is_rare=True, familia="Iridaceae")
+        oak = Species.objects.create(denumire_stiintifica="Quercus robur", familia="Fagaceae")
+        for sp, year, lat, lon in [
+            (iris, 1995, "47.05", "28.35"), (iris, 1998, "47.07", "28.37"), (iris, 2005, "47.05", "28.35"),
+            (oak, 1995, "47.05", "28.35"), (oak, 1996, "45.50", "28.10"), (oak, 1997, None, None),
+        ]:
+            Occurrence.objects.create(species=sp, reserve=reserve, year=year, latitude=lat, longitude=lon)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        return self.client.get(reverse("heatmap_data"), params)
+
+    def test_grid_filters_and_encodings(self):
+        data = self._get(bbox="28,47,28.5,47.5", cell="0.1").json()
+        self.assertEqual((data["width"], data["height"], data["total"], data["max"]), (5, 5, 4, 4))
+        grid = unrle(data["data"], 25).reshape(5, 5)
+        self.assertEqual(grid[0, 3], 4)  # rândul 0 = sud (47.0–47.1), coloana 3 = 28.3–28.4
+
+        rare_90s = self._get(decade="1990", rare="1", family="iridaceae").json()
+        self.assertEqual((rare_90s["total"], rare_90s["max"]), (2, 2))  # toată țara, celula implicită
+
+        binary = self._get(bbox="28,47,28.5,47.5", cell="0.1", format="binary")
+        self.assertEqual(binary["X-Grid-Dtype"], "uint8")
+        self.assertEqual(list(binary.content), grid.ravel().tolist())
+
+        for bad in ({"cell": "5"}, {"cell": "NaN"}, {"cell": "-Infinity"}, {"decade": "1995"},
+                    {"cell": "0.005", "bbox": "20,40,30,50"}, {"format": "png"}):
+            self.assertEqual(self._get(**bad).status_code, 400)
+
+    def test_cached_per_signature(self):
+        self._get(decade="1990")
+        with self.assertNumQueries(3):  # sesiune + utilizator + ștampila datelor
+            self.assertEqual(self._get(decade="1990").json()["total"], 4)
+        Occurrence.objects.filter(year=2005).update(year=1999)
+        ReserveDataVersion.bump(Reserve.objects.values_list("pk", flat=True))
+        self.assertEqual(self._get(decade="1990").json()["total"], 5)
+
+
+class DuplicateDetectionTests(TestCase):
+    """core.dedup: blocare pe specie + celulă (lat, lon, an), grupuri stabile între rulări."""
+
+    @classmethod
+    def setUpTestData(cls):
+        codrii = Reserve.objects.create(name="Codrii")
+        plaiul = Reserve.objects.create(name="Plaiul Fagului")
+        iris = Species.objects.create(denumire_stiintifica="Iris pumila")
+        oak = Species.objects.create(denumire_stiintifica="Quercus robur")
+
+        def occ(sp, reserve, year, lat, lon, source=None):
+            return Occurrence.objects.create(species=sp, reserve=reserve, year=year,
+                                             latitude=lat, longitude=lon, source=source)
+
+        cls.a = occ(iris, codrii, 2010, "47.100000", "28.400000", "teren")
+        cls.b = occ(iris, plaiul, 2010, "47.101000", "28.401000", "raport")  # ~135 m, același an
+        cls.c = occ(iris, codrii, 2011, "47.104000", "28.404000")            # ~540 m, an vecin
+        occ(iris, plaiul, 2015, "47.100000", "28.400000")                    # prea târziu
+        occ(oak, codrii, 2010, "47.100000", "28.400000")                     # altă specie
+        occ(oak, plaiul, 2010, "47.200000", "28.400000")                     # ~11 km
+
+    def test_clusters_and_rescan(self):
+        result = detect_duplicates()
+        self.assertEqual((result["clusters"], result["occurrences"], result["created"]), (1, 3, 1))
+
+        cluster = DuplicateCluster.objects.get()
+        self.assertEqual(set(cluster.members.values_list("occurrence_id", flat=True)), {self.a.pk, self.b.pk, self.c.pk})
+        self.assertEqual(cluster.max_year_gap, 1)
+        self.assertGreater(cluster.score, 0.85)
+
+        cluster.reviewed = True
+        cluster.save()
+        again = detect_duplicates()
+        self.assertEqual((again["created"], again["removed"]), (0, 0))
+        self.assertTrue(DuplicateCluster.objects.get().reviewed)
+
+        self.c.delete()  # grupul se schimbă -> rândul vechi dispare, apare unul nou
+        third = detect_duplicates()
+        self.assertEqual((third["created"], third["removed"]), (1, 1))
+        self.assertFalse(DuplicateCluster.objects.get().reviewed)
+        self.assertEqual(DuplicateCluster.objects.get().size, 2)
+
+    def test_blocking_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        n = 3000
+        lat, lon = rng.uniform(46.0, 46.3, n), rng.uniform(28.0, 28.4, n)
+        year = rng.integers(2000, 2010, n)
+        i, j, _, _, compared = candidate_pairs(lat, lon, year, max_km=0.5, max_gap=1)
+        self.assertLess(compared, n * (n - 1) // 20)  # mult sub toate perechile
+
+        ii, jj = np.triu_indices(n, k=1)
+        close = (haversine_km_np(lat[ii], lon[ii], lat[jj], lon[jj]) <= 0.5) & (np.abs(year[ii] - year[jj]) <= 1)
+        self.assertEqual(set(zip(i.tolist(), j.tolist())), set(zip(ii[close].tolist(), jj[close].tolist())))
+
+    def test_pairs_at_threshold_are_found(self):
+        # perechi chiar sub prag (0.9995 km), pe meridian și pe paralelă; primul punct e pus chiar
+        # sub o margine de celulă, cu grade de 111.32 km (vechea aproximare) și de π·R/180 km
+        km_per_degree = np.pi * EARTH_RADIUS_KM / 180
+        edges = [np.floor(lat * k) / k - 1e-9 for lat in (46.2, 47.9) for k in (111.32, km_per_degree)]
+        base_lat = np.array([*edges, 47.3, 48.49])
+        base_lon = np.array([28.0, 28.5, 27.00001, 29.9, 26.7, 30.2])
+        step_lat = 0.9995 / km_per_degree
+        step_lon = 0.9995 / (km_per_degree * np.cos(np.radians(base_lat)))
+        lat = np.concatenate([base_lat, base_lat + step_lat, base_lat, base_lat])
+        lon = np.concatenate([base_lon, base_lon, base_lon + step_lon, base_lon - step_lon])
+        year = np.full(len(lat), 2010)
+        i, j, distance, _, _ = candidate_pairs(lat, lon, year, max_km=1.0, max_gap=0)
+
+        ii, jj = np.triu_indices(len(lat), k=1)
+        close = haversine_km_np(lat[ii], lon[ii], lat[jj], lon[jj]) <= 1.0
+        self.assertEqual(set(zip(i.tolist(), j.tolist())), set(zip(ii[close].tolist(), jj[close].tolist())))
+        m = len(base_lat)
+        for k in range(m):
+            self.assertIn((k, k + m), set(zip(i.tolist(), j.tolist())))      # meridian
+            self.assertIn((k, k + 2 * m), set(zip(i.tolist(), j.tolist())))  # paralelă
+        self.assertTrue(((distance > 0.999) & (distance <= 1.0)).any())
+
+
+class EffectiveRareTests(TestCase):
+    """Occurrence.effective_rare = is_rare al ocurenței SAU is_rare al speciei, întreținut la save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reserve = Reserve.objects.create(name="Codrii")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila")
+        cls.oak = Species.objects.create(denumire_stiintifica="Quercus robur", is_rare=True)
+
+    def stored(self, occ):
+        return Occurrence.objects.values_list("effective_rare", flat=True).get(pk=occ.pk)
+
+    def test_save_with_and_without_update_fields(self):
+        occ = Occurrence.objects.create(species=self.iris, reserve=self.reserve, year=2010)
+        self.assertFalse(self.stored(occ))
+
+        occ.is_rare = True
+        occ.save()
+        self.assertTrue(self.stored(occ))
+
+        occ.is_rare = False
+        occ.save(update_fields=["is_rare"])  # effective_rare se adaugă automat la update_fields
+        self.assertFalse(self.stored(occ))
+
+        occ.species = self.oak
+        occ.save(update_fields=["species"])  # specia rară -> rară, chiar fără is_rare pe ocurență
+        self.assertTrue(self.stored(occ))
+        self.assertEqual(Occurrence.objects.get(pk=occ.pk).species_sort, "quercus robur")
+
+        Occurrence.objects.filter(pk=occ.pk).update(effective_rare=False)
+        occ.notes = "verificat"
+        occ.save(update_fields=["notes"])  # câmp fără legătură: effective_rare nu se rescrie
+        self.assertFalse(self.stored(occ))
+
+    def test_species_flag_toggled_both_ways(self):
+        plain = Occurrence.objects.create(species=self.iris, reserve=self.reserve, year=2010)
+        flagged = Occurrence.objects.create(species=self.iris, reserve=self.reserve, year=2011, is_rare=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.iris.is_rare = True
+            self.iris.save()
+        self.assertEqual((self.stored(plain), self.stored(flagged)), (True, True))
+
+        # specia nu mai e rară: ocurența marcată explicit rămâne rară
+        with self.captureOnCommitCallbacks(execute=True):
+            self.iris.is_rare = False
+            self.iris.save(update_fields=["is_rare"])
+        self.assertEqual((self.stored(plain), self.stored(flagged)), (False, True))
+        self.assertEqual(Occurrence.sync_effective_rare(self.iris), 0)  # deja la zi
+
+        # specia salvată fără is_rare în update_fields nu atinge ocurențele
+        Occurrence.objects.filter(pk=plain.pk).update(effective_rare=True)
+        self.iris.notes = "x"
+        self.iris.save(update_fields=["notes"])
+        self.assertTrue(self.stored(plain))
+
+
+class TurnoverTests(TestCase):
+    """compute_turnover: diferențe pe liste sortate, partiții afectate, rulări incrementale și --full."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reserve = Reserve.objects.create(name="Codrii")
+        cls.sp = [Species.objects.create(denumire_stiintifica=f"Specia {i}") for i in range(5)]
+        for year, members in [(2000, [0, 1, 2]), (2005, [1, 2, 3]), (2010, [3, 4])]:
+            for i in members:
+                Occurrence.objects.create(species=cls.sp[i], reserve=cls.reserve, year=year)
+
+    def rows(self):
+        return {t.year: t for t in ReserveYearTurnover.objects.filter(reserve=self.reserve)}
+
+    def test_diff_sorted(self):
+        self.assertEqual(diff_sorted([1, 2, 4, 7], [2, 3, 4, 8, 9]), ([3, 8, 9], [1, 7], 2))
+        self.assertEqual(diff_sorted([], [1, 2]), ([1, 2], [], 0))
+        self.assertEqual(diff_sorted([1, 2], []), ([], [1, 2], 0))
+        self.assertEqual(diff_sorted([5], [5]), ([], [], 1))
+
+    def test_affected_partitions(self):
+        current = {(1, 2000): (3, "a"), (1, 2005): (3, "b"), (1, 2010): (2, "c"), (2, 2001): (1, "d")}
+        stored = dict(current)
+        self.assertEqual(affected_partitions(current, stored)[0], set())
+
+        # partiție modificată -> ea + anul inventariat următor (din aceeași rezervație)
+        changed = {**current, (1, 2000): (3, "x")}
+        affected, years = affected_partitions(changed, stored)
+        self.assertEqual(affected, {(1, 2000), (1, 2005)})
+        self.assertEqual(years, {1: [2000, 2005, 2010], 2: [2001]})
+
+        # partiție dispărută -> doar anul următor, care primește alt „an anterior”
+        gone = {k: v for k, v in current.items() if k != (1, 2005)}
+        self.assertEqual(affected_partitions(gone, stored)[0], {(1, 2010)})
+
+        self.assertEqual(affected_partitions(current, stored, full=True)[0], set(current))
+
+    def test_incremental_run_after_edit_and_delete(self):
+        call_command("compute_turnover", stdout=StringIO())
+        rows = self.rows()
+        self.assertEqual((rows[2005].gained, rows[2005].lost, rows[2005].retained_count),
+                         ([self.sp[3].id], [self.sp[0].id], 2))
+        self.assertEqual(rows[2010].prev_year, 2005)
+        computed = {year: row.computed_at for year, row in rows.items()}
+
+        # editare în 2005: se recalculează 2005 și 2010, 2000 rămâne neatins
+        Occurrence.objects.filter(reserve=self.reserve, year=2005, species=self.sp[3]).update(species=self.sp[4])
+        out = StringIO()
+        call_command("compute_turnover", stdout=out)
+        self.assertIn("recalculate=2", out.getvalue())
+        rows = self.rows()
+        self.assertEqual(rows[2000].computed_at, computed[2000])
+        self.assertEqual(rows[2005].gained, [self.sp[4].id])
+        self.assertEqual((rows[2010].gained, rows[2010].lost, rows[2010].retained_count),
+                         ([self.sp[3].id], [self.sp[1].id, self.sp[2].id], 1))
+
+        # ștergerea partiției 2005: rândul ei dispare, 2010 se compară acum cu 2000
+        Occurrence.objects.filter(reserve=self.reserve, year=2005).delete()
+        call_command("compute_turnover", stdout=StringIO())
+        rows = self.rows()
+        self.assertNotIn(2005, rows)
+        self.assertEqual((rows[2010].prev_year, rows[2010].retained_count), (2000, 0))
+
+    def test_full_run_deletes_removed_partitions(self):
+        call_command("compute_turnover", stdout=StringIO())
+        Occurrence.objects.filter(reserve=self.reserve, year=2010).delete()
+        out = StringIO()
+        call_command("compute_turnover", "--full", stdout=out)
+        self.assertIn("recalculate=2, șterse=1", out.getvalue())
+        self.assertEqual(sorted(self.rows()), [2000, 2005])
+
+
+class SpeciesMetaVersionTests(TestCase):
+    """Editarea metadatelor speciei (update_species_meta) invalidează cache-urile marcate cu versiunea datelor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        cls.reserve = Reserve.objects.create(name="Codrii")
+        cls.iris = Species.objects.create(denumire_stiintifica="Iris pumila", cartea_rosie_cat="CR", clasa="Liliopsida")
+        Occurrence.objects.create(species=cls.iris, reserve=cls.reserve, year=2010)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _edit(self, **fields):
+        resp = self.client.post(reverse("update_species_meta", args=[self.iris.pk]), fields)
+        self.assertEqual(resp.json()["changed"], fields)
+
+    def test_versioned_fields_bump_reserve(self):
+        for field, value in [("cartea_rosie_cat", "EN"), ("clasa", "Magnoliopsida"), ("denumire_populara", "Irisul pitic")]:
+            before = ReserveDataVersion.current([self.reserve.pk])[self.reserve.pk]
+            self._edit(**{field: value})
+            self.assertEqual(ReserveDataVersion.current([self.reserve.pk])[self.reserve.pk], before + 1, field)
+
+        stamp = ReserveDataVersion.stamp()
+        self._edit(notes="doar o notă")  # câmp care nu apare în cache-uri -> fără bump
+        self.assertEqual(ReserveDataVersion.stamp(), stamp)
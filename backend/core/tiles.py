@@ -0,0 +1,211 @@
+# core/tiles.py
+"""Tile-uri PNG de densitate pregenerate (Web Mercator z/x/y), pentru harta națională publică.
+
+Straturi: reserves, sites, rare (ocurențe de specii rare cu coordonate). Comanda build_tiles
+scrie fișierele în MAP_TILES_DIR/<strat>/<z>/<x>/<y>.png; serverul doar le citește de pe disc.
+
+Fiecare punct e desenat ca un pătrat 5x5 (SPLAT px în jurul lui), deci un tile primește și
+punctele vecinilor aflate la cel mult SPLAT px de marginea lui: pătratele nu se mai taie la
+margine. Culoarea e normalizată față de densitatea maximă a întregului nivel de zoom (nu a
+tile-ului), ca tile-urile vecine să folosească aceeași scară.
+
+Generarea e incrementală: pentru fiecare tile se calculează amprenta (md5) punctelor care îl
+afectează (id + coordonate, inclusiv vecinii de la margine); manifest.json din directorul
+stratului ține amprentele și densitatea maximă a fiecărui tile, plus maximul per zoom.
+Se redesenează doar tile-urile cu amprentă schimbată (toate ale unui zoom, dacă maximul lui
+s-a schimbat), iar cele rămase fără puncte se șterg. Dacă s-a schimbat ceva, crește numărul
+`build`, folosit în URL (?v=<build>) ca să poată fi servite cu cache lung (immutable).
+"""
+import hashlib
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .map_clusters import MAX_LAT
+from .models import Occurrence, Reserve, Site
+
+TILE_SIZE = 256
+SPLAT = 2  # raza pătratului desenat pentru fiecare punct (5x5 px)
+MIN_ZOOM = 5
+MAX_ZOOM = 10
+
+LAYERS = ("reserves", "sites", "rare")
+
+# rampă de culoare (RGBA) pe densitatea normalizată logaritmic: galben transparent -> roșu opac
+RAMP = np.array([
+    [255, 255, 178, 0],
+    [254, 204, 92, 140],
+    [253, 141, 60, 190],
+    [240, 59, 32, 220],
+    [189, 0, 38, 245],
+], dtype=float)
+
+
+def tiles_dir() -> Path:
+    return Path(settings.MAP_TILES_DIR)
+
+
+def _layer_points(layer):
+    """(ids, lat, lon) ca array-uri NumPy, ordonate după id."""
+    if layer == "reserves":
+        qs = Reserve.objects.all()
+    elif layer == "sites":
+        qs = Site.objects.all()
+    else:
+        qs = Occurrence.objects.filter(effective_rare=True)
+    rows = list(qs.filter(latitude__isnull=False, longitude__isnull=False)
+                .order_by("id")
+                .values_list("id", "latitude", "longitude"))
+    data = np.array(rows, dtype=float).reshape(-1, 3)
+    return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+
+
+def pixel_xy(lat, lon, zoom):
+    """Coordonatele globale în pixeli (vectorizat) la nivelul de zoom dat."""
+    size = TILE_SIZE * (1 << zoom)
+    lat = np.radians(np.clip(lat, -MAX_LAT, MAX_LAT))
+    x = (lon + 180.0) / 360.0 * size
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * size
+    last = size - 1
+    return np.clip(x.astype(np.int64), 0, last), np.clip(y.astype(np.int64), 0, last)
+
+
+# ------------------------ desenare ------------------------ #
+
+def _png(rgba: np.ndarray) -> bytes:
+    """PNG RGBA 8 biți (fără Pillow): IHDR + IDAT (rânduri cu filtrul 0, zlib) + IEND."""
+    height, width = rgba.shape[:2]
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+
+EMPTY_TILE = _png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def density(px, py) -> np.ndarray:
+    """Densitatea [TILE_SIZE, TILE_SIZE] pentru pixelii locali (px, py), care pot ieși cu cel mult
+    SPLAT px în afara tile-ului (punctele vecinilor); fiecare punct acoperă un pătrat 5x5."""
+    side = TILE_SIZE + 2 * SPLAT
+    counts = np.bincount((py + SPLAT) * side + (px + SPLAT), minlength=side * side).reshape(side, side)
+    width = 2 * SPLAT + 1
+    return sum(counts[dy:dy + TILE_SIZE, dx:dx + TILE_SIZE] for dy in range(width) for dx in range(width))
+
+
+def render(values, peak) -> bytes:
+    """Tile-ul PNG pentru densitatea dată, normalizată logaritmic față de `peak` (maximul zoom-ului)."""
+    rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    mask = values > 0
+    if mask.any():
+        level = np.minimum(np.log1p(values[mask]) / np.log1p(max(peak, 1)), 1.0)
+        pos = level * (len(RAMP) - 1)
+        lo = np.floor(pos).astype(int).clip(0, len(RAMP) - 2)
+        frac = (pos - lo)[:, None]
+        colour = RAMP[lo] * (1 - frac) + RAMP[lo + 1] * frac
+        colour[:, 3] = np.maximum(colour[:, 3], 90)  # și densitatea minimă rămâne vizibilă
+        rgba[mask] = colour.round().astype(np.uint8)
+    return _png(rgba)
+
+
+# ------------------------ generare incrementală ------------------------ #
+
+def _tile_groups(ids, lat, lon, zoom):
+    """Generator (x, y, amprentă, px locali, py locali) pentru fiecare tile afectat de puncte:
+    cele din tile plus cele ale vecinilor aflate la cel mult SPLAT px de margine."""
+    gx, gy = pixel_xy(lat, lon, zoom)
+    n, last = len(ids), (1 << zoom) - 1
+    # un punct afectează tile-urile colțurilor pătratului său (1, 2 sau 4 tile-uri distincte)
+    keys = np.concatenate([
+        np.clip((gx + ox) // TILE_SIZE, 0, last) * (1 << zoom) + np.clip((gy + oy) // TILE_SIZE, 0, last)
+        for ox in (-SPLAT, SPLAT) for oy in (-SPLAT, SPLAT)
+    ])
+    # (tile, punct) distincte, ordonate după tile, apoi după punct (ids sortate -> amprentă deterministă)
+    pairs = np.unique(keys * n + np.tile(np.arange(n), 4))
+    key, point = pairs // n, pairs % n
+    starts = np.flatnonzero(np.diff(key, prepend=-1))
+    ends = np.append(starts[1:], len(key))
+    for start, end in zip(starts, ends):
+        sel = point[start:end]
+        h = hashlib.md5(ids[sel].tobytes())
+        h.update(lat[sel].tobytes())
+        h.update(lon[sel].tobytes())
+        x, y = divmod(int(key[start]), 1 << zoom)
+        yield x, y, h.hexdigest(), gx[sel] - x * TILE_SIZE, gy[sel] - y * TILE_SIZE
+
+
+def read_manifest(layer) -> dict:
+    try:
+        with open(tiles_dir() / layer / "manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"build": 0, "min_zoom": None, "max_zoom": None, "peaks": {}, "tiles": {}}
+
+
+def _write(path: Path, data: bytes):
+    # scriere atomică: un request concurent nu vede niciodată un PNG pe jumătate
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build(layer, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, full=False) -> dict:
+    """Generează tile-urile stratului; întoarce {"written", "deleted", "unchanged", "build"}."""
+    root = tiles_dir() / layer
+    manifest = read_manifest(layer)
+    old = {} if full else manifest["tiles"]  # nume -> [amprentă, densitate maximă]
+    old_peaks = {} if full else manifest.get("peaks", {})
+    ids, lat, lon = _layer_points(layer)
+
+    fresh, peaks, written, unchanged = {}, {}, 0, 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        # 1) amprente + maximul fiecărui tile (din manifest, dacă tile-ul nu s-a schimbat)
+        tiles = []
+        for x, y, digest, px, py in _tile_groups(ids, lat, lon, zoom):
+            name = f"{zoom}/{x}/{y}"
+            known = old.get(name)
+            same = isinstance(known, list) and known[0] == digest and (root / f"{name}.png").exists()
+            fresh[name] = [digest, known[1] if same else int(density(px, py).max())]
+            tiles.append((name, same, px, py))
+        if not tiles:
+            continue
+        # 2) scara de culoare e maximul zoom-ului; dacă s-a schimbat, se redesenează tot zoom-ul
+        peak = peaks[str(zoom)] = max(fresh[name][1] for name, *_ in tiles)
+        same_scale = old_peaks.get(str(zoom)) == peak
+        for name, same, px, py in tiles:
+            if same and same_scale:
+                unchanged += 1
+                continue
+            _write(root / f"{name}.png", render(density(px, py), peak))
+            written += 1
+
+    deleted = 0
+    for name in manifest["tiles"].keys() - fresh.keys():
+        path = root / f"{name}.png"
+        if path.exists():
+            path.unlink()
+            deleted += 1
+
+    zoom_changed = (manifest["min_zoom"], manifest["max_zoom"]) != (min_zoom, max_zoom)
+    if written or deleted or zoom_changed or peaks != manifest.get("peaks"):
+        manifest = {"build": manifest["build"] + 1, "min_zoom": min_zoom, "max_zoom": max_zoom,
+                    "peaks": peaks, "tiles": fresh}
+        _write(root / "manifest.json", json.dumps(manifest, separators=(",", ":")).encode())
+    return {"written": written, "deleted": deleted, "unchanged": unchanged, "build": manifest["build"]}
+
+
+def tile_path(layer, zoom, x, y) -> Path:
+    return tiles_dir() / layer / str(zoom) / str(x) / f"{y}.png"
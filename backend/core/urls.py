@@ -47,6 +47,7 @@ urlpatterns = [
     
 
     path("filtrari/ocurente/", core_views.occurrences_filters_page, name="occurrences_filters"),
+    path("filtrari/ocurente/query/", core_views.occurrences_query, name="occurrences_query"),
     path("filtrari/site-habitate/", core_views.sitehab_filters_page, name="sitehab_filters"),
 
     # New Filtrari specific wrappers
@@ -57,6 +58,8 @@ urlpatterns = [
     # Associations filters (new)
     path("filters/associations/", core_views.filters_asociatii, name="filters_asociatii"),
     path("filters/associations/export/", core_views.export_asociatii, name="export_asociatii"),
+    path("filtrari/salvate/", core_views.saved_filters_page, name="saved_filters"),
+    path("filtrari/salvate/<int:pk>/", core_views.saved_filter_detail, name="saved_filter_detail"),
     path("comparatii/", views.comparatii_home, name="comparatii_home"),
 
 
@@ -67,8 +70,18 @@ urlpatterns = [
     path("vizualizari/specii/<int:pk>/update-meta/", views.update_species_meta, name="update_species_meta"),
     path("vizualizari/rezervatii/", views.viz_rezervatii, name="viz_rez"),
     path("vizualizari/rezervatii/<int:pk>/", views.viz_rezervatii_detail, name="viz_rez_detail"),
+    path("vizualizari/rezervatii/<int:pk>/dosar/", views.viz_rezervatii_dossier, name="viz_rez_dossier"),
     path("vizualizari/rezervatii/<int:pk>/update-description/", views.update_reserve_description, name="update_reserve_description"),
     path("vizualizari/rezervatii/<int:pk>/update-meta/", views.update_reserve_meta, name="update_reserve_meta"),
+    path("vizualizari/acumulare/", views.accumulation_curves_data, name="accumulation_curves_data"),
+    path("vizualizari/acumulare/export/", views.accumulation_curves_export, name="accumulation_curves_export"),
+    path("vizualizari/serii-anuale/", views.year_series_data, name="year_series_data"),
+    path("vizualizari/raioane/harta/", views.raion_choropleth_data, name="raion_choropleth_data"),
+    path("vizualizari/harta/clustere/", views.map_clusters_data, name="map_clusters_data"),
+    path("vizualizari/harta/densitate/", views.heatmap_data, name="heatmap_data"),
+    path("vizualizari/harta/tiles/", views.map_tiles_index, name="map_tiles_index"),
+    path("vizualizari/harta/tiles/<str:layer>/<int:z>/<int:x>/<int:y>.png", views.map_tile, name="map_tile"),
+    path("vizualizari/aproape/", views.nearby_data, name="nearby_data"),
     path("vizualizari/asociatii/", views.viz_asociatii, name="viz_asoc"),
     path("vizualizari/asociatii/<int:pk>/", views.viz_asociatii_detail, name="viz_asoc_detail"),
     path("vizualizari/asociatii/<int:pk>/update-meta/", views.update_association_meta, name="update_association_meta"),
@@ -85,6 +98,9 @@ urlpatterns = [
     path("comparatii/plante/data/", views.comparatii_plante_data, name="comparatii_plante_data"),
     path("comparatii/plante/export/", views.comparatii_plante_export, name="comparatii_plante_export"),
     path("comparatii/plante/years/", views.comparatii_plante_years, name="comparatii_plante_years"),
+    path("comparatii/turnover/", views.comparatii_turnover, name="comparatii_turnover"),
+    path("comparatii/raioane/", views.comparatii_raioane, name="comparatii_raioane"),
+    path("comparatii/raioane/data/", views.comparatii_raioane_data, name="comparatii_raioane_data"),
 
 
 
@@ -1,13 +1,14 @@
 # core/views.py
 from django.shortcuts import render
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, Http404, StreamingHttpResponse
+from django.http import HttpResponse, Http404, QueryDict, StreamingHttpResponse
 from django.db.models import Q
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.paginator import Paginator
-from django.db.models import Max
+from django.db.models import Max, Min, Count, Sum
 from django.db.models import F, Q, Value, FloatField, IntegerField, Case, When, CharField, Func
-from django.db.models.functions import Lower, Greatest
+from django.db.models.functions import Coalesce, Greatest, JSONObject, Lower
+from django.db import connection
 try:
     from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity  # type: ignore
 except Exception:  # pragma: no cover
@@ -24,10 +25,30 @@ from django.shortcuts import render
 from .models import (
     Reserve, Association, ReserveAssociationYear,
     Occurrence, Species, SiteHabitat, Site, Habitat,
+    ReserveYearTurnover, ReserveDataVersion, YearlyCount, SavedFilter, SpeciesRangeMetrics, RaionSummary,
+)
+from .dossier import get_dossier
+from .heatmap import cached_grid as heatmap_grid, parse_params as heatmap_params, rle, to_bytes
+from .map_clusters import clusters as map_clusters
+from .nearby import NEAREST_K, SOURCES as NEARBY_SOURCES, nearby_for
+from .refdata import ref_list, resolve_ids
+from .tiles import EMPTY_TILE, LAYERS as TILE_LAYERS, read_manifest, tile_path
+from .saved_filters import (
+    KINDS as SAVED_FILTER_KINDS,
+    build_queryset as saved_filter_queryset,
+    iter_snapshot_objects, objects_for_ids, refresh_snapshot,
+)
+from .occurrence_query import (
+    DEFAULT_LIMIT, FACET_LIMIT, MAX_LIMIT, QueryError,
+    facet_counts, filtered_queryset, iter_rows, parse_fields, parse_filters,
 )
 
 # CSV/XLSX
 import csv
+import json
+import hashlib
+from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
+from django.core.cache import cache
 from io import StringIO, BytesIO
 import unicodedata
 import difflib
@@ -331,10 +352,8 @@ def filters_plante_rezervatii(request):
     reserve_name = (request.GET.get("reserve_name") or "").strip()
     raion = (request.GET.get("raion") or "").strip()
 
-    all_reserves = Reserve.objects.order_by("name").only("id", "name")
-    all_raions = (Reserve.objects
-                  .exclude(raion__isnull=True).exclude(raion="")
-                  .values_list("raion", flat=True).distinct().order_by("raion"))
+    all_reserves = ref_list("reserves")
+    all_raions = ref_list("raions")
 
     qs, error = _build_occurrence_filters_queryset(mode, reserve_name, raion)
 
@@ -351,31 +370,99 @@ def filters_plante_rezervatii(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "error": error,
+        "facets": None if error else facet_counts(qs),
     })
 
 def _build_occurrence_filters_queryset(mode: str, reserve_name: str, raion: str):
+    """Numele (rezervație / raion) se rezolvă întâi în id-uri (refdata, din cache);
+    interogarea filtrează apoi direct pe reserve_id, fără JOIN + UPPER() pe Reserve."""
     qs = (Occurrence.objects.select_related("species", "reserve").all())
     error = None
     if mode in ("by_reserve_all", "by_reserve_rare"):
+        reserve_ids = resolve_ids("reserve", reserve_name)
         if not reserve_name:
             error = "Alege o rezervație."
             qs = qs.none()
+        elif not reserve_ids:
+            error = "Rezervație inexistentă."
+            qs = qs.none()
         else:
-            qs = qs.filter(reserve__name__iexact=reserve_name)
+            qs = qs.filter(reserve_id__in=reserve_ids)
             if mode == "by_reserve_rare":
-                qs = qs.filter(Q(is_rare=True) | Q(species__is_rare=True))
+                qs = qs.filter(effective_rare=True)
     elif mode in ("by_raion_all", "by_raion_rare"):
+        reserve_ids = resolve_ids("raion", raion)
         if not raion:
             error = "Alege un raion."
             qs = qs.none()
+        elif not reserve_ids:
+            error = "Raion inexistent."
+            qs = qs.none()
         else:
-            qs = qs.filter(reserve__raion__iexact=raion)
+            qs = qs.filter(reserve_id__in=reserve_ids)
             if mode == "by_raion_rare":
-                qs = qs.filter(Q(is_rare=True) | Q(species__is_rare=True))
+                qs = qs.filter(effective_rare=True)
     else:
         error = "Mod invalid."
         qs = qs.none()
-    return qs.order_by("reserve__name", "species__denumire_stiintifica", "-year"), error
+    # chei de sortare denormalizate -> prima pagină vine direct din core_occ_sort_idx (LIMIT, fără sort)
+    return qs.order_by("reserve_sort", "species_sort", "-year"), error
+
+@login_required
+@require_GET
+def occurrences_query(request):
+    """API JSON peste Occurrence. Filtre combinabile: vezi core/occurrence_query.py.
+    Extra: fields=<câmpuri>, limit=, cursor=<next_cursor anterior>, format=json|ndjson|csv,
+           facets=1 (+ facet_limit=) -> numărători pe rezervație/an/familie/raritate (tot setul filtrat).
+      json   -> o pagină: { fields, results: [ {câmp: valoare} ], next_cursor[, facets] }
+      ndjson -> streaming, un obiect JSON pe linie (tot rezultatul de după cursor)
+      csv    -> streaming, aceleași coloane
+    """
+    try:
+        filters = parse_filters(request.GET)
+        fields = parse_fields(request.GET.get("fields"))
+    except QueryError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    fmt = (request.GET.get("format") or "json").strip().lower()
+    if fmt not in ("json", "ndjson", "csv"):
+        return JsonResponse({"ok": False, "error": "Invalid format"}, status=400)
+    cursor = (request.GET.get("cursor") or "").strip()
+    if cursor and not cursor.isdigit():
+        return JsonResponse({"ok": False, "error": "Invalid cursor"}, status=400)
+
+    # paginare keyset pe id: fiecare pagină e un range scan, indiferent de adâncime
+    qs = filtered_queryset(filters)
+    base_qs = qs
+    if cursor:
+        qs = qs.filter(id__gt=int(cursor))
+    qs = qs.order_by("id")
+
+    if fmt == "ndjson":
+        lines = (json.dumps(row, ensure_ascii=False) + "\n" for row in iter_rows(qs, fields))
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson; charset=utf-8")
+    if fmt == "csv":
+        return _stream_csv("ocurente.csv", fields, (list(row.values()) for row in iter_rows(qs, fields)))
+
+    try:
+        limit = min(MAX_LIMIT, max(1, int(request.GET.get("limit", DEFAULT_LIMIT))))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    page_fields = fields if "id" in fields else ["id", *fields]
+    rows = list(iter_rows(qs[:limit + 1], page_fields))
+    next_cursor = str(rows[limit - 1]["id"]) if len(rows) > limit else None
+    rows = rows[:limit]
+    if "id" not in fields:
+        for row in rows:
+            del row["id"]
+    payload = {"fields": fields, "results": rows, "next_cursor": next_cursor}
+    if (request.GET.get("facets") or "").strip() in ("1", "true", "yes", "on"):
+        try:
+            facet_limit = min(100, max(1, int(request.GET.get("facet_limit", FACET_LIMIT))))
+        except ValueError:
+            facet_limit = FACET_LIMIT
+        payload["facets"] = facet_counts(base_qs, facet_limit)
+    return JsonResponse(payload)
 
 def _rows_from_occurrences(iterable):
     rows = []
@@ -386,7 +473,7 @@ def _rows_from_occurrences(iterable):
             "species_sci": o.species.denumire_stiintifica,
             "species_pop": o.species.denumire_populara or "",
             "year": o.year,
-            "rare": "Da" if (o.is_rare or o.species.is_rare) else "Nu",
+            "rare": "Da" if o.effective_rare else "Nu",
             "lat": o.latitude,
             "lon": o.longitude,
         })
@@ -423,7 +510,7 @@ def export_plante_rezervatii(request):
                     o.species.denumire_stiintifica,
                     o.species.denumire_populara or "",
                     o.year,
-                    "Da" if (o.is_rare or o.species.is_rare) else "Nu",
+                    "Da" if o.effective_rare else "Nu",
                     o.latitude if o.latitude is not None else "",
                     o.longitude if o.longitude is not None else "",
                 ])
@@ -450,7 +537,7 @@ def export_plante_rezervatii(request):
                 o.species.denumire_stiintifica,
                 o.species.denumire_populara or "",
                 o.year,
-                "Da" if (o.is_rare or o.species.is_rare) else "Nu",
+                "Da" if o.effective_rare else "Nu",
                 o.latitude if o.latitude is not None else "",
                 o.longitude if o.longitude is not None else "",
             ])
@@ -458,28 +545,30 @@ def export_plante_rezervatii(request):
         "Content-Disposition": 'attachment; filename="plante_rezervatii.csv"'
     })
 
-def filters_asociatii(request):
-    mode = (request.GET.get("mode") or "by_reserve_year").strip()
-    reserve_name = (request.GET.get("reserve_name") or "").strip()
-    year_q = (request.GET.get("year") or "").strip()
-
-    all_reserves = Reserve.objects.order_by("name").only("id", "name")
-
+def _build_association_filters_queryset(mode: str, reserve_name: str, year_q: str):
+    """(qs, error) pentru filtrele rezervație–asociație; comun paginii, exportului și filtrelor salvate."""
     links = ReserveAssociationYear.objects.select_related("reserve", "association")
+    reserve_ids = resolve_ids("reserve", reserve_name)
     err = None
 
     if mode == "by_reserve_year":
         if not reserve_name or not year_q.isdigit():
             err = "Alege o rezervație și un an."
             qs = links.none()
+        elif not reserve_ids:
+            err = "Rezervație inexistentă."
+            qs = links.none()
         else:
-            qs = links.filter(reserve__name__iexact=reserve_name, year=int(year_q)).order_by("association__name")
+            qs = links.filter(reserve_id__in=reserve_ids, year=int(year_q)).order_by("association__name")
     elif mode == "by_reserve_all_years":
         if not reserve_name:
             err = "Alege o rezervație."
             qs = links.none()
+        elif not reserve_ids:
+            err = "Rezervație inexistentă."
+            qs = links.none()
         else:
-            qs = links.filter(reserve__name__iexact=reserve_name).order_by("-year", "association__name")
+            qs = links.filter(reserve_id__in=reserve_ids).order_by("-year", "association__name")
     elif mode == "by_year_all_reserves":
         if not year_q.isdigit():
             err = "Alege un an."
@@ -490,6 +579,17 @@ def filters_asociatii(request):
         err = "Mod invalid."
         qs = links.none()
 
+    return qs, err
+
+def filters_asociatii(request):
+    mode = (request.GET.get("mode") or "by_reserve_year").strip()
+    reserve_name = (request.GET.get("reserve_name") or "").strip()
+    year_q = (request.GET.get("year") or "").strip()
+
+    all_reserves = ref_list("reserves")
+
+    qs, err = _build_association_filters_queryset(mode, reserve_name, year_q)
+
     paginator, page_obj = _paginate(request, qs, default=50)
     rows = []
     for l in page_obj.object_list:
@@ -517,22 +617,9 @@ def export_asociatii(request):
     reserve_name = (request.GET.get("reserve_name") or "").strip()
     year_q = (request.GET.get("year") or "").strip()
 
-    links = ReserveAssociationYear.objects.select_related("reserve", "association")
-
-    if mode == "by_reserve_year":
-        if not reserve_name or not year_q.isdigit():
-            return HttpResponse("Alege o rezervație și un an.", content_type="text/plain; charset=utf-8", status=400)
-        qs = links.filter(reserve__name__iexact=reserve_name, year=int(year_q)).order_by("association__name")
-    elif mode == "by_reserve_all_years":
-        if not reserve_name:
-            return HttpResponse("Alege o rezervație.", content_type="text/plain; charset=utf-8", status=400)
-        qs = links.filter(reserve__name__iexact=reserve_name).order_by("-year", "association__name")
-    elif mode == "by_year_all_reserves":
-        if not year_q.isdigit():
-            return HttpResponse("Alege un an.", content_type="text/plain; charset=utf-8", status=400)
-        qs = links.filter(year=int(year_q)).order_by("reserve__name", "association__name")
-    else:
-        return HttpResponse("Mod invalid.", content_type="text/plain; charset=utf-8", status=400)
+    qs, err = _build_association_filters_queryset(mode, reserve_name, year_q)
+    if err:
+        return HttpResponse(err, content_type="text/plain; charset=utf-8", status=400)
 
     headers = ["Rezervație", "Asociație", "An", "Note"]
 
@@ -560,36 +647,149 @@ def export_asociatii(request):
         "Content-Disposition": 'attachment; filename="asociatii.csv"'
     })
 
-def filters_situri_habitat(request):
-    """Wrapper that mirrors sitehab_filters_page behavior but renders under /filtrari/ namespace."""
-    mode = request.GET.get("mode", "by_site")
-    site_name = (request.GET.get("site_name") or "").strip()
-    habitat_name = (request.GET.get("habitat_name") or "").strip()
-    year = (request.GET.get("year") or "").strip()
+# parametri de paginare/export: nu fac parte din definiția filtrului
+_SAVED_FILTER_VOLATILE = {"page", "per_page", "export", "format", "cursor", "limit", "facets", "facet_limit"}
+
+
+@login_required
+def saved_filters_page(request):
+    """Filtrele salvate ale utilizatorului curent.
+    POST (din paginile de filtrare): name, kind, query=<querystring-ul filtrului>, snapshot=0|1.
+    """
+    if request.method == "POST":
+        name = (request.POST.get("name") or "").strip()[:120]
+        kind = (request.POST.get("kind") or "").strip()
+        if not name or kind not in SAVED_FILTER_KINDS:
+            messages.error(request, "Alege un nume și un tip de filtru valid.")
+            return redirect("saved_filters")
+        params = {k: v for k, v in QueryDict(request.POST.get("query") or "").items()
+                  if k not in _SAVED_FILTER_VOLATILE}
+        sf, _ = SavedFilter.objects.update_or_create(
+            user=request.user, name=name,
+            defaults={"kind": kind, "params": params,
+                      "snapshot_enabled": request.POST.get("snapshot", "1") != "0",
+                      "result_ids": None, "result_count": None, "snapshot_stamp": None, "snapshot_at": None},
+        )
+        if sf.snapshot_enabled:
+            refresh_snapshot(sf)
+        messages.success(request, f"Filtrul „{name}” a fost salvat.")
+        return redirect("saved_filter_detail", pk=sf.pk)
+
+    stamp = ReserveDataVersion.stamp()
+    filters = list(SavedFilter.objects.filter(user=request.user).defer("result_ids"))
+    rows = [{
+        "f": sf,
+        "kind_label": sf.get_kind_display(),
+        "stale": sf.snapshot_enabled and sf.snapshot_stamp != stamp,
+    } for sf in filters]
+    return render(request, "core/saved_filters.html", {"rows": rows})
+
+
+@login_required
+def saved_filter_detail(request, pk: int):
+    """Rezultatele unui filtru salvat: din snapshot (doar rândurile paginii, după id) sau live.
+    GET: page, per_page, export=csv|xlsx.  POST: action=refresh|delete.
+    """
+    sf = get_object_or_404(SavedFilter, pk=pk, user=request.user)
+    kind = SAVED_FILTER_KINDS[sf.kind]
+
+    if request.method == "POST":
+        action = (request.POST.get("action") or "").strip()
+        if action == "delete":
+            sf.delete()
+            messages.success(request, "Filtrul a fost șters.")
+            return redirect("saved_filters")
+        if action == "refresh" and sf.snapshot_enabled:
+            refresh_snapshot(sf)
+            messages.success(request, "Rezultatele au fost recalculate.")
+        return redirect("saved_filter_detail", pk=sf.pk)
+
+    error = None
+    if sf.has_snapshot:
+        source = sf.result_ids
+    else:
+        qs, error = saved_filter_queryset(sf)
+        source = qs
+
     export = (request.GET.get("export") or "").strip().lower()
+    if export in ("csv", "xlsx") and not error:
+        objects = iter_snapshot_objects(sf) if sf.has_snapshot else source.iterator()
+        rows_iter = (kind.row(o) for o in objects)
+        filename = f"filtru_{sf.pk}"
+        if export == "xlsx":
+            try:
+                from openpyxl import Workbook
+            except ModuleNotFoundError:
+                export = "csv"
+            else:
+                wb = Workbook(); ws = wb.active; ws.title = "Rezultate"; ws.append(kind.headers)
+                for row in rows_iter:
+                    ws.append(row)
+                bio = BytesIO(); wb.save(bio); bio.seek(0)
+                resp = HttpResponse(bio.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                resp["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
+                return resp
+        return _stream_csv(f"{filename}.csv", kind.headers, rows_iter)
+
+    paginator, page_obj = _paginate(request, source, default=50)
+    page_items = list(page_obj.object_list)
+    if sf.has_snapshot:
+        page_items = objects_for_ids(sf, page_items)
+
+    return render(request, "core/saved_filter_detail.html", {
+        "sf": sf,
+        "kind_label": sf.get_kind_display(),
+        "headers": kind.headers,
+        "rows": [kind.row(o) for o in page_items],
+        "page_obj": page_obj,
+        "paginator": paginator,
+        "error": error,
+        "stale": sf.is_stale(ReserveDataVersion.stamp()),
+    })
 
-    qs_full = SiteHabitat.objects.select_related("site", "habitat")
+def _sitehab_queryset(mode, site_name, habitat_name, year):
+    """QS-ul complet pentru filtrele Site–Habitat -> (qs, title, error).
+    Site-ul / habitatul se rezolvă în id-uri (refdata), apoi filtrăm pe FK."""
+    qs = SiteHabitat.objects.select_related("site", "habitat")
+    error = None
 
     if mode == "by_site" and site_name:
-        qs_full = qs_full.filter(site__name__iexact=site_name).order_by(
-            "year", "habitat__name_romanian", "habitat__name_english"
-        )
+        site_ids = resolve_ids("site", site_name)
+        if site_ids:
+            qs = qs.filter(site_id__in=site_ids).order_by(
+                "year", "habitat__name_romanian", "habitat__name_english"
+            )
+        else:
+            qs = qs.none()
+            error = "Site inexistent."
         title = f"Habitate în site-ul: {site_name}"
     elif mode == "by_habitat" and habitat_name:
-        qs_full = qs_full.filter(
-            Q(habitat__name_romanian__iexact=habitat_name) |
-            Q(habitat__name_english__iexact=habitat_name) |
-            Q(habitat__code__iexact=habitat_name)
-        ).order_by("year", "site__name")
+        habitat_ids = resolve_ids("habitat", habitat_name)
+        if habitat_ids:
+            qs = qs.filter(habitat_id__in=habitat_ids).order_by("year", "site__name")
+        else:
+            qs = qs.none()
+            error = "Habitat inexistent."
         title = f"Site-uri pentru habitat: {habitat_name}"
     elif mode == "by_year" and year.isdigit():
-        qs_full = qs_full.filter(year=int(year)).order_by(
+        qs = qs.filter(year=int(year)).order_by(
             "site__name", "habitat__name_romanian", "habitat__name_english"
         )
         title = f"Relații Site–Habitat în anul: {year}"
     else:
-        qs_full = qs_full.none()
+        qs = qs.none()
         title = "Selectează un filtru"
+    return qs, title, error
+
+def filters_situri_habitat(request):
+    """Wrapper that mirrors sitehab_filters_page behavior but renders under /filtrari/ namespace."""
+    mode = request.GET.get("mode", "by_site")
+    site_name = (request.GET.get("site_name") or "").strip()
+    habitat_name = (request.GET.get("habitat_name") or "").strip()
+    year = (request.GET.get("year") or "").strip()
+    export = (request.GET.get("export") or "").strip().lower()
+
+    qs_full, title, error = _sitehab_queryset(mode, site_name, habitat_name, year)
 
     if export in ("csv", "xlsx"):
         return _export_sitehab(qs_full, export)
@@ -597,8 +797,8 @@ def filters_situri_habitat(request):
     paginator, page_obj = _paginate(request, qs_full, default=50)
     qs = page_obj.object_list
 
-    sites = Site.objects.order_by("name").values_list("name", flat=True)
-    habitats = Habitat.objects.order_by("name_romanian", "name_english").values_list("name_romanian", flat=True)
+    sites = ref_list("sites")
+    habitats = ref_list("habitats")
 
     return render(request, "core/filters_situri_habitat.html", {
         "mode": mode,
@@ -609,6 +809,7 @@ def filters_situri_habitat(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "title": title,
+        "error": error,
         "sites": list(sites),
         "habitats": list(habitats),
     })
@@ -675,33 +876,88 @@ def viz_specii(request):
         "q": q,
     })
 
+SPECIES_SUMMARY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _species_summary(sp: Species) -> dict:
+    """Distribuția unei specii: rezervații cu anii observați, primul/ultimul an, nr. de
+    rezervații pe raion și punctele pentru hartă.
+
+    O singură interogare agregată (GROUP BY rezervație; punctele vin ca JSONB_AGG), deci
+    numărul de interogări nu depinde de numărul de ocurențe. Rezultatul e pus în cache
+    per specie, cu versiunile de date ale rezervațiilor în care apare în cheie (ca matricea
+    de comparație): o modificare în altă rezervație nu îl invalidează.
+    """
+    versions = sorted(Occurrence.objects
+                      .filter(species=sp)
+                      .values_list("reserve_id", Coalesce("reserve__data_version__version", 0))
+                      .distinct())
+    raw = json.dumps(versions)
+    key = f"spdetail:{sp.pk}:" + hashlib.md5(raw.encode()).hexdigest()
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    rows = (Occurrence.objects
+            .filter(species=sp)
+            .values("reserve_id", "reserve__name", "reserve__raion")
+            .annotate(
+                n=Count("id"),
+                years=ArrayAgg("year", distinct=True, ordering="year"),
+                first_year=Min("year"),
+                last_year=Max("year"),
+                points=JSONBAgg(
+                    JSONObject(lat="latitude", lon="longitude", year="year"),
+                    filter=Q(latitude__isnull=False, longitude__isnull=False),
+                    ordering="year",
+                ),
+            )
+            .order_by("reserve__name"))
+
+    reserves, points, raions = [], [], {}
+    for row in rows:
+        reserves.append({
+            "id": row["reserve_id"],
+            "name": row["reserve__name"],
+            "raion": row["reserve__raion"],
+            "count": row["n"],
+            "years": row["years"],
+            "first_year": row["first_year"],
+            "last_year": row["last_year"],
+        })
+        raion = row["reserve__raion"] or "—"
+        raions[raion] = raions.get(raion, 0) + 1
+        for p in row["points"] or []:
+            points.append({
+                "lat": float(p["lat"]),
+                "lon": float(p["lon"]),
+                "label": f"{sp.denumire_stiintifica} — {row['reserve__name']} ({p['year']})",
+            })
+
+    summary = {
+        "reserves": reserves,
+        "first_year": min((r["first_year"] for r in reserves), default=None),
+        "last_year": max((r["last_year"] for r in reserves), default=None),
+        "raions": [{"raion": name, "reserves": n}
+                   for name, n in sorted(raions.items(), key=lambda kv: (-kv[1], kv[0]))],
+        "points": points,
+    }
+    cache.set(key, summary, SPECIES_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
 @login_required
 def viz_specii_detail(request, pk: int):
     sp = get_object_or_404(Species, pk=pk)
-    points_qs = (Occurrence.objects
-                 .filter(species=sp)
-                 .exclude(latitude__isnull=True)
-                 .exclude(longitude__isnull=True))
-
-    # transformăm într-o listă simplă pentru template (lat, lon, label)
-    points = []
-    for o in points_qs:
-        try:
-            lat = float(o.latitude)
-            lon = float(o.longitude)
-        except (TypeError, ValueError):
-            continue
-        label = f"{sp.denumire_stiintifica} — {o.reserve.name} ({o.year})" if getattr(o, "reserve", None) else sp.denumire_stiintifica
-        points.append({
-            "lat": lat,
-            "lon": lon,
-            "label": label,
-        })
+    summary = _species_summary(sp)
+    range_metrics = SpeciesRangeMetrics.objects.filter(species=sp).first()
 
     is_admin = request.user.is_staff or request.user.groups.filter(name__iexact="Administrators").exists()
     return render(request, "core/viz_specii_detail.html", {
         "sp": sp,
-        "points": points,
+        "summary": summary,
+        "range_metrics": range_metrics,
+        "points": summary["points"],
         "is_admin": is_admin,
     })
 
@@ -811,7 +1067,323 @@ def viz_asociatii(request):
 def viz_rezervatii_detail(request, pk: int):
     r = get_object_or_404(Reserve, pk=pk)
     is_admin = request.user.is_staff or request.user.groups.filter(name__iexact="Administrators").exists()
-    return render(request, "core/viz_rezervatii_detail.html", {"r": r, "is_admin": is_admin})
+    return render(request, "core/viz_rezervatii_detail.html", {
+        "r": r, "is_admin": is_admin, "nearby": nearby_for("reserve", r.pk),
+    })
+
+
+@login_required
+@require_GET
+def viz_rezervatii_dossier(request, pk: int):
+    """Dosarul rezervației (JSON): specii și asociații pe ani, Cartea Roșie, situri apropiate.
+    Precalculat per rezervație, reconstruit doar când datele ei s-au schimbat (core.dossier)."""
+    r = get_object_or_404(Reserve, pk=pk)
+    return JsonResponse(get_dossier(r))
+
+def _accumulation_curves(level: str = "reserve", key=None, only_rare: bool = False):
+    """Curbe de acumulare a speciilor: nr. cumulat de specii distincte pe măsură ce se adaugă anii de inventariere.
+
+    O singură trecere în SQL: anul primei observări per (rezervație|raion, specie), apoi
+    SUM(...) OVER (PARTITION BY cheie ORDER BY an) peste anii inventariați.
+    level: "reserve" (cheie = reserve_id) sau "raion" (cheie = Reserve.raion).
+    Întoarce { cheie: [ {year, new, cumulative}, ... ] } cu anii crescători.
+    """
+    group_col = "r.raion" if level == "raion" else "o.reserve_id"
+    joins = []
+    where = ["o.year IS NOT NULL"]
+    params = []
+    if level == "raion":
+        joins.append("JOIN core_reserve r ON r.id = o.reserve_id")
+        where.append("r.raion IS NOT NULL AND r.raion <> ''")
+    if key is not None:
+        where.append(f"{group_col} = %s")
+        params.append(key)
+    if only_rare:
+        where.append("o.effective_rare")
+
+    # JOIN cu core_reserve doar pe nivel raion; pe nivel rezervație interogarea citește doar core_occurrence
+    sql = f"""
+        WITH base AS (
+            SELECT {group_col} AS k, o.species_id, o.year
+            FROM core_occurrence o
+            {" ".join(joins)}
+            WHERE {" AND ".join(where)}
+        ),
+        first_seen AS (
+            SELECT k, species_id, MIN(year) AS year FROM base GROUP BY k, species_id
+        ),
+        new_per_year AS (
+            SELECT k, year, COUNT(*) AS n FROM first_seen GROUP BY k, year
+        ),
+        survey_years AS (
+            SELECT DISTINCT k, year FROM base
+        )
+        SELECT sy.k, sy.year, COALESCE(n.n, 0) AS new,
+               SUM(COALESCE(n.n, 0)) OVER (PARTITION BY sy.k ORDER BY sy.year) AS cumulative
+        FROM survey_years sy
+        LEFT JOIN new_per_year n ON n.k = sy.k AND n.year = sy.year
+        ORDER BY sy.k, sy.year
+    """
+    out = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for k, year, new, cumulative in cursor.fetchall():
+            out.setdefault(k, []).append({"year": year, "new": int(new), "cumulative": int(cumulative)})
+    return out
+
+
+@login_required
+@require_GET
+def accumulation_curves_data(request):
+    """JSON pentru grafice. Params: level=reserve|raion, reserve=<id>, raion=<nume>, rare=1.
+    Response: { level, curves: { cheie: [ {year,new,cumulative} ] } }
+    """
+    level = (request.GET.get("level") or "reserve").strip()
+    if level not in ("reserve", "raion"):
+        return JsonResponse({"ok": False, "error": "Invalid level"}, status=400)
+    only_rare = (request.GET.get("rare") or "").strip() in ("1", "true", "yes", "on")
+    key = None
+    if level == "reserve":
+        reserve_q = (request.GET.get("reserve") or "").strip()
+        if reserve_q:
+            if not reserve_q.isdigit():
+                return JsonResponse({"ok": False, "error": "Invalid reserve"}, status=400)
+            key = int(reserve_q)
+    else:
+        key = (request.GET.get("raion") or "").strip() or None
+
+    curves = _accumulation_curves(level, key, only_rare)
+    return JsonResponse({"level": level, "curves": {str(k): v for k, v in curves.items()}})
+
+
+@login_required
+@require_GET
+def accumulation_curves_export(request):
+    """Export CSV/XLSX al curbelor de acumulare pentru toate rezervațiile (sau raioanele)."""
+    kind = (request.GET.get("format") or request.GET.get("export") or "csv").lower()
+    level = (request.GET.get("level") or "reserve").strip()
+    if level not in ("reserve", "raion"):
+        return HttpResponse("Nivel invalid.", content_type="text/plain; charset=utf-8", status=400)
+    only_rare = (request.GET.get("rare") or "").strip() in ("1", "true", "yes", "on")
+    curves = _accumulation_curves(level, None, only_rare)
+
+    if level == "reserve":
+        names = dict(Reserve.objects.filter(id__in=list(curves)).values_list("id", "name"))
+        headers = ["Rezervație", "An", "Specii noi", "Specii cumulat"]
+    else:
+        names = {k: k for k in curves}
+        headers = ["Raion", "An", "Specii noi", "Specii cumulat"]
+    ordered_keys = sorted(curves, key=lambda k: str(names.get(k, k)))
+
+    def rows_iter():
+        for k in ordered_keys:
+            for pt in curves[k]:
+                yield [names.get(k, k), pt["year"], pt["new"], pt["cumulative"]]
+
+    filename = "acumulare_specii_" + ("raioane" if level == "raion" else "rezervatii")
+    if kind == "xlsx":
+        try:
+            from openpyxl import Workbook
+        except ModuleNotFoundError:
+            kind = "csv"
+        else:
+            wb = Workbook(); ws = wb.active; ws.title = "Acumulare"; ws.append(headers)
+            for row in rows_iter():
+                ws.append(row)
+            bio = BytesIO(); wb.save(bio); bio.seek(0)
+            resp = HttpResponse(bio.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            resp["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
+            return resp
+    return _stream_csv(f"{filename}.csv", headers, rows_iter())
+
+
+@login_required
+@require_GET
+def map_clusters_data(request):
+    """Clustere pentru hartă (JSON): layer=occurrences|reserves|sites, bbox=min_lon,min_lat,max_lon,max_lat,
+    zoom=0..18; pentru occurrences se aplică și filtrele din occurrence_query (species, rare, year_from...).
+    Răspuns GeoJSON: puncte cu properties {count[, id, label]} (id/label doar pentru puncte singulare).
+    """
+    layer = (request.GET.get("layer") or "occurrences").strip()
+    try:
+        zoom = int(request.GET.get("zoom", ""))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Invalid zoom"}, status=400)
+    try:
+        features = map_clusters(layer, request.GET.get("bbox"), zoom, request.GET)
+    except QueryError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    return JsonResponse({
+        "type": "FeatureCollection",
+        "zoom": zoom,
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [f["lon"], f["lat"]]},
+                "properties": {k: v for k, v in f.items() if k not in ("lat", "lon")},
+            }
+            for f in features
+        ],
+    })
+
+
+@login_required
+@require_GET
+def heatmap_data(request):
+    """Densitatea ocurențelor pe grilă (core/heatmap.py). Filtrele din occurrence_query + decade=, cell=.
+    format=rle (implicit): { bbox, cell, width, height, total, max, encoding: "rle", data: [valoare, lungime, ...] }
+    format=binary: octeții grilei (rânduri de la sud, little-endian), metadatele în antete X-Grid-*.
+    """
+    try:
+        filters, cell = heatmap_params(request.GET)
+        result = heatmap_grid(filters, cell)
+    except QueryError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    fmt = (request.GET.get("format") or "rle").strip().lower()
+    if fmt not in ("rle", "binary"):
+        return JsonResponse({"ok": False, "error": "Invalid format"}, status=400)
+    grid = result["grid"]
+    height, width = grid.shape
+    if fmt == "binary":
+        data, dtype = to_bytes(grid)
+        response = HttpResponse(data, content_type="application/octet-stream")
+        response["X-Grid-Width"], response["X-Grid-Height"] = width, height
+        response["X-Grid-Bbox"] = ",".join(str(v) for v in result["bbox"])
+        response["X-Grid-Cell"] = result["cell"]
+        response["X-Grid-Dtype"] = dtype
+        return response
+    return JsonResponse({
+        "bbox": result["bbox"],
+        "cell": result["cell"],
+        "width": width,
+        "height": height,
+        "total": int(grid.sum()),
+        "max": int(grid.max()) if grid.size else 0,
+        "encoding": "rle",
+        "data": rle(grid),
+    })
+
+
+TILE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+TILE_UNVERSIONED_CACHE_CONTROL = "public, max-age=300"
+
+
+@require_GET
+def map_tiles_index(request):
+    """Starturile de tile-uri pregenerate (JSON, public): build curent, interval de zoom și șablonul URL.
+    URL-ul include ?v=<build>, deci tile-urile pot fi păstrate în cache oricât (se schimbă la rebuild)."""
+    layers = {}
+    for layer in TILE_LAYERS:
+        manifest = read_manifest(layer)
+        if not manifest["build"]:
+            continue
+        url = reverse("map_tile", args=[layer, 0, 0, 0]).replace("/0/0/0.png", "/{z}/{x}/{y}.png")
+        layers[layer] = {
+            "build": manifest["build"],
+            "min_zoom": manifest["min_zoom"],
+            "max_zoom": manifest["max_zoom"],
+            "url": f"{url}?v={manifest['build']}",
+        }
+    response = JsonResponse({"layers": layers})
+    response["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@require_GET
+def map_tile(request, layer, z, x, y):
+    """Un tile PNG pregenerat (manage.py build_tiles), citit de pe disc; tile-urile fără date sunt transparente.
+    Cu ?v=<build> răspunsul e immutable (cache 1 an); fără, cache scurt + ETag."""
+    if layer not in TILE_LAYERS:
+        raise Http404("Strat necunoscut")
+    try:
+        data = tile_path(layer, z, x, y).read_bytes()
+    except FileNotFoundError:
+        data = EMPTY_TILE
+    etag = f'"{hashlib.md5(data).hexdigest()}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(data, content_type="image/png")
+    response["ETag"] = etag
+    response["Cache-Control"] = TILE_CACHE_CONTROL if request.GET.get("v") else TILE_UNVERSIONED_CACHE_CONTROL
+    return response
+
+
+@login_required
+@require_GET
+def nearby_data(request):
+    """Cele mai apropiate rezervații și situri (JSON) pentru type=occurrence|reserve|site, id=<pk>, k=1..5.
+    Citește tabelul precalculat NearestLink (core/nearby.py)."""
+    source_type = (request.GET.get("type") or "").strip()
+    source_id = (request.GET.get("id") or "").strip()
+    if source_type not in NEARBY_SOURCES:
+        return JsonResponse({"ok": False, "error": "Invalid type"}, status=400)
+    if not source_id.isdigit():
+        return JsonResponse({"ok": False, "error": "Invalid id"}, status=400)
+    try:
+        k = min(NEAREST_K, max(1, int(request.GET.get("k", NEAREST_K))))
+    except ValueError:
+        k = NEAREST_K
+    get_object_or_404(NEARBY_SOURCES[source_type], pk=int(source_id))
+    nearby = nearby_for(source_type, int(source_id), k)
+    return JsonResponse({"type": source_type, "id": int(source_id), "reserves": nearby["reserve"], "sites": nearby["site"]})
+
+
+@login_required
+@require_GET
+def year_series_data(request):
+    """Serii anuale din rollup-ul YearlyCount (fără scanarea tabelelor de fapte).
+    Params: dimension=species|reserve|raion|association|habitat, key=<id sau raion>[,<alt key>...]
+    Response: { dimension, series: { key: [ {year, count, rare} ] } }
+    """
+    dimension = (request.GET.get("dimension") or "").strip()
+    if dimension not in dict(YearlyCount.DIMENSION_CHOICES):
+        return JsonResponse({"ok": False, "error": "Invalid dimension"}, status=400)
+    keys = [k.strip() for k in (request.GET.get("key") or "").split(",") if k.strip()]
+    if not keys:
+        return JsonResponse({"ok": False, "error": "Missing key"}, status=400)
+    stored_keys = {k: k for k in keys}
+    if dimension == "raion":
+        # numele raionului, case-insensitive -> forma stocată; răspunsul păstrează cheile cerute
+        canonical = {r.lower(): r for r in ref_list("raions")}
+        stored_keys = {k: canonical.get(k.lower(), k) for k in keys}
+    elif not all(k.isdigit() for k in keys):
+        return JsonResponse({"ok": False, "error": "Invalid key"}, status=400)
+    series = YearlyCount.series(dimension, set(stored_keys.values()))
+    return JsonResponse({"dimension": dimension, "series": {k: series[sk] for k, sk in stored_keys.items()}})
+
+
+@login_required
+@require_GET
+def raion_choropleth_data(request):
+    """Valori pe raion pentru colorarea hărții (JSON), din rollup-ul RaionSummary.
+    Params: year=<an> (opțional; implicit totalul pe toți anii)
+    Response: { year, years: [..], raions: [ {raion, species_count, rare_species_count, reserve_count,
+                surface_ha, occurrence_count} ], max: {câmp: maxim} }
+    """
+    year = (request.GET.get("year") or "").strip()
+    if year and not year.isdigit():
+        return JsonResponse({"ok": False, "error": "Invalid year"}, status=400)
+    fields = RaionSummary.VALUE_FIELDS
+    rows = list(RaionSummary.objects
+                .filter(year=int(year) if year else RaionSummary.ALL_YEARS)
+                .order_by("raion")
+                .values("raion", *fields))
+    for row in rows:
+        row["surface_ha"] = float(row["surface_ha"])
+    years = list(RaionSummary.objects
+                 .exclude(year=RaionSummary.ALL_YEARS)
+                 .order_by("year")
+                 .values_list("year", flat=True)
+                 .distinct())
+    return JsonResponse({
+        "year": int(year) if year else None,
+        "years": years,
+        "raions": rows,
+        "max": {f: max((row[f] for row in rows), default=0) for f in fields},
+    })
+
 
 @login_required
 def viz_asociatii_detail(request, pk: int):
@@ -1189,41 +1761,11 @@ def occurrences_filters_page(request):
     raion = (request.GET.get("raion") or "").strip()
 
     # dropdown-uri
-    all_reserves = Reserve.objects.order_by("name").only("id", "name")
-    all_raions = (Reserve.objects
-                  .exclude(raion__isnull=True).exclude(raion="")
-                  .values_list("raion", flat=True).distinct().order_by("raion"))
-
-    qs = (Occurrence.objects
-          .select_related("species", "reserve")
-          .all())
-
-    error = None
-
-    if mode in ("by_reserve_all", "by_reserve_rare"):
-        if not reserve_name:
-            error = "Alege o rezervație."
-            qs = qs.none()
-        else:
-            qs = qs.filter(reserve__name__iexact=reserve_name)
-            if mode == "by_reserve_rare":
-                qs = qs.filter(Q(is_rare=True) | Q(species__is_rare=True))
-
-    elif mode in ("by_raion_all", "by_raion_rare"):
-        if not raion:
-            error = "Alege un raion."
-            qs = qs.none()
-        else:
-            qs = qs.filter(reserve__raion__iexact=raion)
-            if mode == "by_raion_rare":
-                qs = qs.filter(Q(is_rare=True) | Q(species__is_rare=True))
-
-    else:
-        error = "Mod invalid."
-        qs = qs.none()
+    all_reserves = ref_list("reserves")
+    all_raions = ref_list("raions")
 
     # Sortare prietenoasă: după rezervație, apoi specie, apoi an desc
-    qs = qs.order_by("reserve__name", "species__denumire_stiintifica", "-year")
+    qs, error = _build_occurrence_filters_queryset(mode, reserve_name, raion)
 
     # Paginăm queryset-ul și construim rândurile DOAR pentru pagina curentă
     paginator, page_obj = _paginate(request, qs, default=50)
@@ -1235,7 +1777,7 @@ def occurrences_filters_page(request):
             "species_sci": o.species.denumire_stiintifica,
             "species_pop": o.species.denumire_populara or "",
             "year": o.year,
-            "rare": "Da" if (o.is_rare or o.species.is_rare) else "Nu",
+            "rare": "Da" if o.effective_rare else "Nu",
             "lat": o.latitude,
             "lon": o.longitude,
         })
@@ -1250,6 +1792,7 @@ def occurrences_filters_page(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "error": error,
+        "facets": None if error else facet_counts(qs),
     })
 
 
@@ -1269,28 +1812,7 @@ def sitehab_filters_page(request):
     year = (request.GET.get("year") or "").strip()
     export = (request.GET.get("export") or "").strip().lower()
 
-    qs_full = SiteHabitat.objects.select_related("site", "habitat")
-
-    if mode == "by_site" and site_name:
-        qs_full = qs_full.filter(site__name__iexact=site_name).order_by(
-            "year", "habitat__name_romanian", "habitat__name_english"
-        )
-        title = f"Habitate în site-ul: {site_name}"
-    elif mode == "by_habitat" and habitat_name:
-        qs_full = qs_full.filter(
-            Q(habitat__name_romanian__iexact=habitat_name) |
-            Q(habitat__name_english__iexact=habitat_name) |
-            Q(habitat__code__iexact=habitat_name)
-        ).order_by("year", "site__name")
-        title = f"Site-uri pentru habitat: {habitat_name}"
-    elif mode == "by_year" and year.isdigit():
-        qs_full = qs_full.filter(year=int(year)).order_by(
-            "site__name", "habitat__name_romanian", "habitat__name_english"
-        )
-        title = f"Relații Site–Habitat în anul: {year}"
-    else:
-        qs_full = qs_full.none()
-        title = "Selectează un filtru"
+    qs_full, title, error = _sitehab_queryset(mode, site_name, habitat_name, year)
 
     # Export (din QS-ul complet, nu doar pagina curentă)
     if export in ("csv", "xlsx"):
@@ -1300,8 +1822,8 @@ def sitehab_filters_page(request):
     paginator, page_obj = _paginate(request, qs_full, default=50)
     qs = page_obj.object_list  # pentru compatibilitate cu template-ul existent
 
-    sites = Site.objects.order_by("name").values_list("name", flat=True)
-    habitats = Habitat.objects.order_by("name_romanian", "name_english").values_list("name_romanian", flat=True)
+    sites = ref_list("sites")
+    habitats = ref_list("habitats")
 
     return render(request, "core/sitehab_filters.html", {
         "mode": mode,
@@ -1312,6 +1834,7 @@ def sitehab_filters_page(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "title": title,
+        "error": error,
         "sites": list(sites),
         "habitats": list(habitats),
     })
@@ -1351,8 +1874,8 @@ def sitehab_filters_page(request):
     if export in ("csv", "xlsx"):
         return _export_sitehab(qs, export)
 
-    sites = Site.objects.order_by("name").values_list("name", flat=True)
-    habitats = Habitat.objects.order_by("name_romanian", "name_english").values_list("name_romanian", flat=True)
+    sites = ref_list("sites")
+    habitats = ref_list("habitats")
 
     return render(request, "core/sitehab_filters.html", {
         "mode": mode,
@@ -1426,7 +1949,7 @@ def comparatii_plante_list(request):
         ordered = [r for _, r in scored]
         paginator, page_obj = _paginate(request, ordered, default=24)
 
-    all_reserves = Reserve.objects.order_by("name").only("id", "name", "raion")
+    all_reserves = ref_list("reserves")
     return render(request, "core/comparatii_plante.html", {
         "page_obj": page_obj,
         "paginator": paginator,
@@ -1435,6 +1958,81 @@ def comparatii_plante_list(request):
     })
 
 
+COMPARISON_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _rare_q():
+    return Q(effective_rare=True)
+
+
+def _rare_years_by_reserve(reserve_ids):
+    """{reserve_id: [ani desc]} cu ocurențe rare.
+
+    Cache per rezervație, cu versiunea ei de date în cheie; rezervațiile lipsă
+    din cache se calculează împreună, într-o singură interogare.
+    """
+    ids = list(dict.fromkeys(int(r) for r in reserve_ids))
+    versions = ReserveDataVersion.current(ids)
+    keys = {rid: f"cmp:years:{rid}:v{versions[rid]}" for rid in ids}
+    cached = cache.get_many(list(keys.values()))
+    out = {rid: cached[k] for rid, k in keys.items() if k in cached}
+    missing = [rid for rid in ids if rid not in out]
+    if missing:
+        found = {rid: set() for rid in missing}
+        ys = (Occurrence.objects
+              .filter(reserve_id__in=missing)
+              .filter(_rare_q())
+              .values_list("reserve_id", "year")
+              .distinct())
+        for rid, y in ys:
+            if y:
+                found[rid].add(int(y))
+        fresh = {rid: sorted(years, reverse=True) for rid, years in found.items()}
+        cache.set_many({keys[rid]: v for rid, v in fresh.items()}, COMPARISON_CACHE_TIMEOUT)
+        out.update(fresh)
+    return out
+
+
+def _comparison_matrix(columns, only_rare: bool = True):
+    """Matricea prezență/absență pentru coloanele (reserve_id, an), în ordinea dată.
+
+    Rezultatul e pus în cache; cheia include versiunea de date a fiecărei rezervații
+    din coloane, deci editarea unei rezervații invalidează doar comparațiile care o conțin.
+    Întoarce [ {species_id, species_name, presence:[bool,...]} ] ordonat după nume.
+    """
+    columns = [(int(rid), int(y)) for rid, y in columns]
+    rids = {rid for rid, _ in columns}
+    versions = ReserveDataVersion.current(rids)
+    raw = json.dumps({"cols": columns, "ver": sorted(versions.items()), "rare": only_rare})
+    key = "cmp:matrix:" + hashlib.md5(raw.encode()).hexdigest()
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+
+    qs = Occurrence.objects.filter(reserve_id__in=rids, year__in={y for _, y in columns})
+    if only_rare:
+        qs = qs.filter(_rare_q())
+    wanted = set(columns)
+    names = {}
+    presence = {}
+    for sid, name, rid, yy in qs.values_list("species_id", "species__denumire_stiintifica", "reserve_id", "year").distinct():
+        if (rid, yy) not in wanted:
+            continue
+        names[sid] = name
+        presence.setdefault(sid, set()).add((rid, yy))
+
+    rows = [
+        {
+            "species_id": sid,
+            "species_name": names[sid],
+            "presence": [col in presence[sid] for col in columns],
+        }
+        for sid in sorted(names, key=lambda k: (names[k], k))
+    ]
+    cache.set(key, rows, COMPARISON_CACHE_TIMEOUT)
+    return rows
+
+
 @login_required
 def comparatii_plante_detail(request, pk: int):
     r = get_object_or_404(Reserve, pk=pk)
@@ -1452,13 +2050,7 @@ def comparatii_plante_detail(request, pk: int):
     else:
         base_year = None
     # Available years for rare species occurrences in this reserve
-    years_qs = (Occurrence.objects
-                .filter(reserve_id=pk)
-                .filter(Q(is_rare=True) | Q(species__is_rare=True))
-                .exclude(year__isnull=True)
-                .values_list("year", flat=True)
-                .distinct())
-    available_years = sorted(set(int(y) for y in years_qs if y), reverse=True)
+    available_years = _rare_years_by_reserve([pk])[pk]
 
     # Parse selected years from URL, keep only available, limit 2..4
     years_param = (request.GET.get("years") or "").strip()
@@ -1482,46 +2074,18 @@ def comparatii_plante_detail(request, pk: int):
     total_species = 0
 
     if mode == "years" and has_valid_selection:
-        # Fetch occurrences once for selected years
-        occ = (Occurrence.objects
-               .filter(reserve_id=pk, year__in=selected_years)
-               .filter(Q(is_rare=True) | Q(species__is_rare=True))
-               .values_list("species_id", "year")
-               .distinct())
-
-        # Build presence map: species_id -> set(years)
-        species_to_years = {}
-        for sid, yr in occ:
-            if sid is None or yr is None:
-                continue
-            species_to_years.setdefault(int(sid), set()).add(int(yr))
-
-        total_species = len(species_to_years)
-
-        # Order species by scientific name
-        species_ids = list(species_to_years.keys())
-        sp_qs = Species.objects.filter(id__in=species_ids).only("id", "denumire_stiintifica").order_by("denumire_stiintifica")
-        ordered_species = list(sp_qs)
-
-        # Build rows as dicts for template
-        for sp in ordered_species:
-            presence = []
-            years_set = species_to_years.get(sp.id, set())
-            for y in selected_years:
-                presence.append(y in years_set)
-            rows.append({
-                "species_id": sp.id,
-                "species_name": sp.denumire_stiintifica,
-                "presence": presence,
-            })
-
-        # Paginate rows if large
-        paginator, page_obj = _paginate(request, rows, default=50)
+        # Matricea vine din cache (cheie = coloane + versiunea rezervației); paginarea doar o feliază
+        matrix = _comparison_matrix([(pk, y) for y in selected_years])
+        total_species = len(matrix)
+        paginator, page_obj = _paginate(request, matrix, default=50)
         rows = page_obj.object_list
 
     # Mode: reserves (compare with other reserves)
     columns = []
     rows_res = []
+    page_obj_res = None
+    paginator_res = None
+    total_species_res = 0
     if mode == "reserves":
         # Expect base=pk:year and res=rid:year,...
         base_pair = (request.GET.get("base") or "").strip()
@@ -1550,40 +2114,11 @@ def comparatii_plante_detail(request, pk: int):
             valid_pairs.append((rid, yy))
 
         # Validate years availability per reserve (rare-only)
-        ids_all = list({rid for rid, _ in valid_pairs})
-        years_by_rid = {}
-        if ids_all:
-            for rid in ids_all:
-                ys = (Occurrence.objects
-                      .filter(reserve_id=rid)
-                      .filter(Q(is_rare=True) | Q(species__is_rare=True))
-                      .exclude(year__isnull=True)
-                      .values_list("year", flat=True)
-                      .distinct())
-                years_by_rid[rid] = set(int(y) for y in ys if y)
-
-            valid_pairs = [(rid, yy) for (rid, yy) in valid_pairs if yy in years_by_rid.get(rid, set())]
+        if valid_pairs:
+            years_by_rid = _rare_years_by_reserve([rid for rid, _ in valid_pairs])
+            valid_pairs = [(rid, yy) for (rid, yy) in valid_pairs if yy in years_by_rid.get(rid, [])]
 
         if len(valid_pairs) >= 2:
-            rid_list = [rid for rid, _ in valid_pairs]
-            years_list = [yy for _, yy in valid_pairs]
-            occ = (Occurrence.objects
-                   .filter(reserve_id__in=rid_list, year__in=years_list)
-                   .filter(Q(is_rare=True) | Q(species__is_rare=True))
-                   .values_list("species_id", "reserve_id", "year")
-                   .distinct())
-            presence_map = {}
-            for sid, rid, yy in occ:
-                if sid is None or rid is None or yy is None:
-                    continue
-                presence_map.setdefault(int(sid), set()).add((int(rid), int(yy)))
-
-            species_ids = list(presence_map.keys())
-            sp_qs = Species.objects.filter(id__in=species_ids).only("id", "denumire_stiintifica").order_by("denumire_stiintifica")
-            ordered_species = list(sp_qs)
-
-            rid_to_name = { rr.id: rr.name for rr in Reserve.objects.filter(id__in=set(rid_list)).only("id","name") }
-
             # Ensure base first, then others in provided order
             pairs_ordered = []
             for rid, yy in valid_pairs:
@@ -1594,22 +2129,17 @@ def comparatii_plante_detail(request, pk: int):
                 if rid != pk:
                     pairs_ordered.append((rid, yy))
 
+            rid_to_name = { rr.id: rr.name for rr in Reserve.objects.filter(id__in={rid for rid, _ in pairs_ordered}).only("id","name") }
             for rid, yy in pairs_ordered:
                 columns.append({"reserve_id": rid, "reserve_name": rid_to_name.get(rid, f"#{rid}"), "year": yy})
 
-            for sp in ordered_species:
-                presence = []
-                pset = presence_map.get(sp.id, set())
-                for col in columns:
-                    presence.append((col["reserve_id"], col["year"]) in pset)
-                rows_res.append({
-                    "species_id": sp.id,
-                    "species_name": sp.denumire_stiintifica,
-                    "presence": presence,
-                })
+            matrix = _comparison_matrix(pairs_ordered)
+            total_species_res = len(matrix)
+            paginator_res, page_obj_res = _paginate(request, matrix, default=50)
+            rows_res = page_obj_res.object_list
 
     # Reserves combobox data (exclude current reserve)
-    all_reserves = Reserve.objects.exclude(id=pk).order_by("name").only("id", "name")
+    all_reserves = [rr for rr in ref_list("reserves") if rr["id"] != pk]
 
     context = {
         "r": r,
@@ -1624,6 +2154,9 @@ def comparatii_plante_detail(request, pk: int):
         # reserves-mode context
         "columns": columns,
         "rows_res": rows_res,
+        "page_obj_res": page_obj_res,
+        "paginator_res": paginator_res,
+        "total_species_res": total_species_res,
         "all_reserves": all_reserves,
         "base_reserve_id_url": base_reserve_id,
         "base_year_url": base_year,
@@ -1631,50 +2164,64 @@ def comparatii_plante_detail(request, pk: int):
     return render(request, "core/comparatii_plante_detail.html", context)
 
 
-def _species_ids_for_reserve(reserve_id: int, only_rare: bool = True):
-    qs = (Occurrence.objects
-          .filter(reserve_id=reserve_id)
-          .select_related("species"))
+def _parse_reserve_ids(res_param: str):
+    """'3,1,3,7' -> [3, 1, 7] (doar numere, fără dubluri, ordinea păstrată)."""
+    ids = []
+    for part in (res_param or "").split(','):
+        part = part.strip()
+        if part.isdigit():
+            ids.append(int(part))
+    return list(dict.fromkeys(ids))
+
+
+def _species_presence_summary(reserve_ids, only_rare: bool = True):
+    """Comun / unic / reuniune pentru N rezervații, calculat în DB într-o singură interogare.
+
+    GROUP BY specie cu count(distinct reserve_id): n == nr. rezervații -> comună,
+    n == 1 -> unică rezervației min(reserve_id). Numele vin din același JOIN.
+    Întoarce lista de tuple (species_id, nume, n, reserve_id_minim), ordonată după nume.
+    """
+    qs = Occurrence.objects.filter(reserve_id__in=reserve_ids)
     if only_rare:
-        qs = qs.filter(Q(is_rare=True) | Q(species__is_rare=True))
-    return set(qs.values_list("species_id", flat=True))
+        qs = qs.filter(effective_rare=True)
+    return list(qs
+                .values("species_id", "species__denumire_stiintifica")
+                .annotate(n=Count("reserve_id", distinct=True), rid=Min("reserve_id"))
+                .order_by("species__denumire_stiintifica", "species_id")
+                .values_list("species_id", "species__denumire_stiintifica", "n", "rid"))
 
 
 @login_required
 @require_GET
 def comparatii_plante_data(request):
-    """Return JSON summary for selected reserves. Params: res=1,2,3; rare=1.
-    Response: { reserves: [ {id,name},...], common:[{id,name}], unique:{rid:[...]}, totalDistinct:N }
+    """Return JSON summary for selected reserves. Params: res=1,2,3,...; rare=1.
+    Response: { reserves: [ {id,name},...], common:[{id,name}], unique:{rid:[...]},
+                union:[{id,name,reserves}], totalDistinct:N }
+    'unique' = speciile prezente DOAR în rezervația respectivă (dintre cele selectate).
     """
-    res_param = (request.GET.get("res") or "").strip()
+    ids = _parse_reserve_ids(request.GET.get("res"))
     rare_flag = (request.GET.get("rare") or "1").strip() in ("1", "true", "yes", "on")
-    ids = []
-    if res_param:
-        for part in res_param.split(','):
-            part = part.strip()
-            if part.isdigit():
-                ids.append(int(part))
-    ids = ids[:3]
     reserves = list(Reserve.objects.filter(id__in=ids).only("id", "name"))
-    id_to_species = {}
-    for r in reserves:
-        id_to_species[r.id] = _species_ids_for_reserve(r.id, only_rare=rare_flag)
-    # Compute sets
-    common_ids = set.intersection(*id_to_species.values()) if id_to_species else set()
-    all_ids = set().union(*id_to_species.values()) if id_to_species else set()
-    unique = {}
-    for rid, s in id_to_species.items():
-        others = all_ids - s
-        unique[rid] = list(s - (all_ids - s))  # unique to this reserve
-    # Fetch species names
-    species_map = { s.id: s.denumire_stiintifica for s in Species.objects.filter(id__in=all_ids).only("id","denumire_stiintifica") }
-    def to_rows(id_list):
-        return [ {"id": sid, "name": species_map.get(sid, str(sid))} for sid in sorted(id_list) ]
+    reserves.sort(key=lambda r: ids.index(r.id))
+
+    summary = _species_presence_summary([r.id for r in reserves], only_rare=rare_flag) if reserves else []
+    total = len(reserves)
+    common = []
+    unique = {str(r.id): [] for r in reserves}
+    union = []
+    for sid, name, n, rid in summary:
+        union.append({"id": sid, "name": name, "reserves": n})
+        if n == total:
+            common.append({"id": sid, "name": name})
+        if n == 1 and total > 1:
+            unique[str(rid)].append({"id": sid, "name": name})
+
     data = {
         "reserves": [ {"id": r.id, "name": r.name} for r in reserves ],
-        "common": to_rows(common_ids),
-        "unique": { str(rid): to_rows(uids) for rid, uids in unique.items() },
-        "totalDistinct": len(all_ids),
+        "common": common,
+        "unique": unique,
+        "union": union,
+        "totalDistinct": len(summary),
     }
     return JsonResponse(data)
 
@@ -1683,36 +2230,28 @@ def comparatii_plante_data(request):
 @require_GET
 def comparatii_plante_export(request):
     kind = (request.GET.get("format") or request.GET.get("export") or "csv").lower()
-    res_param = (request.GET.get("res") or "").strip()
+    ids = _parse_reserve_ids(request.GET.get("res"))
     rare_flag = (request.GET.get("rare") or "1").strip() in ("1", "true", "yes", "on")
-    ids = []
-    if res_param:
-        for part in res_param.split(','):
-            if part.strip().isdigit():
-                ids.append(int(part.strip()))
-    ids = ids[:3]
     reserves = list(Reserve.objects.filter(id__in=ids).only("id", "name"))
-    id_to_species = {}
-    for r in reserves:
-        id_to_species[r.id] = _species_ids_for_reserve(r.id, only_rare=rare_flag)
-    common_ids = set.intersection(*id_to_species.values()) if id_to_species else set()
-    all_ids = set().union(*id_to_species.values()) if id_to_species else set()
-    species_map = { s.id: s.denumire_stiintifica for s in Species.objects.filter(id__in=all_ids).only("id","denumire_stiintifica") }
+    reserves.sort(key=lambda r: ids.index(r.id))
+    summary = _species_presence_summary([r.id for r in reserves], only_rare=rare_flag) if reserves else []
+    total = len(reserves)
 
     headers = ["Tip", "Specie (științific)"] + [r.name for r in reserves]
     def rows_iter():
-        yield headers
         # Common
-        for sid in sorted(common_ids):
-            yield ["Comun", species_map.get(sid, sid)] + ["Da"]*len(reserves)
+        for sid, name, n, rid in summary:
+            if n == total:
+                yield ["Comun", name] + ["Da"]*total
         # Unique per reserve
-        for r in reserves:
-            only = id_to_species[r.id] - (all_ids - id_to_species[r.id])
-            for sid in sorted(only):
-                row = [f"Unic {r.name}", species_map.get(sid, sid)]
-                for rr in reserves:
-                    row.append("Da" if rr.id == r.id else "Nu")
-                yield row
+        if total > 1:
+            for r in reserves:
+                for sid, name, n, rid in summary:
+                    if n == 1 and rid == r.id:
+                        row = [f"Unic {r.name}", name]
+                        for rr in reserves:
+                            row.append("Da" if rr.id == r.id else "Nu")
+                        yield row
 
     # Filename
     base = "comparatie_plante_" + "_".join([r.name.replace(" ", "_") for r in reserves])
@@ -1722,7 +2261,7 @@ def comparatii_plante_export(request):
         except ModuleNotFoundError:
             kind = "csv"
         else:
-            wb = Workbook(); ws = wb.active; ws.title = "Comparatie";
+            wb = Workbook(); ws = wb.active; ws.title = "Comparatie"; ws.append(headers)
             for row in rows_iter():
                 ws.append(row)
             bio = BytesIO(); wb.save(bio); bio.seek(0)
@@ -1752,24 +2291,222 @@ def comparatii_plante_years(request):
             if part.strip().isdigit():
                 ids.append(int(part.strip()))
     ids = list(dict.fromkeys(ids))  # dedupe preserve order
-    yearsByReserve = {}
-    for rid in ids:
-        ys = (Occurrence.objects
-              .filter(reserve_id=rid)
-              .filter(Q(is_rare=True) | Q(species__is_rare=True))
-              .exclude(year__isnull=True)
-              .values_list("year", flat=True)
-              .distinct())
-        years = sorted(set(int(y) for y in ys if y), reverse=True)
-        yearsByReserve[str(rid)] = years
+    years_by_rid = _rare_years_by_reserve(ids) if ids else {}
+    yearsByReserve = {str(rid): years_by_rid[rid] for rid in ids}
     return JsonResponse({"yearsByReserve": yearsByReserve})
 
 
+@login_required
+def comparatii_turnover(request):
+    """Turnover de specii între anii consecutivi de inventariere, per rezervație + totaluri pe raion.
+
+    Citește tabelul sumar ReserveYearTurnover (actualizat incremental de `manage.py compute_turnover`).
+    GET: raion, reserve_name, export=csv|xlsx
+    """
+    raion = (request.GET.get("raion") or "").strip()
+    reserve_name = (request.GET.get("reserve_name") or "").strip()
+    export = (request.GET.get("export") or "").strip().lower()
+
+    qs = (ReserveYearTurnover.objects
+          .select_related("reserve")
+          .filter(prev_year__isnull=False))
+    # nume necunoscut -> listă goală de id-uri -> niciun rând
+    if raion:
+        qs = qs.filter(reserve_id__in=resolve_ids("raion", raion))
+    if reserve_name:
+        qs = qs.filter(reserve_id__in=resolve_ids("reserve", reserve_name))
+    qs = qs.order_by("reserve__name", "year")
+
+    totals = (qs.values("reserve__raion", "year")
+              .annotate(
+                  reserves=Count("reserve_id", distinct=True),
+                  gained=Sum("gained_count"),
+                  lost=Sum("lost_count"),
+                  retained=Sum("retained_count"),
+              )
+              .order_by("reserve__raion", "year"))
+
+    headers = ["Rezervație", "Raion", "An anterior", "An", "Specii", "Apărute", "Dispărute", "Păstrate",
+               "Specii apărute", "Specii dispărute"]
+
+    if export in ("csv", "xlsx"):
+        species_map = dict(Species.objects.values_list("id", "denumire_stiintifica"))
+
+        def rows_iter():
+            for t in qs.iterator():
+                yield [
+                    t.reserve.name, t.reserve.raion or "", t.prev_year, t.year, t.species_count,
+                    t.gained_count, t.lost_count, t.retained_count,
+                    "; ".join(sorted(species_map.get(sid, str(sid)) for sid in t.gained)),
+                    "; ".join(sorted(species_map.get(sid, str(sid)) for sid in t.lost)),
+                ]
+
+        if export == "xlsx":
+            try:
+                from openpyxl import Workbook
+            except ModuleNotFoundError:
+                export = "csv"
+            else:
+                wb = Workbook(); ws = wb.active; ws.title = "Turnover"; ws.append(headers)
+                for row in rows_iter():
+                    ws.append(row)
+                ws_t = wb.create_sheet("Raioane")
+                ws_t.append(["Raion", "An", "Rezervații", "Apărute", "Dispărute", "Păstrate"])
+                for t in totals:
+                    ws_t.append([t["reserve__raion"] or "", t["year"], t["reserves"], t["gained"], t["lost"], t["retained"]])
+                bio = BytesIO(); wb.save(bio); bio.seek(0)
+                resp = HttpResponse(bio.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                resp["Content-Disposition"] = 'attachment; filename="turnover_specii.xlsx"'
+                return resp
+        return _stream_csv("turnover_specii.csv", headers, rows_iter())
+
+    paginator, page_obj = _paginate(request, qs, default=50)
+    page_rows = list(page_obj.object_list)
+
+    # numele speciilor doar pentru pagina curentă (o singură interogare)
+    ids = set()
+    for t in page_rows:
+        ids.update(t.gained)
+        ids.update(t.lost)
+    species_map = dict(Species.objects.filter(id__in=ids).values_list("id", "denumire_stiintifica")) if ids else {}
+
+    rows = []
+    for t in page_rows:
+        rows.append({
+            "reserve_id": t.reserve_id,
+            "reserve": t.reserve.name,
+            "raion": t.reserve.raion or "",
+            "prev_year": t.prev_year,
+            "year": t.year,
+            "species_count": t.species_count,
+            "gained_count": t.gained_count,
+            "lost_count": t.lost_count,
+            "retained_count": t.retained_count,
+            "gained": sorted(species_map.get(sid, str(sid)) for sid in t.gained),
+            "lost": sorted(species_map.get(sid, str(sid)) for sid in t.lost),
+        })
+
+    all_reserves = ref_list("reserves")
+    all_raions = ref_list("raions")
+
+    return render(request, "core/comparatii_turnover.html", {
+        "raion": raion,
+        "reserve_name": reserve_name,
+        "rows": rows,
+        "totals": list(totals),
+        "page_obj": page_obj,
+        "paginator": paginator,
+        "all_reserves": all_reserves,
+        "all_raions": all_raions,
+        "last_computed": ReserveYearTurnover.objects.aggregate(m=Max("computed_at"))["m"],
+    })
+
+
+def _raion_aggregates(raions=None, year=None):
+    """Agregate pe raion × an (și total pe toți anii), dintr-un singur GROUP BY GROUPING SETS.
+
+    Întoarce { raion: { an|"total": {reserves, species, rare_species, red_book:{cat:n}} } }.
+    Rândurile cu GROUPING(cartea_rosie_cat)=0 dau defalcarea pe categorii Cartea Roșie.
+    """
+    where = ["r.raion IS NOT NULL", "r.raion <> ''"]
+    params = []
+    if raions:
+        where.append("r.raion = ANY(%s)")
+        params.append(list(raions))
+    if year is not None:
+        where.append("o.year = %s")
+        params.append(int(year))
+
+    sql = f"""
+        SELECT r.raion,
+               o.year,
+               s.cartea_rosie_cat,
+               GROUPING(o.year) AS g_year,
+               GROUPING(s.cartea_rosie_cat) AS g_cat,
+               COUNT(DISTINCT o.reserve_id) AS reserves,
+               COUNT(DISTINCT o.species_id) AS species,
+               COUNT(DISTINCT o.species_id) FILTER (WHERE o.effective_rare) AS rare_species
+        FROM core_occurrence o
+        JOIN core_reserve r ON r.id = o.reserve_id
+        JOIN core_species s ON s.id = o.species_id
+        WHERE {" AND ".join(where)}
+        GROUP BY GROUPING SETS (
+            (r.raion, o.year), (r.raion, o.year, s.cartea_rosie_cat),
+            (r.raion), (r.raion, s.cartea_rosie_cat)
+        )
+    """
+    out = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for raion, yr, cat, g_year, g_cat, n_res, n_sp, n_rare in cursor.fetchall():
+            key = "total" if g_year else yr
+            cell = out.setdefault(raion, {}).setdefault(key, {
+                "reserves": 0, "species": 0, "rare_species": 0, "red_book": {},
+            })
+            if g_cat:
+                cell.update(reserves=n_res, species=n_sp, rare_species=n_rare)
+            elif cat:
+                cell["red_book"][cat] = n_sp
+    return out
+
+
+def _parse_raions(request):
+    raw = request.GET.getlist("raion") or (request.GET.get("raions") or "").split(",")
+    return list(dict.fromkeys(r.strip() for r in raw if r and r.strip()))
+
+
+@login_required
+@require_GET
+def comparatii_raioane_data(request):
+    """Agregate floră rară pe raion și an. Params: raions=A,B (sau raion=A&raion=B), year=YYYY (opțional).
+    Response: { raions:[...], years:[...], data:{ raion:{ an|"total": {reserves,species,rare_species,red_book} } } }
+    """
+    raions = _parse_raions(request)
+    year_q = (request.GET.get("year") or "").strip()
+    if year_q and not year_q.isdigit():
+        return JsonResponse({"ok": False, "error": "Invalid year"}, status=400)
+    data = _raion_aggregates(raions or None, int(year_q) if year_q else None)
+    years = sorted({y for per_year in data.values() for y in per_year if y != "total"})
+    return JsonResponse({
+        "raions": raions or sorted(data),
+        "years": years,
+        "data": {raion: {str(k): v for k, v in per_year.items()} for raion, per_year in data.items()},
+    })
+
+
+@login_required
+def comparatii_raioane(request):
+    """Comparație side-by-side între raioane: rezervații, specii, specii rare, categorii Cartea Roșie pe ani."""
+    all_raions = ref_list("raions")
+    selected = [r for r in _parse_raions(request) if r in all_raions]
+
+    columns = []
+    year_rows = []
+    if selected:
+        data = _raion_aggregates(selected)
+        columns = [{"raion": r, "total": data.get(r, {}).get("total")} for r in selected]
+        years = sorted({y for r in selected for y in data.get(r, {}) if y != "total"}, reverse=True)
+        for y in years:
+            year_rows.append({
+                "year": y,
+                "cells": [data.get(r, {}).get(y) for r in selected],
+            })
+
+    return render(request, "core/comparatii_raioane.html", {
+        "all_raions": all_raions,
+        "selected": selected,
+        "columns": columns,
+        "year_rows": year_rows,
+    })
+
+
 @login_required
 def viz_situri_detail(request, pk: int):
     s = get_object_or_404(Site, pk=pk)
     is_admin = request.user.is_staff or request.user.groups.filter(name__iexact="Administrators").exists()
-    return render(request, "core/viz_situri_detail.html", {"s": s, "is_admin": is_admin})
+    return render(request, "core/viz_situri_detail.html", {
+        "s": s, "is_admin": is_admin, "nearby": nearby_for("site", s.pk),
+    })
 
 
 @login_required
@@ -32,6 +32,8 @@ ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["127.0.0.1", "localhost"])
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/accounts/login/"
+# acces public (read-only), în afara LoginRequiredMiddleware: tile-urile hărții naționale
+LOGIN_EXEMPT_URLS = [r"^vizualizari/harta/tiles/"]
 
 
 
@@ -137,6 +139,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# tile-uri PNG pregenerate pentru harta națională (manage.py build_tiles)
+MAP_TILES_DIR = env("MAP_TILES_DIR", default=str(BASE_DIR / "tiles"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 